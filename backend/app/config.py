@@ -0,0 +1,123 @@
+import os
+
+# Runtime settings, overridable through environment variables.
+
+# QR rendering
+QR_RENDER_MODE = os.getenv("QR_RENDER_MODE", "process")  # 'process' or 'thread'
+QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", str(os.cpu_count() or 1)))
+QR_RENDER_QUEUE_SIZE = int(os.getenv("QR_RENDER_QUEUE_SIZE", str(QR_RENDER_WORKERS * 8)))
+# Batches rendering at once; more wait their turn. Batch renders don't count
+# against QR_RENDER_QUEUE_SIZE, which is kept for single emergency renders.
+QR_RENDER_MAX_BATCHES = int(os.getenv("QR_RENDER_MAX_BATCHES", "1"))
+
+# Rendered QR image cache
+QR_IMAGE_CACHE_BYTES = int(os.getenv("QR_IMAGE_CACHE_BYTES", str(32 * 1024 * 1024)))
+QR_IMAGE_MAX_SCALE = int(os.getenv("QR_IMAGE_MAX_SCALE", "20"))
+
+# QR payload format: 'compact' (v2 AES-GCM + base45) or 'legacy' (Fernet)
+QR_PAYLOAD_FORMAT = os.getenv("QR_PAYLOAD_FORMAT", "compact")
+QR_PAYLOAD_COMPRESS = os.getenv("QR_PAYLOAD_COMPRESS", "1") == "1"
+
+# QR encryption keys (see app/services/key_ring.py)
+QR_KEYS = os.getenv("QR_KEYS", "")
+QR_KEY_FILE = os.getenv("QR_KEY_FILE", "")
+QR_KEY_PASSPHRASE = os.getenv("QR_KEY_PASSPHRASE", "emergency_healthcare_secret_key_2024")
+
+# Batch QR generation and scanning
+QR_BATCH_MAX_ITEMS = int(os.getenv("QR_BATCH_MAX_ITEMS", "5000"))
+QR_SCAN_BATCH_MAX_ITEMS = int(os.getenv("QR_SCAN_BATCH_MAX_ITEMS", "500"))
+QR_SCAN_BATCH_CHUNK = int(os.getenv("QR_SCAN_BATCH_CHUNK", "16"))
+
+# Decrypted payload cache for repeated scans
+QR_PAYLOAD_CACHE_SIZE = int(os.getenv("QR_PAYLOAD_CACHE_SIZE", "4096"))
+
+# Database
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./emergency_healthcare.db")
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = int(os.getenv("DB_POOL_TIMEOUT", "30"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_CACHE_SIZE_KB = int(os.getenv("SQLITE_CACHE_SIZE_KB", "20000"))
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+
+# Password hashing (scrypt). Raising N rehashes users on their next login.
+PASSWORD_SCRYPT_N = int(os.getenv("PASSWORD_SCRYPT_N", str(2 ** 14)))
+PASSWORD_SCRYPT_R = int(os.getenv("PASSWORD_SCRYPT_R", "8"))
+PASSWORD_SCRYPT_P = int(os.getenv("PASSWORD_SCRYPT_P", "1"))
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(os.cpu_count() or 1)))
+PASSWORD_HASH_QUEUE_SIZE = int(os.getenv("PASSWORD_HASH_QUEUE_SIZE", str(PASSWORD_HASH_WORKERS * 16)))
+
+# Access tokens
+JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "emergency-healthcare-secret-key-2024")
+ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "720"))
+AUTH_CLAIMS_CACHE_TTL = int(os.getenv("AUTH_CLAIMS_CACHE_TTL", "60"))
+AUTH_CLAIMS_CACHE_SIZE = int(os.getenv("AUTH_CLAIMS_CACHE_SIZE", "10000"))
+
+# Write-behind EmergencyEvent persistence
+EVENT_OUTBOX_BATCH_SIZE = int(os.getenv("EVENT_OUTBOX_BATCH_SIZE", "200"))
+EVENT_OUTBOX_FLUSH_INTERVAL = float(os.getenv("EVENT_OUTBOX_FLUSH_INTERVAL", "0.5"))
+# Shutdown gives up on rows it still can't write after this many failed
+# flushes in a row or this many seconds
+EVENT_OUTBOX_DRAIN_RETRIES = int(os.getenv("EVENT_OUTBOX_DRAIN_RETRIES", "5"))
+EVENT_OUTBOX_DRAIN_TIMEOUT = float(os.getenv("EVENT_OUTBOX_DRAIN_TIMEOUT", "10"))
+
+# Emergency expiry sweeper
+EXPIRY_SWEEP_BATCH_SIZE = int(os.getenv("EXPIRY_SWEEP_BATCH_SIZE", "500"))
+EXPIRY_SWEEP_MAX_SLEEP = float(os.getenv("EXPIRY_SWEEP_MAX_SLEEP", "30"))
+EXPIRY_SWEEP_FALLBACK_INTERVAL = float(os.getenv("EXPIRY_SWEEP_FALLBACK_INTERVAL", "300"))
+
+# Spatial index of active emergencies (cell size in degrees, ~1.1 km at 0.01)
+SPATIAL_CELL_DEG = float(os.getenv("SPATIAL_CELL_DEG", "0.01"))
+NEARBY_MAX_RADIUS_M = float(os.getenv("NEARBY_MAX_RADIUS_M", "50000"))
+
+# Live emergency feed (Server-Sent Events). Regions are grid cells of
+# BROADCAST_REGION_DEG degrees (~11 km at 0.1); each connection buffers at
+# most BROADCAST_QUEUE_SIZE undelivered events.
+BROADCAST_REGION_DEG = float(os.getenv("BROADCAST_REGION_DEG", "0.1"))
+BROADCAST_QUEUE_SIZE = int(os.getenv("BROADCAST_QUEUE_SIZE", "64"))
+BROADCAST_MAX_SUBSCRIBERS = int(os.getenv("BROADCAST_MAX_SUBSCRIBERS", "10000"))
+BROADCAST_HEARTBEAT_SECONDS = float(os.getenv("BROADCAST_HEARTBEAT_SECONDS", "20"))
+
+# Pre-serialized medical summaries for QR generation, keyed by user id
+MEDICAL_SUMMARY_CACHE_BYTES = int(os.getenv("MEDICAL_SUMMARY_CACHE_BYTES", str(16 * 1024 * 1024)))
+
+# Emergency id generator: 'sortable' (millisecond-ordered) or 'legacy'
+# (second timestamp + random). EMERGENCY_ID_NODE pins this process' node
+# number (0-32767); by default it is derived from the pid. Under app.serve
+# worker N uses EMERGENCY_ID_NODE + N (or a random per-host base + N).
+EMERGENCY_ID_GENERATOR = os.getenv("EMERGENCY_ID_GENERATOR", "sortable")
+EMERGENCY_ID_NODE = os.getenv("EMERGENCY_ID_NODE")
+
+# Prometheus-style metrics at /metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+
+# On-demand request profiling. Off unless PROFILE_SAMPLE_RATE > 0 or
+# PROFILE_TOKEN is set; a request carrying "X-Profile-Token: <PROFILE_TOKEN>"
+# is always profiled. Files go to PROFILE_DIR, newest PROFILE_MAX_FILES kept.
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "0"))
+PROFILE_TOKEN = os.getenv("PROFILE_TOKEN", "")
+PROFILE_PATHS = os.getenv("PROFILE_PATHS", "/qr/,/auth/")
+PROFILE_DIR = os.getenv("PROFILE_DIR", "./profiles")
+PROFILE_FORMAT = os.getenv("PROFILE_FORMAT", "pstats")  # 'pstats' or 'collapsed'
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "100"))
+PROFILE_SAMPLE_INTERVAL = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.001"))
+
+# Server-Timing breakdown headers on responses under these path prefixes
+SERVER_TIMING_ENABLED = os.getenv("SERVER_TIMING_ENABLED", "1") == "1"
+SERVER_TIMING_PATHS = os.getenv("SERVER_TIMING_PATHS", "/qr/")
+
+# Startup warm-up of lazily initialized services (QR keys, codecs, PyJWT,
+# render workers): 'background' starts serving immediately and warms up
+# alongside, 'block' warms up before serving, 'off' leaves it to first use
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "background")
+
+# State every worker must agree on (revocations, profile versions, cache
+# invalidations, live-feed events): 'local' for a single process, 'database'
+# to pass changes between workers through the shared database, polled every
+# SHARED_STATE_POLL_INTERVAL seconds. app.serve switches to 'database'.
+SHARED_STATE = os.getenv("SHARED_STATE", "local")
+SHARED_STATE_POLL_INTERVAL = float(os.getenv("SHARED_STATE_POLL_INTERVAL", "0.2"))
+SHARED_STATE_RETENTION = float(os.getenv("SHARED_STATE_RETENTION", "3600"))
+# With 'database', /metrics adds up every worker's samples; workers store
+# theirs this often, and on every scrape they answer
+SHARED_METRICS_INTERVAL = float(os.getenv("SHARED_METRICS_INTERVAL", "5"))
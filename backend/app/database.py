@@ -1,19 +1,58 @@
-from sqlalchemy import create_engine
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import partial
+
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
-import os
 
-# For development - use SQLite
-SQLALCHEMY_DATABASE_URL = "sqlite:///./emergency_healthcare.db"
+from app import config
+from app.services import server_timing
 
-engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
-)
+SQLALCHEMY_DATABASE_URL = config.DATABASE_URL
+IS_SQLITE = SQLALCHEMY_DATABASE_URL.startswith("sqlite")
+
+engine_kwargs = {}
+if IS_SQLITE:
+    engine_kwargs["connect_args"] = {"check_same_thread": False}
+if ":memory:" not in SQLALCHEMY_DATABASE_URL:
+    engine_kwargs.update(
+        pool_size=config.DB_POOL_SIZE,
+        max_overflow=config.DB_MAX_OVERFLOW,
+        pool_timeout=config.DB_POOL_TIMEOUT,
+        pool_pre_ping=not IS_SQLITE,
+    )
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_kwargs)
 
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if IS_SQLITE:
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL lets readers proceed while a writer commits; NORMAL sync is
+        # durable across app crashes and far cheaper than FULL under WAL.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={config.SQLITE_BUSY_TIMEOUT_MS}")
+        cursor.execute(f"PRAGMA cache_size=-{config.SQLITE_CACHE_SIZE_KB}")
+        cursor.execute(f"PRAGMA mmap_size={config.SQLITE_MMAP_SIZE}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine, expire_on_commit=False)
 
 Base = declarative_base()
 
+# One worker thread per pooled connection, so offloaded calls never queue
+# on the pool while holding a thread.
+db_executor = ThreadPoolExecutor(
+    max_workers=config.DB_POOL_SIZE + config.DB_MAX_OVERFLOW
+    if ":memory:" not in SQLALCHEMY_DATABASE_URL else 1,
+    thread_name_prefix="db",
+)
+
 def get_db():
     db = SessionLocal()
     try:
@@ -21,5 +60,28 @@ def get_db():
     finally:
         db.close()
 
+@contextmanager
+def session_scope():
+    """Session that commits on success and rolls back on error."""
+    db = SessionLocal()
+    try:
+        yield db
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+async def run_db(fn, *args, **kwargs):
+    """Run blocking database code on the DB worker threads, off the event loop."""
+    with server_timing.timed("db"):
+        return await asyncio.get_running_loop().run_in_executor(db_executor, partial(fn, *args, **kwargs))
+
 def create_tables():
-    Base.metadata.create_all(bind=engine)
\ No newline at end of file
+    from app import models  # noqa: F401 - registers the tables on Base
+    Base.metadata.create_all(bind=engine)
+    # create_all skips indexes added to tables that already exist
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
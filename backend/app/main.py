@@ -1,21 +1,107 @@
-﻿from fastapi import FastAPI
+﻿import asyncio
+from datetime import datetime
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
-from app.routes import auth, qr_routes
+from contextlib import asynccontextmanager
+from starlette.concurrency import run_in_threadpool
+from app import config
+from app.middleware import MetricsMiddleware, ProfilingMiddleware, ServerTimingMiddleware
+from app.database import create_tables, engine, run_db
+from app.routes import auth, qr_routes, emergency_routes
+from app.routes import main as user_routes
+from app.services.qr_service import QR_LIFETIME, qr_service
+from app.services.key_ring import check_key_config
+from app.services.render_pool import render_executor
+from app.services.password_hasher import password_hasher
+from app.services.event_outbox import event_outbox
+from app.services.expiry_sweeper import expiry_sweeper
+from app.services.broadcaster import emergency_broadcaster
+from app.services.request_profiler import request_profiler
+from app.services.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE
+from app.services.spatial_index import emergency_locations, load_active_locations, parse_coordinates
+from app.services.shared_state import change_feed, load_revocations, shared_metrics
 
-app = FastAPI(title="Emergency Healthcare API", version="1.0.0")
+def warm_services():
+    qr_service.warm()
+    import jwt  # noqa: F401 - so the first login doesn't pay for the import
+
+async def warm_up():
+    """Do the lazy initialization now instead of in the first requests."""
+    await asyncio.gather(run_in_threadpool(warm_services), render_executor.warm())
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if config.STARTUP_WARMUP not in ("background", "block", "off"):
+        raise ValueError(f"Unknown STARTUP_WARMUP: {config.STARTUP_WARMUP}")
+    check_key_config()
+    await run_db(create_tables)
+    await run_db(auth.seed_demo_users)
+    event_outbox.start()
+    for row in await run_db(load_active_locations):
+        coordinates = parse_coordinates({"lat": row.location_lat, "lng": row.location_lng})
+        if coordinates:
+            emergency_locations.add(row.emergency_id, *coordinates, row.patient_id, row.expires_at)
+    expiry_sweeper.add_listener(emergency_locations.remove_many)
+    await expiry_sweeper.start()
+    for emergency_id in await run_db(load_revocations, datetime.now() - QR_LIFETIME):
+        qr_routes.apply_revocation(emergency_id)
+    await change_feed.start()
+    await shared_metrics.start()
+    # In the background it overlaps serving rather than the startup above
+    warmup = asyncio.ensure_future(warm_up()) if config.STARTUP_WARMUP == "background" else None
+    if config.STARTUP_WARMUP == "block":
+        await warm_up()
+    yield
+    if warmup is not None:
+        await warmup
+    await change_feed.stop()
+    await shared_metrics.stop()
+    emergency_broadcaster.close()
+    await expiry_sweeper.stop()
+    await event_outbox.stop()
+    render_executor.shutdown()
+    password_hasher.shutdown()
+    engine.dispose()
+
+app = FastAPI(title="Emergency Healthcare API", version="1.0.0", lifespan=lifespan)
+
+ALLOWED_ORIGINS = ["http://localhost:3000", "http://127.0.0.1:3000", "http://10.25.19.50:3000"]
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000", "http://10.25.19.50:3000"],
+    allow_origins=ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+if config.SERVER_TIMING_ENABLED:
+    app.add_middleware(
+        ServerTimingMiddleware,
+        paths=[path for path in config.SERVER_TIMING_PATHS.split(",") if path],
+        allow_origins=ALLOWED_ORIGINS,
+    )
+
+# Not installed at all unless profiling is configured
+if config.PROFILE_TOKEN or config.PROFILE_SAMPLE_RATE > 0:
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=request_profiler,
+        paths=[path for path in config.PROFILE_PATHS.split(",") if path],
+        token=config.PROFILE_TOKEN,
+        sample_rate=config.PROFILE_SAMPLE_RATE,
+    )
+
+# Added last so it is outermost and times the whole stack
+if config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routes
 app.include_router(auth.router)
 app.include_router(qr_routes.router)
+app.include_router(emergency_routes.router)
+app.include_router(user_routes.router)
 
 @app.get("/")
 async def root():
@@ -25,9 +111,10 @@ async def root():
 async def health():
     return {"status": "healthy", "service": "emergency-healthcare"}
 
-# Import and initialize QR service
-from app.services.qr_service import qr_service
-print("✅ QR service imported successfully!")
+@app.get("/metrics", include_in_schema=False)
+async def metrics():
+    # Summed over all workers when they share state (see app.serve)
+    return Response(content=await shared_metrics.render(), headers={"Content-Type": METRICS_CONTENT_TYPE})
 
 if __name__ == "__main__":
     import uvicorn
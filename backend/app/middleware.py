@@ -0,0 +1,150 @@
+import hmac
+import random
+import time
+
+from app.services import server_timing
+from app.services.metrics import http_request_seconds
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+class MetricsMiddleware:
+    """Records HTTP latency per method, route template and status.
+
+    A plain ASGI middleware rather than ``BaseHTTPMiddleware``, so streamed
+    responses pass straight through. Routes are labelled by their template
+    (``/qr/{emergency_id}/image``), never the raw path, to keep the label set
+    bounded; requests that match no route share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._templates = {}
+
+    def _route_template(self, scope):
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        template = self._templates.get(endpoint)
+        if template is None:
+            router = scope.get("router")
+            for route in getattr(router, "routes", ()):
+                if getattr(route, "endpoint", None) is endpoint:
+                    template = route.path
+                    break
+            else:
+                template = UNMATCHED_ROUTE
+            self._templates[endpoint] = template
+        return template
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            # The router fills in scope["endpoint"] on the way down
+            route = self._route_template(scope)
+            http_request_seconds.labels(scope["method"], route, str(status)).observe(
+                time.perf_counter() - start
+            )
+
+
+class ProfilingMiddleware:
+    """Profiles selected requests under ``paths`` with a ``RequestProfiler``.
+
+    A request is profiled when it sends ``X-Profile-Token`` matching
+    ``token`` (``X-Profile-Format`` may then pick the output format) or when
+    it falls in the random ``sample_rate`` fraction. The file name comes back
+    in ``X-Profile-File``. Only install this when profiling is configured;
+    it is not meant to sit in the stack doing nothing.
+    """
+
+    def __init__(self, app, profiler, paths, token="", sample_rate=0.0):
+        self.app = app
+        self.profiler = profiler
+        self.paths = tuple(paths)
+        self.token = token.encode()
+        self.sample_rate = sample_rate
+
+    def _requested_format(self, scope):
+        """None if the request should not be profiled, else a format or ''."""
+        if not scope["path"].startswith(self.paths):
+            return None
+        if self.token:
+            headers = dict(scope["headers"])
+            supplied = headers.get(b"x-profile-token")
+            if supplied is not None and hmac.compare_digest(supplied, self.token):
+                return headers.get(b"x-profile-format", b"").decode("latin-1")
+        if self.sample_rate and random.random() < self.sample_rate:
+            return ""
+        return None
+
+    async def __call__(self, scope, receive, send):
+        output_format = self._requested_format(scope) if scope["type"] == "http" else None
+        session = None
+        if output_format is not None:
+            session = self.profiler.begin(scope["method"], scope["path"], output_format or None)
+        if session is None:
+            await self.app(scope, receive, send)
+            return
+
+        async def send_with_filename(message):
+            if message["type"] == "http.response.start":
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-file", session.filename.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_filename)
+        finally:
+            self.profiler.end(session)
+
+
+class ServerTimingMiddleware:
+    """Adds a ``Server-Timing`` header to responses under ``paths``.
+
+    Starts a ``server_timing`` context for the request, which the QR service,
+    render pool and ``run_db`` record into, and adds ``total`` (time to the
+    response start) when the headers go out. Listed origins also get
+    ``Timing-Allow-Origin`` so the page can read the timings, not just
+    devtools.
+    """
+
+    def __init__(self, app, paths, allow_origins=()):
+        self.app = app
+        self.paths = tuple(paths)
+        self.allow_origins = {origin.encode() for origin in allow_origins}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not scope["path"].startswith(self.paths):
+            await self.app(scope, receive, send)
+            return
+
+        origin = dict(scope["headers"]).get(b"origin")
+        timing = server_timing.start()
+        start = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                timing.add("total", time.perf_counter() - start)
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", timing.header().encode()))
+                if origin in self.allow_origins:
+                    headers.append((b"timing-allow-origin", origin))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        await self.app(scope, receive, send_with_timing)
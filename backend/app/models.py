@@ -1,9 +1,8 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Boolean, Text
-from sqlalchemy.ext.declarative import declarative_base
+from sqlalchemy import Column, Integer, String, DateTime, JSON, Boolean, Text, ForeignKey, Index
 from sqlalchemy.sql import func
 from datetime import datetime
 
-Base = declarative_base()
+from app.database import Base
 
 class User(Base):
     __tablename__ = "users"
@@ -22,7 +21,7 @@ class PatientProfile(Base):
     __tablename__ = "patient_profiles"
     
     id = Column(Integer, primary_key=True, index=True)
-    user_id = Column(Integer, ForeignKey('users.id'))
+    user_id = Column(Integer, ForeignKey('users.id'), unique=True, index=True)
     
     # Medical Information
     blood_type = Column(String)  # 'A+', 'O-', etc.
@@ -45,16 +44,56 @@ class PatientProfile(Base):
     created_at = Column(DateTime, default=func.now())
     updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
 
+class ResponderProfile(Base):
+    __tablename__ = "responder_profiles"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey('users.id'), unique=True, index=True)
+    badge_number = Column(String)
+    organization = Column(String)
+    
+    created_at = Column(DateTime, default=func.now())
+    updated_at = Column(DateTime, default=func.now(), onupdate=func.now())
+
 class EmergencyEvent(Base):
     __tablename__ = "emergency_events"
     
     id = Column(Integer, primary_key=True, index=True)
-    emergency_id = Column(String, unique=True, index=True)  # EMG20241108123045ABC123
-    patient_id = Column(Integer, ForeignKey('users.id'))
+    emergency_id = Column(String, unique=True, index=True)  # EMG20241108123045123 + 6 chars, see emergency_ids
+    patient_id = Column(Integer, ForeignKey('users.id'), index=True)
     qr_data = Column(Text)  # Encrypted QR data
     location_lat = Column(String)
     location_lng = Column(String)
-    status = Column(String)  # 'active', 'resolved', 'cancelled'
+    status = Column(String)  # 'active', 'resolved', 'cancelled', 'expired'
     created_at = Column(DateTime, default=func.now())
     resolved_at = Column(DateTime)
-    expires_at = Column(DateTime)
\ No newline at end of file
+    expires_at = Column(DateTime)
+    
+    # Serves the expiry sweep and "active emergencies" queries
+    __table_args__ = (
+        Index("ix_emergency_events_status_expires_at", "status", "expires_at"),
+    )
+
+class RevokedEmergency(Base):
+    __tablename__ = "revoked_emergencies"
+    
+    emergency_id = Column(String, primary_key=True)
+    revoked_at = Column(DateTime, default=func.now(), index=True)
+
+class SharedChange(Base):
+    """Cross-worker change feed, see app/services/shared_state.py."""
+    __tablename__ = "shared_changes"
+    
+    id = Column(Integer, primary_key=True)
+    origin = Column(String)  # host:pid of the worker that made the change
+    kind = Column(String)
+    data = Column(JSON)
+    created_at = Column(DateTime, default=func.now(), index=True)
+
+class MetricsSnapshot(Base):
+    """Latest /metrics samples of each worker, see app/services/shared_state.py."""
+    __tablename__ = "metrics_snapshots"
+    
+    worker = Column(String, primary_key=True)  # host:pid
+    data = Column(JSON)
+    updated_at = Column(DateTime, default=func.now())
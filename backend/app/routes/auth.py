@@ -1,12 +1,13 @@
-﻿from fastapi import APIRouter, HTTPException
+﻿from fastapi import APIRouter, Depends, HTTPException
 from pydantic import BaseModel
-import jwt
 from datetime import datetime
+from app.database import run_db
+from app.services.user_repository import user_repository
+from app.services.password_hasher import password_hasher, HasherBusy
+from app.services.auth_tokens import create_access_token, get_current_user, require_role
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
-SECRET_KEY = "emergency-healthcare-secret-key-2024"
-
 class UserLogin(BaseModel):
     email: str
     password: str
@@ -17,11 +18,36 @@ class UserRegister(BaseModel):
     first_name: str
     last_name: str
     phone: str
-    user_type: str
+    user_type: str = "patient"
+
+class ResponderRegister(BaseModel):
+    email: str
+    password: str
+    first_name: str
+    last_name: str
+    phone: str
+    badge_number: str
+    organization: str
+
+# Only patients can sign themselves up; a responder token unlocks other
+# patients' medical data, so responder accounts come from /auth/responders
+SELF_REGISTER_USER_TYPES = ("patient",)
+
+EMPTY_MEDICAL_INFO = {
+    "blood_type": "",
+    "allergies": [],
+    "conditions": [],
+    "medications": [],
+    "emergency_contact": {
+        "name": "",
+        "phone": "",
+        "relationship": ""
+    }
+}
 
-# Simple in-memory user storage (replace with database later)
-users_db = {
-    "demo@patient.com": {
+# Demo accounts, inserted at startup if missing
+DEMO_USERS = [
+    {
         "id": 1,
         "email": "demo@patient.com",
         "password": "demo123",
@@ -41,7 +67,7 @@ users_db = {
             }
         }
     },
-    "demo@responder.com": {
+    {
         "id": 2,
         "email": "demo@responder.com",
         "password": "demo123",
@@ -52,18 +78,36 @@ users_db = {
         "badge_number": "RES123",
         "organization": "City Emergency Services"
     }
-}
+]
 
-def create_access_token(data: dict):
-    return jwt.encode(data, SECRET_KEY, algorithm="HS256")
+def seed_demo_users():
+    def prepare(user):
+        fields = {k: v for k, v in user.items() if k != "password"}
+        fields["password_hash"] = password_hasher.hash(user["password"])
+        return fields
+    user_repository.ensure_users(DEMO_USERS, prepare)
 
 @router.post("/login")
 async def login(login_data: UserLogin):
-    user = users_db.get(login_data.email)
+    user = await run_db(user_repository.get_by_email, login_data.email)
+    stored_hash = user["password_hash"] if user else None
     
-    if not user or user["password"] != login_data.password:
+    # Unknown emails still pay for a verify so timing doesn't leak accounts
+    try:
+        valid = await password_hasher.verify_async(login_data.password, stored_hash)
+    except HasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    if not user or not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
+    # Upgrade legacy or outdated hashes transparently
+    if password_hasher.needs_rehash(stored_hash):
+        try:
+            new_hash = await password_hasher.hash_async(login_data.password)
+            await run_db(user_repository.set_password_hash, user["id"], new_hash)
+        except HasherBusy:
+            pass  # try again on a later login
+    
     access_token = create_access_token({
         "sub": user["email"],
         "user_id": user["id"],
@@ -80,33 +124,35 @@ async def login(login_data: UserLogin):
         "email": user["email"]
     }
 
+async def create_user(user_data, user_type, **extra):
+    """Hash the password and store a new account; the repository assigns the id atomically."""
+    try:
+        password_hash = await password_hasher.hash_async(user_data.password)
+    except HasherBusy as e:
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "1"})
+    
+    try:
+        return await run_db(user_repository.create, {
+            "email": user_data.email,
+            "password_hash": password_hash,
+            "first_name": user_data.first_name,
+            "last_name": user_data.last_name,
+            "phone": user_data.phone,
+            "user_type": user_type,
+            **extra
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("/register")
 async def register(user_data: UserRegister):
-    if user_data.email in users_db:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Create new user
-    new_user_id = max([user["id"] for user in users_db.values()]) + 1
-    users_db[user_data.email] = {
-        "id": new_user_id,
-        "email": user_data.email,
-        "password": user_data.password,
-        "first_name": user_data.first_name,
-        "last_name": user_data.last_name,
-        "phone": user_data.phone,
-        "user_type": user_data.user_type,
-        "medical_info": {
-            "blood_type": "",
-            "allergies": [],
-            "conditions": [],
-            "medications": [],
-            "emergency_contact": {
-                "name": "",
-                "phone": "",
-                "relationship": ""
-            }
-        }
-    }
+    if user_data.user_type not in SELF_REGISTER_USER_TYPES:
+        raise HTTPException(
+            status_code=403,
+            detail="Only patient accounts can be self-registered; responder accounts are created by a responder"
+        )
+    new_user = await create_user(user_data, user_data.user_type, medical_info=EMPTY_MEDICAL_INFO)
+    new_user_id = new_user["id"]
     
     access_token = create_access_token({
         "sub": user_data.email,
@@ -124,6 +170,31 @@ async def register(user_data: UserRegister):
         "email": user_data.email
     }
 
+@router.post("/responders")
+async def register_responder(user_data: ResponderRegister, claims: dict = Depends(require_role("responder"))):
+    """Create a responder account. No token is returned: the new responder logs in themselves."""
+    new_user = await create_user(
+        user_data, "responder",
+        badge_number=user_data.badge_number,
+        organization=user_data.organization
+    )
+    return {
+        "user_id": new_user["id"],
+        "user_type": "responder",
+        "first_name": user_data.first_name,
+        "last_name": user_data.last_name,
+        "email": user_data.email,
+        "created_by": claims["user_id"]
+    }
+
+@router.get("/me")
+async def me(claims: dict = Depends(get_current_user)):
+    return {
+        "user_id": claims["user_id"],
+        "email": claims["sub"],
+        "user_type": claims["user_type"]
+    }
+
 @router.get("/health")
 async def health_check():
-    return {"status": "ok", "message": "Auth service is running"}
+    return {"status": "ok", "message": "Auth service is running", "password_hasher": password_hasher.stats()}
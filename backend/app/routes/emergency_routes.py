@@ -0,0 +1,97 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
+from datetime import datetime
+from typing import Optional
+from app import config
+from app.database import run_db, session_scope
+from app.models import EmergencyEvent
+from app.services.auth_tokens import get_stream_user, require_role
+from app.services.broadcaster import emergency_broadcaster, TooManySubscribers
+from app.services.expiry_sweeper import expiry_sweeper
+from app.services.spatial_index import emergency_locations
+
+router = APIRouter(prefix="/emergencies", tags=["emergencies"])
+
+def _event_to_dict(event):
+    return {
+        "emergency_id": event.emergency_id,
+        "patient_id": event.patient_id,
+        "status": event.status,
+        "location": {"lat": event.location_lat, "lng": event.location_lng},
+        "created_at": event.created_at.isoformat() if event.created_at else None,
+        "expires_at": event.expires_at.isoformat() if event.expires_at else None
+    }
+
+def _load_active(limit):
+    # Range scan on ix_emergency_events_status_expires_at
+    with session_scope() as db:
+        events = (
+            db.query(EmergencyEvent)
+            .filter(EmergencyEvent.status == "active", EmergencyEvent.expires_at > datetime.now())
+            .order_by(EmergencyEvent.expires_at)
+            .limit(limit)
+            .all()
+        )
+        return [_event_to_dict(event) for event in events]
+
+@router.get("/active")
+async def list_active_emergencies(
+    limit: int = Query(100, ge=1, le=1000),
+    claims: dict = Depends(require_role("responder")),
+):
+    events = await run_db(_load_active, limit)
+    return {"count": len(events), "emergencies": events}
+
+@router.get("/nearby")
+async def nearby_emergencies(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius: float = Query(5000, gt=0, le=config.NEARBY_MAX_RADIUS_M, description="meters"),
+    limit: int = Query(100, ge=1, le=1000),
+    claims: dict = Depends(require_role("responder")),
+):
+    """Active emergencies within ``radius`` meters, nearest first."""
+    events = emergency_locations.nearby(lat, lng, radius, limit)
+    return {"count": len(events), "emergencies": events}
+
+async def _live_feed(subscription):
+    try:
+        yield "retry: 5000\n\n"
+        while not subscription.closed:
+            frames = await subscription.next_frames(config.BROADCAST_HEARTBEAT_SECONDS)
+            # An SSE comment keeps proxies from timing out idle connections
+            yield "".join(frames) if frames else ": keep-alive\n\n"
+    finally:
+        emergency_broadcaster.unsubscribe(subscription)
+
+@router.get("/stream")
+async def stream_emergencies(
+    lat: Optional[float] = Query(None, ge=-90, le=90),
+    lng: Optional[float] = Query(None, ge=-180, le=180),
+    radius: float = Query(10000, gt=0, le=config.NEARBY_MAX_RADIUS_M, description="meters"),
+    claims: dict = Depends(get_stream_user),
+):
+    """Server-Sent Events feed of emergencies created or scanned near a point.
+    
+    Without ``lat``/``lng`` the feed covers every region. Filtering is by
+    region cell, so events slightly outside ``radius`` may be included.
+    """
+    if claims.get("user_type") != "responder":
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+    try:
+        subscription = emergency_broadcaster.subscribe(lat, lng, radius)
+    except TooManySubscribers as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return StreamingResponse(
+        _live_feed(subscription),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@router.get("/stream-stats")
+async def stream_stats():
+    return emergency_broadcaster.stats()
+
+@router.get("/sweeper-stats")
+async def sweeper_stats():
+    return {**expiry_sweeper.stats(), "spatial_index": emergency_locations.stats()}
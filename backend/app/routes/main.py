@@ -1,41 +1,120 @@
-from fastapi import APIRouter, Depends, HTTPException
-from sqlalchemy.orm import Session
-from typing import Dict, Any
+from fastapi import APIRouter, Depends, Header, HTTPException, Response
+from pydantic import BaseModel, ConfigDict
+from datetime import datetime
+from typing import List, Optional, Union
 
-from ..database import get_db
-from ..models import User, PatientProfile, ResponderProfile
+from ..database import run_db
+from ..services.auth_tokens import get_current_user
+from ..services.medical_summary_cache import medical_summaries
+from ..services.profile_versions import profile_versions
+from ..services.shared_state import change_feed
+from ..services.user_repository import user_repository
 
 router = APIRouter()
 
-# Import other routes
-from .qr_routes import router as qr_router
-from .nlp_routes import router as nlp_router
+class UserSummary(BaseModel):
+    id: int
+    email: str
+    first_name: Optional[str] = None
+    last_name: Optional[str] = None
+    phone: Optional[str] = None
+    user_type: Optional[str] = None
 
-# Include all routers
-router.include_router(qr_router)
-router.include_router(nlp_router)
+# extra="forbid" lets the profile Union pick the right model by its fields
+class PatientProfileOut(BaseModel):
+    model_config = ConfigDict(extra="forbid")
 
-@router.get("/")
-async def root():
-    return {"message": "Emergency Healthcare API", "status": "active"}
+    blood_type: Optional[str] = None
+    allergies: Optional[List[str]] = None
+    medical_conditions: Optional[List[str]] = None
+    current_medications: Optional[List[str]] = None
+    emergency_contact_name: Optional[str] = None
+    emergency_contact_phone: Optional[str] = None
+    emergency_contact_relationship: Optional[str] = None
+    date_of_birth: Optional[str] = None
+    height: Optional[str] = None
+    weight: Optional[str] = None
+    primary_physician: Optional[str] = None
+    physician_phone: Optional[str] = None
+    insurance_provider: Optional[str] = None
+    insurance_id: Optional[str] = None
+    updated_at: Optional[datetime] = None
 
-@router.get("/user/{user_id}/profile")
-async def get_user_profile(user_id: int, db: Session = Depends(get_db)):
-    """Get user profile with medical information"""
-    user = db.query(User).filter(User.id == user_id).first()
-    if not user:
+class ResponderProfileOut(BaseModel):
+    model_config = ConfigDict(extra="forbid")
+
+    badge_number: Optional[str] = None
+    organization: Optional[str] = None
+    updated_at: Optional[datetime] = None
+
+class UserProfileResponse(BaseModel):
+    user: UserSummary
+    profile: Optional[Union[PatientProfileOut, ResponderProfileOut]] = None
+
+class EmergencyContact(BaseModel):
+    name: str = ""
+    phone: str = ""
+    relationship: str = ""
+
+class MedicalInfoUpdate(BaseModel):
+    blood_type: str = ""
+    allergies: List[str] = []
+    conditions: List[str] = []
+    medications: List[str] = []
+    emergency_contact: EmergencyContact = EmergencyContact()
+
+def apply_medical_info_change(change):
+    """Forget cached copies of a user's medical info, here or after another worker's write."""
+    profile_versions.bump(change["user_id"])
+    medical_summaries.invalidate(change["user_id"])
+
+change_feed.subscribe("user.medical_info", apply_medical_info_change)
+
+def _check_access(claims, user_id):
+    if claims["user_id"] != user_id and claims["user_type"] != "responder":
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+@router.get("/user/{user_id}/profile", response_model=UserProfileResponse)
+async def get_user_profile(user_id: int, response: Response,
+                           if_none_match: Optional[str] = Header(None),
+                           claims: dict = Depends(get_current_user)):
+    """Get user profile with medical information.
+
+    Responses carry an ETag from the profile's version counter; a matching
+    If-None-Match is answered with 304 before any database access.
+    """
+    _check_access(claims, user_id)
+
+    etag = profile_versions.etag(user_id)
+    headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+    if profile_versions.matches(user_id, if_none_match):
+        return Response(status_code=304, headers=headers)
+
+    profile = await run_db(user_repository.get_profile, user_id)
+    if not profile:
         raise HTTPException(status_code=404, detail="User not found")
-    
-    if user.user_type == "patient":
-        profile = db.query(PatientProfile).filter(PatientProfile.user_id == user_id).first()
-    else:
-        profile = db.query(ResponderProfile).filter(ResponderProfile.user_id == user_id).first()
-    
-    return {
-        "user": {
-            "id": user.id,
-            "email": user.email,
-            "user_type": user.user_type
-        },
-        "profile": profile
-    }
\ No newline at end of file
+
+    response.headers.update(headers)
+    return profile
+
+@router.put("/user/{user_id}/medical-info", response_model=UserProfileResponse)
+async def update_medical_info(user_id: int, medical_info: MedicalInfoUpdate, response: Response,
+                              claims: dict = Depends(get_current_user)):
+    """Replace the caller's own medical information."""
+    if claims["user_id"] != user_id:
+        raise HTTPException(status_code=403, detail="Insufficient permissions")
+
+    updated = await run_db(user_repository.update_medical_info, user_id, medical_info.model_dump())
+    if not updated:
+        raise HTTPException(status_code=404, detail="Patient profile not found")
+    apply_medical_info_change({"user_id": user_id})
+    change_feed.publish("user.medical_info", {"user_id": user_id})
+
+    etag = profile_versions.etag(user_id)
+    profile = await run_db(user_repository.get_profile, user_id)
+    response.headers.update({"ETag": etag, "Cache-Control": "private, no-cache"})
+    return profile
+
+@router.get("/user/profile-stats")
+async def profile_stats():
+    return profile_versions.stats()
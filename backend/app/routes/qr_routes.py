@@ -1,7 +1,25 @@
-﻿from fastapi import APIRouter, Depends, HTTPException
+﻿from fastapi import APIRouter, Depends, HTTPException, Header, Query, Response
+from fastapi.responses import StreamingResponse
+from starlette.concurrency import run_in_threadpool
+import asyncio
 import base64
+from datetime import datetime
+from typing import List, Literal, Optional
 from pydantic import BaseModel
+from app import config
 from app.services.qr_service import qr_service
+from app.services.render_pool import render_executor, RenderQueueFull
+from app.services.qr_image_cache import qr_image_cache
+from app.services.batch_export import stream_ndjson, stream_zip
+from app.services.medical_summary_cache import medical_summaries
+from app.services.auth_tokens import require_role
+from app.database import run_db
+from app.services.event_outbox import event_outbox, emergency_event_row, load_active_qr
+from app.services.expiry_sweeper import expiry_sweeper
+from app.services.spatial_index import emergency_locations, parse_coordinates
+from app.services.broadcaster import emergency_broadcaster
+from app.services import server_timing
+from app.services.shared_state import change_feed, save_revocation
 
 router = APIRouter(prefix="/qr", tags=["qr-codes"])
 
@@ -12,57 +30,210 @@ class EmergencyRequest(BaseModel):
 class QRScanRequest(BaseModel):
     encrypted_data: str
 
+class QRScanBatchRequest(BaseModel):
+    items: List[str]
+
+class BatchEmergencyRequest(BaseModel):
+    items: List[EmergencyRequest]
+    output: Literal["ndjson", "zip"] = "ndjson"
+    image_format: Literal["png", "svg"] = "png"
+
+IMAGE_MEDIA_TYPES = {"png": "image/png", "svg": "image/svg+xml"}
+DEFAULT_SCALE = 5
+
+def negotiate_image_kind(accept):
+    """Pick 'png' or 'svg' from an Accept header, honouring q-values.
+
+    q=0 refuses a type, including one a wildcard would otherwise match.
+    Returns None when neither is acceptable.
+    """
+    if not accept:
+        return "png"
+    explicit, wildcard_q = {}, 0.0
+    for item in accept.split(","):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        q = min(max(q, 0.0), 1.0)
+        if media_type == "image/svg+xml":
+            explicit["svg"] = q
+        elif media_type == "image/png":
+            explicit["png"] = q
+        elif media_type in ("image/*", "*/*"):
+            wildcard_q = max(wildcard_q, q)
+    best_kind, best_rank = None, None
+    for kind in ("png", "svg"):
+        q = explicit.get(kind, wildcard_q)
+        if q <= 0:
+            continue
+        # Prefer an explicit type over a wildcard at the same q, then PNG
+        rank = (q, kind in explicit)
+        if best_rank is None or rank > best_rank:
+            best_kind, best_rank = kind, rank
+    return best_kind
+
+def record_emergency_event(qr_data, user_id, location, announce=True):
+    """Queue the EmergencyEvent row, schedule its expiry and index its location.
+
+    ``announce`` also tells live-feed subscribers and the other workers; it
+    is off for pre-issued batch cards, which aren't live emergencies.
+    """
+    row = emergency_event_row(qr_data, user_id, location)
+    event_outbox.enqueue(row)
+    expiry_sweeper.track(row["emergency_id"], row["expires_at"])
+    coordinates = parse_coordinates(location)
+    if coordinates:
+        emergency_locations.add(row["emergency_id"], *coordinates, user_id, row["expires_at"])
+    event = {
+        "emergency_id": row["emergency_id"],
+        "patient_id": user_id,
+        "location": location,
+        "expires_at": qr_data["expires_at"]
+    }
+    if announce:
+        emergency_broadcaster.publish("emergency.created", event, coordinates)
+        change_feed.publish("emergency.created", event)
+
+def apply_emergency_created(event):
+    """Index and announce an emergency generated by another worker."""
+    coordinates = parse_coordinates(event["location"])
+    if coordinates:
+        expires_at = datetime.fromisoformat(event["expires_at"])
+        emergency_locations.add(event["emergency_id"], *coordinates, event["patient_id"], expires_at)
+        expiry_sweeper.track(event["emergency_id"], expires_at)
+    emergency_broadcaster.publish("emergency.created", event, coordinates)
+
+def publish_scan(payload, claims):
+    """Tell live-feed subscribers that a responder has picked up an emergency."""
+    location = payload.get("location")
+    event = {
+        "emergency_id": payload.get("emergency_id"),
+        "patient_id": payload.get("user_id"),
+        "location": location,
+        "scanned_by": claims.get("user_id"),
+        "scanned_at": datetime.now().isoformat()
+    }
+    emergency_broadcaster.publish("emergency.scanned", event, parse_coordinates(location))
+    change_feed.publish("emergency.scanned", event)
+
+def apply_emergency_scanned(event):
+    emergency_broadcaster.publish("emergency.scanned", event, parse_coordinates(event["location"]))
+
+def apply_revocation(emergency_id):
+    """Stop accepting an emergency QR in this process."""
+    qr_service.revoke(emergency_id)
+    qr_image_cache.evict(emergency_id)
+    emergency_locations.remove(emergency_id)
+
+# Changes made by other workers (see app/services/shared_state.py)
+change_feed.subscribe("emergency.created", apply_emergency_created)
+change_feed.subscribe("emergency.scanned", apply_emergency_scanned)
+change_feed.subscribe("qr.revoked", lambda change: apply_revocation(change["emergency_id"]))
+
 @router.post("/generate-emergency")
 async def generate_emergency_qr(request: EmergencyRequest):
     try:
-        # For now, use demo medical data - you can connect to database later
-        medical_data = {
-            "blood_type": "O+",
-            "allergies": ["Penicillin", "Peanuts"],
-            "conditions": ["Asthma"],
-            "medications": ["Ventolin"],
-            "emergency_contact": {
-                "name": "Sarah Wilson",
-                "phone": "+1-555-0123",
-                "relationship": "Spouse"
-            }
-        }
+        # Cached and pre-packed; only a miss goes to the database
+        summary = await medical_summaries.get(request.user_id)
+        if summary is None:
+            raise HTTPException(status_code=404, detail="User not found")
         
         qr_data = qr_service.create_emergency_qr_data(
             user_id=request.user_id,
-            medical_data=medical_data,
+            medical_data=summary,
             location=request.location
         )
         
-        # Generate QR image
-        qr_image = qr_service.generate_qr_code_image(qr_data["qr_data"])
-        qr_base64 = base64.b64encode(qr_image.getvalue()).decode()
+        # Generate QR image off the event loop
+        qr_png = await render_executor.render(qr_data["qr_data"])
+        # Only once there is a QR to hand back: a rejected render must not
+        # leave an active emergency behind or alert responders
+        record_emergency_event(qr_data, request.user_id, request.location)
+        with server_timing.timed("b64"):
+            qr_base64 = base64.b64encode(qr_png).decode()
+        
+        # Seed the image cache so /qr/{emergency_id}/image doesn't re-render
+        qr_image_cache.register(qr_data["emergency_id"], qr_data["qr_data"], qr_data["expires_at"])
+        qr_image_cache.put(qr_data["emergency_id"], "png", DEFAULT_SCALE, None, qr_png)
         
         return {
             "success": True,
             "emergency_id": qr_data["emergency_id"],
             "qr_code": f"data:image/png;base64,{qr_base64}",
+            "qr_image_url": f"/qr/{qr_data['emergency_id']}/image",
             "expires_at": qr_data.get("expires_at", "")
         }
         
+    except RenderQueueFull as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/generate-batch")
+async def generate_emergency_qr_batch(request: BatchEmergencyRequest):
+    """Generate many QRs at once, streamed back as they finish rendering.
+    
+    Payloads are encrypted lazily as render slots free up, so only a small
+    window of the batch is in memory at any time.
+    """
+    if len(request.items) > config.QR_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch limited to {config.QR_BATCH_MAX_ITEMS} items"
+        )
+    
+    # Cache hits plus one IN query for the rest, instead of a lookup per item
+    summaries = await medical_summaries.get_many([item.user_id for item in request.items])
+    missing = sorted({item.user_id for item in request.items} - summaries.keys())
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Users not found: {missing[:20]}")
+    
+    def jobs():
+        for index, item in enumerate(request.items):
+            qr_data = qr_service.create_emergency_qr_data(
+                user_id=item.user_id,
+                medical_data=summaries[item.user_id],
+                location=item.location
+            )
+            qr_info = {**qr_data, "user_id": item.user_id, "location": item.location}
+            yield (index, qr_info), qr_data["qr_data"]
+    
+    async def recorded(results):
+        # Items whose render failed are reported with an error and not recorded
+        async for (index, qr_info), image in results:
+            if not isinstance(image, Exception):
+                record_emergency_event(qr_info, qr_info["user_id"], qr_info["location"], announce=False)
+                qr_image_cache.register(qr_info["emergency_id"], qr_info["qr_data"], qr_info["expires_at"])
+            yield (index, qr_info), image
+    
+    results = recorded(render_executor.render_many(jobs(), kind=request.image_format))
+    if request.output == "zip":
+        return StreamingResponse(
+            stream_zip(results, request.image_format),
+            media_type="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="emergency-qr-batch.zip"'},
+        )
+    return StreamingResponse(
+        stream_ndjson(results, request.image_format),
+        media_type="application/x-ndjson",
+    )
+
 @router.post("/scan")
-async def scan_qr_code(request: QRScanRequest):
+async def scan_qr_code(request: QRScanRequest, claims: dict = Depends(require_role("responder"))):
     try:
-        # Extract encrypted data from QR string if needed
-        if request.encrypted_data.startswith("EMERGENCY:"):
-            parts = request.encrypted_data.split(":")
-            if len(parts) >= 3:
-                encrypted_data = parts[2]
-            else:
-                raise HTTPException(status_code=400, detail="Invalid QR format")
-        else:
-            encrypted_data = request.encrypted_data
+        # Extract encrypted data from QR string if needed (v2 or legacy)
+        encrypted_data = qr_service.extract_encrypted_data(request.encrypted_data)
         
         # Validate and decrypt
         payload = qr_service.validate_qr_code(encrypted_data)
+        publish_scan(payload, claims)
         
         return {
             "success": True,
@@ -74,3 +245,95 @@ async def scan_qr_code(request: QRScanRequest):
         raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Scan failed: {str(e)}")
+
+@router.post("/scan-batch")
+async def scan_qr_code_batch(request: QRScanBatchRequest, claims: dict = Depends(require_role("responder"))):
+    """Decrypt many scanned QRs in one round trip.
+    
+    Items are split into chunks validated concurrently on the threadpool;
+    a bad item yields an error entry instead of failing the batch.
+    """
+    if len(request.items) > config.QR_SCAN_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413,
+            detail=f"Batch limited to {config.QR_SCAN_BATCH_MAX_ITEMS} items"
+        )
+    
+    chunk_size = config.QR_SCAN_BATCH_CHUNK
+    chunks = await asyncio.gather(*(
+        run_in_threadpool(qr_service.scan_many, request.items[i:i + chunk_size], i)
+        for i in range(0, len(request.items), chunk_size)
+    ))
+    results = [result for chunk in chunks for result in chunk]
+    scanned = 0
+    for result in results:
+        if result["success"]:
+            scanned += 1
+            publish_scan(result["emergency_data"], claims)
+    
+    return {
+        "success": True,
+        "scanned": scanned,
+        "failed": len(results) - scanned,
+        "results": results
+    }
+
+@router.post("/{emergency_id}/revoke")
+async def revoke_qr_code(emergency_id: str, claims: dict = Depends(require_role("responder"))):
+    apply_revocation(emergency_id)
+    # Persisted so it outlives this process, then passed on to the other workers
+    await run_db(save_revocation, emergency_id)
+    change_feed.publish("qr.revoked", {"emergency_id": emergency_id})
+    return {"success": True, "emergency_id": emergency_id, "message": "QR code revoked"}
+
+@router.get("/render-stats")
+async def render_stats():
+    return {**render_executor.stats(), "image_cache": qr_image_cache.stats()}
+
+@router.get("/event-stats")
+async def event_stats():
+    return {**event_outbox.stats(), "change_feed": change_feed.stats()}
+
+@router.get("/cache-stats")
+async def cache_stats():
+    return {
+        "payload_cache": qr_service.payload_cache.stats(),
+        "image_cache": qr_image_cache.stats(),
+        "medical_summary_cache": medical_summaries.stats()
+    }
+
+@router.get("/{emergency_id}/image")
+async def get_qr_image(
+    emergency_id: str,
+    scale: int = Query(DEFAULT_SCALE, ge=1, le=config.QR_IMAGE_MAX_SCALE),
+    border: Optional[int] = Query(None, ge=0, le=10),
+    accept: Optional[str] = Header(None),
+):
+    kind = negotiate_image_kind(accept)
+    if kind is None:
+        raise HTTPException(status_code=406, detail="Supported types: image/png, image/svg+xml")
+    
+    issued = qr_image_cache.lookup(emergency_id)
+    if issued is None and emergency_id not in qr_service.revoked:
+        # Issued by another worker or before a restart
+        issued = await run_db(load_active_qr, emergency_id)
+        if issued is not None:
+            qr_image_cache.register(emergency_id, *issued)
+    if issued is None:
+        raise HTTPException(status_code=404, detail="QR code not found or expired")
+    qr_data, expires_at = issued
+    
+    image = qr_image_cache.get(emergency_id, kind, scale, border)
+    if image is None:
+        try:
+            image = await render_executor.render(qr_data, scale=scale, kind=kind, border=border)
+        except RenderQueueFull as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        qr_image_cache.put(emergency_id, kind, scale, border, image)
+    
+    max_age = max(0, int((expires_at - datetime.now()).total_seconds()))
+    return Response(
+        content=image,
+        media_type=IMAGE_MEDIA_TYPES[kind],
+        headers={"Cache-Control": f"private, max-age={max_age}", "Vary": "Accept"},
+    )
@@ -0,0 +1,158 @@
+"""Pre-fork multi-worker server.
+
+The parent imports and warms the app once (tables, demo users, QR key
+derivation), binds the listening socket and forks ``--workers`` children
+that each run uvicorn on the shared socket, so the kernel spreads
+connections across them. Workers keep per-process caches but pass
+revocations, new emergencies and profile updates to each other, and
+/metrics totals, through the database (``SHARED_STATE=database``, see
+app/services/shared_state.py).
+Each worker slot has its own emergency id node, which a replacement for a
+dead worker keeps. Children that die are replaced.
+
+Run from the backend directory:
+
+    python -m app.serve --workers 4 --host 0.0.0.0 --port 8000
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import time
+
+logger = logging.getLogger("app.serve")
+
+# A worker that dies sooner than this after starting is restarted after a pause
+MIN_WORKER_LIFETIME = 1.0
+
+
+def _configure_environment(workers):
+    """Defaults that must be in place before app.config is imported."""
+    os.environ.setdefault("SHARED_STATE", "database")
+    if workers > 1 and os.environ["SHARED_STATE"] == "local":
+        raise SystemExit("SHARED_STATE=local can't be used with more than one worker")
+    # Share the cores between the workers' render and password hashing pools
+    per_worker = str(max(1, (os.cpu_count() or 1) // workers))
+    os.environ.setdefault("QR_RENDER_WORKERS", per_worker)
+    os.environ.setdefault("PASSWORD_HASH_WORKERS", per_worker)
+
+
+def _bind(host, port, backlog=2048):
+    family = socket.AF_INET6 if ":" in host else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Supervisor:
+    def __init__(self, app, sock, workers, log_level):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.log_level = log_level
+        # pid -> (worker slot, start time)
+        self.children = {}
+        self.stopping = False
+
+    def spawn(self, slot, respawn=False):
+        pid = os.fork()
+        if pid:
+            self.children[pid] = (slot, time.monotonic())
+            return pid
+        # Child: uvicorn installs its own SIGINT/SIGTERM handlers
+        signal.signal(signal.SIGINT, signal.SIG_DFL)
+        signal.signal(signal.SIGTERM, signal.SIG_DFL)
+        code = 0
+        try:
+            # Pids can collide modulo the node space; slots can't
+            from app.services.emergency_ids import assign_node, worker_node
+            assign_node(worker_node(slot))
+            if respawn:
+                # Its ETag counters start from zero, unlike its siblings'
+                from app.services.profile_versions import profile_versions
+                profile_versions.restart()
+            self._serve()
+        except BaseException:
+            logger.exception("worker %s failed", os.getpid())
+            code = 1
+        finally:
+            os._exit(code)
+
+    def _serve(self):
+        import uvicorn
+
+        config = uvicorn.Config(self.app, lifespan="on", log_level=self.log_level)
+        uvicorn.Server(config).run(sockets=[self.sock])
+
+    def stop(self, signum, frame):
+        self.stopping = True
+        for pid in list(self.children):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self.stop)
+        signal.signal(signal.SIGINT, self.stop)
+        for slot in range(self.workers):
+            self.spawn(slot)
+        logger.info("serving on %s with %d workers: %s",
+                    self.sock.getsockname()[:2], self.workers, sorted(self.children))
+        while self.children:
+            try:
+                pid, status = os.wait()
+            except ChildProcessError:
+                break
+            except InterruptedError:
+                continue
+            child = self.children.pop(pid, None)
+            if child is None or self.stopping:
+                continue
+            slot, started = child
+            logger.warning("worker %d exited with status %d, replacing it",
+                           pid, os.waitstatus_to_exitcode(status))
+            if time.monotonic() - started < MIN_WORKER_LIFETIME:
+                time.sleep(MIN_WORKER_LIFETIME)
+            if not self.stopping:
+                self.spawn(slot, respawn=True)
+        self.sock.close()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+    if args.workers < 1:
+        parser.error("--workers must be at least 1")
+    logging.basicConfig(level=args.log_level.upper(), format="%(levelname)s:     [serve] %(message)s")
+
+    _configure_environment(args.workers)
+    from app.database import create_tables, engine
+    from app.main import app, warm_services
+    from app.routes.auth import seed_demo_users
+    from app.services.shared_state import SharedMetrics
+
+    # Done once here so every worker inherits it instead of repeating it
+    create_tables()
+    seed_demo_users()
+    # A fresh start for the metrics totals, which scrapers read as a restart
+    SharedMetrics.clear()
+    warm_services()
+    # Connections must not be shared across fork
+    engine.dispose()
+
+    Supervisor(app, _bind(args.host, args.port), args.workers, args.log_level).run()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,122 @@
+import hashlib
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Query
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
+
+from app import config
+
+ALGORITHM = "HS256"
+
+
+# PyJWT is imported where it is used: it pulls in most of cryptography, which
+# the API process should not pay for at import time (see the startup warm-up)
+
+def create_access_token(data: dict):
+    import jwt
+    expires = datetime.now(timezone.utc) + timedelta(minutes=config.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return jwt.encode({**data, "exp": expires}, config.JWT_SECRET_KEY, algorithm=ALGORITHM)
+
+
+class TokenVerifier:
+    """Verifies HS256 access tokens, caching verified claims briefly.
+
+    Cache entries are keyed by a digest of the token and live for at most
+    ``ttl`` seconds and never past the token's own ``exp``, so a hot
+    responder session pays for one HMAC check per TTL instead of per request.
+    """
+
+    def __init__(self, secret_key=None, ttl=None, max_entries=None):
+        self.secret_key = secret_key or config.JWT_SECRET_KEY
+        self.ttl = config.AUTH_CLAIMS_CACHE_TTL if ttl is None else ttl
+        self.max_entries = max_entries or config.AUTH_CLAIMS_CACHE_SIZE
+        self._cache = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token):
+        """Return the token's claims or raise ``jwt.InvalidTokenError``."""
+        digest = hashlib.blake2b(token.encode(), digest_size=16).digest()
+        now = time.time()
+        cached = self._cache.get(digest)
+        if cached is not None and cached[1] > now:
+            self._cache.move_to_end(digest)
+            self.hits += 1
+            return cached[0]
+
+        self.misses += 1
+        import jwt
+        claims = jwt.decode(
+            token, self.secret_key, algorithms=[ALGORITHM], options={"require": ["exp"]}
+        )
+        if self.ttl > 0:
+            self._cache[digest] = (claims, min(now + self.ttl, claims["exp"]))
+            self._cache.move_to_end(digest)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return claims
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        return {
+            "entries": len(self._cache),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+token_verifier = TokenVerifier()
+bearer_scheme = HTTPBearer(auto_error=False)
+
+
+def _claims_or_401(token):
+    if not token:
+        raise HTTPException(
+            status_code=401, detail="Not authenticated", headers={"WWW-Authenticate": "Bearer"}
+        )
+    import jwt
+    try:
+        return token_verifier.verify(token)
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(
+            status_code=401, detail="Token has expired", headers={"WWW-Authenticate": "Bearer"}
+        )
+    except jwt.InvalidTokenError:
+        raise HTTPException(
+            status_code=401, detail="Invalid token", headers={"WWW-Authenticate": "Bearer"}
+        )
+
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+):
+    """FastAPI dependency returning the verified claims of the bearer token."""
+    return _claims_or_401(credentials.credentials if credentials else None)
+
+
+async def get_stream_user(
+    credentials: HTTPAuthorizationCredentials = Depends(bearer_scheme),
+    access_token: Optional[str] = Query(None),
+):
+    """Like ``get_current_user``, but also accepts ``?access_token=``.
+
+    Browsers' EventSource cannot send an Authorization header, so streaming
+    endpoints take the token from the query string as a fallback.
+    """
+    return _claims_or_401(credentials.credentials if credentials else access_token)
+
+
+def require_role(*user_types):
+    """Dependency factory: the caller's ``user_type`` must be one of ``user_types``."""
+    async def dependency(claims: dict = Depends(get_current_user)):
+        if claims.get("user_type") not in user_types:
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
+        return claims
+    return dependency
@@ -0,0 +1,70 @@
+import base64
+import json
+import zipfile
+
+
+class _ChunkBuffer:
+    """Write-only, non-seekable sink that zipfile streams into.
+
+    zipfile falls back to data descriptors when the target can't ``tell()``,
+    so each entry can be handed to the client as soon as it's written.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+IMAGE_EXTENSIONS = {"png": "png", "svg": "svg"}
+
+
+def _result_record(index, qr_info, image, kind):
+    record = {
+        "index": index,
+        "user_id": qr_info["user_id"],
+        "emergency_id": qr_info["emergency_id"],
+        "qr_data": qr_info["qr_data"],
+        "expires_at": qr_info["expires_at"],
+    }
+    if isinstance(image, Exception):
+        record["error"] = str(image)
+    elif kind == "svg":
+        record["qr_code"] = image.decode()
+    else:
+        record["qr_code"] = f"data:image/png;base64,{base64.b64encode(image).decode()}"
+    return record
+
+
+async def stream_ndjson(results, kind="png"):
+    """Yield one JSON line per ``((index, qr_info), image)`` result."""
+    async for (index, qr_info), image in results:
+        yield json.dumps(_result_record(index, qr_info, image, kind)) + "\n"
+
+
+async def stream_zip(results, kind="png"):
+    """Yield a ZIP archive entry by entry, ending with a manifest.ndjson."""
+    buffer = _ChunkBuffer()
+    manifest = []
+    with zipfile.ZipFile(buffer, mode="w", compression=zipfile.ZIP_STORED) as archive:
+        async for (index, qr_info), image in results:
+            record = _result_record(index, qr_info, image, kind)
+            record.pop("qr_code", None)
+            if not isinstance(image, Exception):
+                name = f"{index:05d}_{qr_info['emergency_id']}.{IMAGE_EXTENSIONS[kind]}"
+                archive.writestr(name, image)
+                record["file"] = name
+                yield buffer.drain()
+            manifest.append(json.dumps(record))
+        archive.writestr("manifest.ndjson", "\n".join(manifest) + "\n")
+    yield buffer.drain()
@@ -0,0 +1,202 @@
+import asyncio
+import json
+from collections import OrderedDict
+
+from app import config
+from app.services.metrics import registry
+from app.services.spatial_index import covering_box, grid_cell
+
+# Subscriptions covering more region cells than this (wide radii near the
+# poles) are indexed by latitude row instead, with the column checked on publish
+MAX_SUBSCRIPTION_REGIONS = 256
+
+
+class TooManySubscribers(Exception):
+    """Raised when the live feed already has ``max_subscribers`` connections."""
+
+
+def format_sse(event_id, event_type, data):
+    frame = f"event: {event_type}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+    return frame if event_id is None else f"id: {event_id}\n{frame}"
+
+
+class Subscription:
+    """One connection's bounded queue of pre-formatted SSE frames.
+
+    Frames are keyed by emergency id, so a newer event for an emergency that
+    is still waiting to be sent replaces the older one in place. When the
+    queue is full the oldest frame is dropped; the next read starts with a
+    ``resync`` frame telling the client to refetch /emergencies/nearby.
+    """
+
+    def __init__(self, regions, max_queue, rows=(), columns=None):
+        self.regions = regions
+        self.rows = rows
+        self.columns = columns
+        self.max_queue = max_queue
+        self.dropped = 0
+        self.coalesced = 0
+        self.closed = False
+        self._pending = OrderedDict()
+        self._ready = asyncio.Event()
+        self._unreported_drops = 0
+
+    def offer(self, key, frame):
+        if key in self._pending:
+            self._pending[key] = frame
+            self.coalesced += 1
+        else:
+            if len(self._pending) >= self.max_queue:
+                self._pending.popitem(last=False)
+                self.dropped += 1
+                self._unreported_drops += 1
+            self._pending[key] = frame
+        self._ready.set()
+
+    def close(self):
+        self.closed = True
+        self._ready.set()
+
+    async def next_frames(self, timeout):
+        """Wait up to ``timeout`` seconds and take everything queued."""
+        if not self._pending and not self.closed:
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+        self._ready.clear()
+        frames = list(self._pending.values())
+        self._pending.clear()
+        if self._unreported_drops:
+            frames.insert(0, format_sse(None, "resync", {"dropped": self._unreported_drops}))
+            self._unreported_drops = 0
+        return frames
+
+    def __len__(self):
+        return len(self._pending)
+
+
+class EmergencyBroadcaster:
+    """Fans emergency events out to live-feed subscribers by region.
+
+    Regions are grid cells ``region_deg`` degrees on a side. A subscriber
+    registers for the cells around its position (or for everything), and
+    ``publish`` serializes each event once and only visits the subscribers of
+    the event's cell plus the region-less ones. Subscriptions too wide for
+    per-cell registration are kept per latitude row instead. Idle connections cost a
+    parked coroutine and an empty queue; nothing polls.
+
+    ``publish`` must be called from the event loop thread.
+    """
+
+    def __init__(self, region_deg=None, queue_size=None, max_subscribers=None):
+        self.region_deg = region_deg or config.BROADCAST_REGION_DEG
+        self.queue_size = queue_size or config.BROADCAST_QUEUE_SIZE
+        self.max_subscribers = max_subscribers or config.BROADCAST_MAX_SUBSCRIBERS
+        self._by_region = {}
+        self._by_row = {}
+        self._everywhere = set()
+        self._count = 0
+        self._sequence = 0
+        self._published = 0
+        self._delivered = 0
+        self._dropped = 0
+        self._coalesced = 0
+
+    def subscribe(self, lat=None, lng=None, radius_m=None):
+        if self._count >= self.max_subscribers:
+            raise TooManySubscribers("Live feed is at capacity, try again shortly")
+        if lat is None or lng is None:
+            subscription = Subscription(None, self.queue_size)
+            self._everywhere.add(subscription)
+        else:
+            rows, columns = covering_box(lat, lng, radius_m or 0, self.region_deg)
+            if len(rows) * len(columns) <= MAX_SUBSCRIPTION_REGIONS:
+                regions = [(x, y) for x in rows for y in columns]
+                subscription = Subscription(regions, self.queue_size)
+                for region in regions:
+                    self._by_region.setdefault(region, set()).add(subscription)
+            else:
+                if not isinstance(columns, range):
+                    columns = frozenset(columns)
+                subscription = Subscription([], self.queue_size, rows, columns)
+                for row in rows:
+                    self._by_row.setdefault(row, set()).add(subscription)
+        self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        if subscription.regions is None:
+            if subscription not in self._everywhere:
+                return
+            self._everywhere.discard(subscription)
+        else:
+            found = self._discard(self._by_region, subscription.regions, subscription)
+            found = self._discard(self._by_row, subscription.rows, subscription) or found
+            if not found:
+                return
+        self._count -= 1
+        self._dropped += subscription.dropped
+        self._coalesced += subscription.coalesced
+
+    @staticmethod
+    def _discard(index, keys, subscription):
+        found = False
+        for key in keys:
+            subscribers = index.get(key)
+            if subscribers and subscription in subscribers:
+                found = True
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del index[key]
+        return found
+
+    def publish(self, event_type, data, coordinates=None):
+        """Queue an event for every subscriber covering ``coordinates``.
+
+        Events without coordinates only reach region-less subscribers.
+        """
+        self._sequence += 1
+        self._published += 1
+        frame = format_sse(self._sequence, event_type, data)
+        key = data.get("emergency_id") or self._sequence
+        targets = list(self._everywhere)
+        if coordinates is not None:
+            row, column = grid_cell(*coordinates, self.region_deg)
+            targets.extend(self._by_region.get((row, column), ()))
+            targets.extend(s for s in self._by_row.get(row, ()) if column in s.columns)
+        for subscription in targets:
+            subscription.offer(key, frame)
+        self._delivered += len(targets)
+
+    def close(self):
+        """End every open stream, e.g. on shutdown."""
+        for subscription in self._everywhere:
+            subscription.close()
+        for subscribers in (*self._by_region.values(), *self._by_row.values()):
+            for subscription in subscribers:
+                subscription.close()
+
+    def stats(self):
+        subscriptions = set(self._everywhere)
+        for subscribers in (*self._by_region.values(), *self._by_row.values()):
+            subscriptions.update(subscribers)
+        return {
+            "subscribers": self._count,
+            "max_subscribers": self.max_subscribers,
+            "regions": len(self._by_region),
+            "rows": len(self._by_row),
+            "region_deg": self.region_deg,
+            "queue_size": self.queue_size,
+            "published": self._published,
+            "delivered": self._delivered,
+            "queued": sum(len(s) for s in subscriptions),
+            "dropped": self._dropped + sum(s.dropped for s in subscriptions),
+            "coalesced": self._coalesced + sum(s.coalesced for s in subscriptions),
+        }
+
+
+emergency_broadcaster = EmergencyBroadcaster()
+registry.gauge_callback(
+    "live_feed_subscribers", "Open live emergency feed connections.", lambda: emergency_broadcaster._count
+)
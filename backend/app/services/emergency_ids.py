@@ -0,0 +1,164 @@
+import itertools
+import os
+import secrets
+import string
+import threading
+import time
+import weakref
+from datetime import datetime
+
+from app import config
+
+PREFIX = "EMG"
+
+# Crockford base32 is in ASCII order, so fixed-width strings sort numerically
+BASE32 = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+SEQUENCE_BITS = 15
+NODE_BITS = 15
+MAX_SEQUENCE = (1 << SEQUENCE_BITS) - 1
+NODE_SPACE = 1 << NODE_BITS
+
+
+def _base32(value, width):
+    chars = []
+    for _ in range(width):
+        value, digit = divmod(value, 32)
+        chars.append(BASE32[digit])
+    return "".join(reversed(chars))
+
+
+# Every 3-character sequence suffix, so bulk generation is a table lookup.
+# product() yields them in numeric order, far faster than formatting each.
+_SEQUENCE_CHARS = ["".join(chars) for chars in itertools.product(BASE32, repeat=3)]
+
+# Drawn once and inherited by forked workers: their pids keep them apart on
+# one host, the salt keeps hosts apart
+_NODE_SALT = secrets.randbelow(NODE_SPACE)
+
+# Set in app.serve workers, where pids alone could collide modulo NODE_SPACE
+_assigned_node = None
+_generators = weakref.WeakSet()
+
+
+def default_node():
+    return (os.getpid() + _NODE_SALT) % NODE_SPACE
+
+
+def worker_node(slot):
+    """Node for pre-fork worker ``slot``: EMERGENCY_ID_NODE (or the host salt) plus the slot."""
+    base = int(config.EMERGENCY_ID_NODE) if config.EMERGENCY_ID_NODE is not None else _NODE_SALT
+    return (base + slot) % NODE_SPACE
+
+
+def assign_node(node):
+    """Make every sortable generator in this process use ``node``, pinned or not."""
+    global _assigned_node
+    if not 0 <= node < NODE_SPACE:
+        raise ValueError(f"node must be in [0, {NODE_SPACE})")
+    _assigned_node = node
+    for generator in list(_generators):
+        generator._reset()
+
+
+class LegacyIdGenerator:
+    """The original format: EMG, a local second timestamp and six random characters.
+
+    Ids from the same second are in random order.
+    """
+
+    def next_id(self):
+        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
+        random_chars = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
+        return f"{PREFIX}{timestamp}{random_chars}"
+
+    def take(self, count):
+        return [self.next_id() for _ in range(count)]
+
+
+class SortableIdGenerator:
+    """Millisecond-ordered ids: ``EMG`` + UTC ``YYYYmmddHHMMSSfff`` + sequence + node.
+
+    The sequence and node are three Crockford base32 characters each, so an
+    id is 26 characters and ids sort as strings in creation order. The
+    timestamp is UTC so DST changes can't reorder them.
+
+    The sequence counts up within a millisecond from a random start in the
+    lower half of its range. When it runs out, or the clock steps back, the
+    generator carries on from the next millisecond after the last one it
+    used, so ids from one process never repeat or go backwards. The node
+    number tells processes apart: by default it is the pid plus a random
+    per-host salt, recomputed in forked children. Pass ``node``
+    (``EMERGENCY_ID_NODE``) to assign one explicitly instead; app.serve
+    workers call ``assign_node`` with one per worker slot, which overrides
+    both.
+    """
+
+    def __init__(self, node=None):
+        if node is not None and not 0 <= node < NODE_SPACE:
+            raise ValueError(f"node must be in [0, {NODE_SPACE})")
+        self._pinned_node = node
+        self._reset()
+        _generators.add(self)
+        if hasattr(os, "register_at_fork"):
+            reset = weakref.WeakMethod(self._reset)
+            os.register_at_fork(after_in_child=lambda: reset() and reset()())
+
+    def _reset(self):
+        self._lock = threading.Lock()
+        if _assigned_node is not None:
+            self.node = _assigned_node
+        elif self._pinned_node is not None:
+            self.node = self._pinned_node
+        else:
+            self.node = default_node()
+        self._node_chars = _base32(self.node, 3)
+        self._ms = 0
+        self._sequence = 0
+        self._prefix = ""
+
+    def _advance(self, ms):
+        self._ms = ms
+        self._sequence = secrets.randbelow(1 << (SEQUENCE_BITS - 1))
+        seconds, millis = divmod(ms, 1000)
+        self._prefix = f"{PREFIX}{time.strftime('%Y%m%d%H%M%S', time.gmtime(seconds))}{millis:03d}"
+
+    def _reserve(self, count):
+        """Claim up to ``count`` sequence numbers in one millisecond; call under the lock."""
+        now = time.time_ns() // 1_000_000
+        if now > self._ms:
+            self._advance(now)
+        elif self._sequence > MAX_SEQUENCE:
+            self._advance(self._ms + 1)
+        first = self._sequence
+        self._sequence = min(first + count, MAX_SEQUENCE + 1)
+        return self._prefix, first, self._sequence
+
+    def next_id(self):
+        with self._lock:
+            prefix, sequence, _ = self._reserve(1)
+        return prefix + _SEQUENCE_CHARS[sequence] + self._node_chars
+
+    def take(self, count):
+        """``count`` consecutive ids, in order."""
+        ids = []
+        with self._lock:
+            while len(ids) < count:
+                prefix, first, end = self._reserve(count - len(ids))
+                node_chars = self._node_chars
+                ids.extend([prefix + chars + node_chars for chars in _SEQUENCE_CHARS[first:end]])
+        return ids
+
+
+ID_GENERATORS = {
+    "sortable": SortableIdGenerator,
+    "legacy": LegacyIdGenerator,
+}
+
+
+def make_id_generator(name=None):
+    name = name or config.EMERGENCY_ID_GENERATOR
+    if name not in ID_GENERATORS:
+        raise ValueError(f"Unknown emergency id generator: {name}")
+    if name == "sortable" and config.EMERGENCY_ID_NODE is not None:
+        return SortableIdGenerator(node=int(config.EMERGENCY_ID_NODE))
+    return ID_GENERATORS[name]()
@@ -0,0 +1,215 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from app import config
+from app.database import run_db, session_scope
+from app.models import EmergencyEvent, RevokedEmergency
+from app.services.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+def emergency_event_row(qr_data, patient_id, location):
+    """EmergencyEvent insert values for a freshly generated QR."""
+    location = location or {}
+    lat, lng = location.get("lat"), location.get("lng")
+    return {
+        "emergency_id": qr_data["emergency_id"],
+        "patient_id": patient_id,
+        "qr_data": qr_data["qr_data"],
+        "location_lat": None if lat is None else str(lat),
+        "location_lng": None if lng is None else str(lng),
+        "status": "active",
+        "created_at": datetime.now(),
+        "expires_at": datetime.fromisoformat(qr_data["expires_at"]),
+    }
+
+
+def load_active_qr(emergency_id):
+    """``(qr_data, expires_at)`` of a stored, still active emergency QR, or None."""
+    with session_scope() as db:
+        row = db.execute(
+            select(EmergencyEvent.qr_data, EmergencyEvent.expires_at).where(
+                EmergencyEvent.emergency_id == emergency_id,
+                EmergencyEvent.status == "active",
+                EmergencyEvent.expires_at > datetime.now(),
+            )
+        ).first()
+    return tuple(row) if row else None
+
+
+class EmergencyEventOutbox:
+    """Write-behind queue for EmergencyEvent rows.
+
+    The generate path only appends to an in-memory queue; a background task
+    inserts queued rows in one transaction per batch, flushing when
+    ``batch_size`` rows are waiting or every ``flush_interval`` seconds.
+    ``stop()`` drains everything still queued before returning, unless the
+    database keeps failing: after ``drain_retries`` failed flushes in a row
+    or ``drain_timeout`` seconds the remaining rows are logged and dropped.
+    """
+
+    def __init__(self, batch_size=None, flush_interval=None, drain_retries=None, drain_timeout=None):
+        self.batch_size = batch_size or config.EVENT_OUTBOX_BATCH_SIZE
+        self.flush_interval = flush_interval or config.EVENT_OUTBOX_FLUSH_INTERVAL
+        self.drain_retries = drain_retries or config.EVENT_OUTBOX_DRAIN_RETRIES
+        self.drain_timeout = drain_timeout or config.EVENT_OUTBOX_DRAIN_TIMEOUT
+        self._queue = deque()
+        self._wakeup = None
+        self._task = None
+        self._enqueued = 0
+        self._flushed = 0
+        self._batches = 0
+        self._failures = 0
+        self._rejected = 0
+        self._unwritten = 0
+        self._flush_seconds = 0.0
+        self._max_flush_seconds = 0.0
+        self._max_depth = 0
+
+    def enqueue(self, row):
+        self._queue.append(row)
+        self._enqueued += 1
+        self._max_depth = max(self._max_depth, len(self._queue))
+        if len(self._queue) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    def start(self):
+        if self._task is None:
+            self._wakeup = asyncio.Event()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        deadline = time.monotonic() + self.drain_timeout
+        failed = 0
+        while self._queue:
+            if await self.flush():
+                failed = 0
+                continue
+            failed += 1
+            remaining = deadline - time.monotonic()
+            if failed >= self.drain_retries or remaining <= 0:
+                break
+            await asyncio.sleep(min(self.flush_interval * failed, remaining))
+        if self._queue:
+            self._unwritten += len(self._queue)
+            logger.error(
+                "event outbox: dropping %d emergency events that could not be written "
+                "(%d failed flushes in a row): %s",
+                len(self._queue), failed, [row["emergency_id"] for row in self._queue],
+            )
+            self._queue.clear()
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            while self._queue:
+                if not await self.flush():
+                    await asyncio.sleep(self.flush_interval)  # back off, rows are requeued
+                    break
+
+    async def flush(self):
+        """Insert up to ``batch_size`` queued rows. Returns False if the write failed."""
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        if not batch:
+            return True
+        start = time.perf_counter()
+        try:
+            self._rejected += await run_db(self._write_batch, batch)
+        except Exception:
+            self._failures += 1
+            self._queue.extendleft(reversed(batch))
+            return False
+        elapsed = time.perf_counter() - start
+        self._flushed += len(batch)
+        self._batches += 1
+        self._flush_seconds += elapsed
+        self._max_flush_seconds = max(self._max_flush_seconds, elapsed)
+        return True
+
+    @staticmethod
+    def _mark_revoked(db, rows):
+        # A revocation saved before these rows existed had nothing to update;
+        # in the same transaction as the insert, so one of the two sees the other
+        db.execute(
+            update(EmergencyEvent)
+            .where(
+                EmergencyEvent.emergency_id.in_([row["emergency_id"] for row in rows]),
+                EmergencyEvent.emergency_id.in_(select(RevokedEmergency.emergency_id)),
+            )
+            .values(status="revoked")
+        )
+
+    @staticmethod
+    def _write_batch(rows):
+        """Insert ``rows``; returns how many were dropped for violating a constraint."""
+        try:
+            with session_scope() as db:
+                db.execute(insert(EmergencyEvent), rows)
+                EmergencyEventOutbox._mark_revoked(db, rows)
+            return 0
+        except IntegrityError:
+            pass
+        # One bad row (e.g. a duplicate emergency_id) fails the whole batch,
+        # and requeueing it would fail forever; write rows one by one and
+        # drop the ones the database rejects.
+        rejected = 0
+        for row in rows:
+            try:
+                with session_scope() as db:
+                    db.execute(insert(EmergencyEvent), [row])
+                    EmergencyEventOutbox._mark_revoked(db, [row])
+            except IntegrityError as exc:
+                rejected += 1
+                logger.error(
+                    "event outbox: database rejected emergency event %s, dropping it: %s",
+                    row["emergency_id"], exc.orig,
+                )
+        return rejected
+
+    def stats(self):
+        batches = self._batches or 1
+        return {
+            "queue_depth": len(self._queue),
+            "max_queue_depth": self._max_depth,
+            "enqueued": self._enqueued,
+            "flushed": self._flushed,
+            "batches": self._batches,
+            "failures": self._failures,
+            "rejected": self._rejected,
+            "unwritten_at_shutdown": self._unwritten,
+            "avg_flush_ms": round(self._flush_seconds / batches * 1000, 3),
+            "max_flush_ms": round(self._max_flush_seconds * 1000, 3),
+        }
+
+
+event_outbox = EmergencyEventOutbox()
+registry.gauge_callback(
+    "emergency_event_outbox_queue_depth", "Emergency events waiting to be written.",
+    lambda: len(event_outbox._queue),
+)
+# Totals rather than averages so they add up across workers; divide for the mean
+registry.gauge_callback(
+    "emergency_event_outbox_flush_seconds", "Time spent writing emergency event batches.",
+    lambda: event_outbox._flush_seconds,
+)
+registry.gauge_callback(
+    "emergency_event_outbox_flush_batches", "Emergency event batches written.",
+    lambda: event_outbox._batches,
+)
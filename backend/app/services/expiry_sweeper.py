@@ -0,0 +1,159 @@
+import asyncio
+import heapq
+import time
+from datetime import datetime
+
+from sqlalchemy import update
+
+from app import config
+from app.database import run_db, session_scope
+from app.models import EmergencyEvent
+
+
+class ExpirySweeper:
+    """Moves EmergencyEvent rows from 'active' to 'expired' as they lapse.
+
+    Upcoming expiries sit in an in-memory min-heap, so the task sleeps until
+    the next one is due and only touches the database when something has
+    actually expired. A periodic fallback sweep over the (status, expires_at)
+    index catches rows this process never saw, e.g. ones created by another
+    worker or by a previous run.
+
+    Listeners registered with ``add_listener`` receive each batch of expired
+    emergency ids, so in-memory indexes can drop them too.
+    """
+
+    def __init__(self, batch_size=None, max_sleep=None, fallback_interval=None):
+        self.batch_size = batch_size or config.EXPIRY_SWEEP_BATCH_SIZE
+        self.max_sleep = max_sleep or config.EXPIRY_SWEEP_MAX_SLEEP
+        self.fallback_interval = fallback_interval or config.EXPIRY_SWEEP_FALLBACK_INTERVAL
+        self._heap = []
+        self._listeners = []
+        self._wakeup = None
+        self._task = None
+        self._last_fallback = 0.0
+        self._expired = 0
+        self._sweeps = 0
+        self._sweep_seconds = 0.0
+
+    def add_listener(self, fn):
+        if fn not in self._listeners:
+            self._listeners.append(fn)
+
+    def track(self, emergency_id, expires_at):
+        heapq.heappush(self._heap, (expires_at, emergency_id))
+        # Only wake the task if this expiry is now the earliest
+        if self._wakeup is not None and self._heap[0][1] == emergency_id:
+            self._wakeup.set()
+
+    async def start(self):
+        if self._task is None:
+            for emergency_id, expires_at in await run_db(self._load_active):
+                heapq.heappush(self._heap, (expires_at, emergency_id))
+            self._wakeup = asyncio.Event()
+            self._last_fallback = time.monotonic()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            self._heap.clear()  # reloaded from the database on the next start
+
+    async def _run(self):
+        while True:
+            delay = self.max_sleep
+            if self._heap:
+                delay = min(delay, max(0.0, (self._heap[0][0] - datetime.now()).total_seconds()))
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=delay)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            try:
+                await self.sweep()
+            except Exception:
+                await asyncio.sleep(self.max_sleep)  # DB unavailable; due ids stay queued
+
+    async def sweep(self):
+        """Expire everything due in the heap, plus the periodic index sweep."""
+        start = time.perf_counter()
+        now = datetime.now()
+        while self._heap and self._heap[0][0] <= now:
+            due = []
+            while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+                due.append(self._heap[0][1])
+                heapq.heappop(self._heap)
+            try:
+                await run_db(self._expire_ids, due)
+            except Exception:
+                for emergency_id in due:
+                    heapq.heappush(self._heap, (now, emergency_id))
+                raise
+            self._notify(due)
+
+        if time.monotonic() - self._last_fallback >= self.fallback_interval:
+            self._last_fallback = time.monotonic()
+            self._notify(await run_db(self._expire_due, now))
+        self._sweeps += 1
+        self._sweep_seconds += time.perf_counter() - start
+
+    def _notify(self, emergency_ids):
+        if not emergency_ids:
+            return
+        self._expired += len(emergency_ids)
+        for listener in self._listeners:
+            listener(emergency_ids)
+
+    @staticmethod
+    def _load_active():
+        with session_scope() as db:
+            return (
+                db.query(EmergencyEvent.emergency_id, EmergencyEvent.expires_at)
+                .filter(EmergencyEvent.status == "active")
+                .all()
+            )
+
+    @staticmethod
+    def _expire_ids(emergency_ids):
+        with session_scope() as db:
+            db.execute(
+                update(EmergencyEvent)
+                .where(EmergencyEvent.emergency_id.in_(emergency_ids))
+                .where(EmergencyEvent.status == "active")
+                .values(status="expired")
+            )
+
+    @staticmethod
+    def _expire_due(now):
+        with session_scope() as db:
+            expired = [
+                row.emergency_id for row in
+                db.query(EmergencyEvent.emergency_id)
+                .filter(EmergencyEvent.status == "active", EmergencyEvent.expires_at <= now)
+                .all()
+            ]
+            if expired:
+                db.execute(
+                    update(EmergencyEvent)
+                    .where(EmergencyEvent.status == "active")
+                    .where(EmergencyEvent.expires_at <= now)
+                    .values(status="expired")
+                )
+            return expired
+
+    def stats(self):
+        return {
+            "tracked": len(self._heap),
+            "next_expiry": self._heap[0][0].isoformat() if self._heap else None,
+            "expired": self._expired,
+            "sweeps": self._sweeps,
+            "avg_sweep_ms": round(self._sweep_seconds / (self._sweeps or 1) * 1000, 3),
+        }
+
+
+expiry_sweeper = ExpirySweeper()
@@ -0,0 +1,136 @@
+import base64
+import sys
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, MultiFernet
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
+
+from app import config
+
+# Salt and cost of the passphrase-derived key used before the key ring
+# existed. QRs issued with it stay readable while it remains in the ring.
+LEGACY_SALT = b"emergency_salt_1234"
+LEGACY_ITERATIONS = 100000
+
+
+@lru_cache(maxsize=None)
+def derive_key(passphrase, salt=LEGACY_SALT, iterations=LEGACY_ITERATIONS):
+    """PBKDF2 a passphrase into a Fernet key. Cached per process."""
+    kdf = PBKDF2HMAC(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=salt,
+        iterations=iterations,
+    )
+    return base64.urlsafe_b64encode(kdf.derive(passphrase.encode()))
+
+
+class KeyConfigError(RuntimeError):
+    """Raised when the configured QR keys can't be loaded."""
+
+
+def _parse_keys(text):
+    keys = []
+    for line in text.replace(",", "\n").splitlines():
+        line = line.strip()
+        if line and not line.startswith("#"):
+            keys.append(line.encode())
+    return keys
+
+
+def _read_key_file(path):
+    try:
+        with open(path) as f:
+            keys = _parse_keys(f.read())
+    except OSError as e:
+        raise KeyConfigError(f"QR_KEY_FILE {path!r} can't be read: {e.strerror}") from e
+    if not keys:
+        raise KeyConfigError(f"QR_KEY_FILE {path!r} contains no keys")
+    return keys
+
+
+class KeyRing:
+    """Ordered list of Fernet keys, newest (primary) first.
+
+    New payloads are encrypted with the primary key; decryption tries every
+    key in order, so rotating in a new key keeps older QRs scannable.
+    """
+
+    def __init__(self, keys, source="explicit"):
+        if not keys:
+            raise ValueError("Key ring needs at least one key")
+        for key in keys:
+            Fernet(key)  # validates length and encoding
+        self.keys = list(keys)
+        self.source = source
+        self._fernet = None
+        self._compact_keys = None
+
+    @property
+    def primary(self):
+        return self.keys[0]
+
+    @property
+    def fernet(self):
+        if self._fernet is None:
+            self._fernet = MultiFernet([Fernet(key) for key in self.keys])
+        return self._fernet
+
+    def compact_keys(self):
+        """AES-GCM keys for the compact codec, one per ring entry."""
+        if self._compact_keys is None:
+            self._compact_keys = [self._derive_compact_key(key) for key in self.keys]
+        return self._compact_keys
+
+    @staticmethod
+    def _derive_compact_key(fernet_key):
+        # Separate AES-GCM key so the two formats never share key material
+        hkdf = HKDF(
+            algorithm=hashes.SHA256(),
+            length=32,
+            salt=None,
+            info=b"emergency-qr-compact-v2",
+        )
+        return hkdf.derive(base64.urlsafe_b64decode(fernet_key))
+
+
+def load_key_ring():
+    """Build the key ring from, in order of preference:
+
+    1. ``QR_KEYS`` - comma-separated Fernet keys, primary first
+    2. ``QR_KEY_FILE`` - one Fernet key per line, primary first
+    3. PBKDF2 derivation of ``QR_KEY_PASSPHRASE`` (slow; cached per process)
+
+    A ``QR_KEY_FILE`` that is set but missing or unreadable raises
+    ``KeyConfigError`` rather than falling back to the passphrase, whose
+    default is public.
+    """
+    if config.QR_KEYS:
+        return KeyRing(_parse_keys(config.QR_KEYS), source="env")
+    if config.QR_KEY_FILE:
+        return KeyRing(_read_key_file(config.QR_KEY_FILE), source="file")
+    return KeyRing([derive_key(config.QR_KEY_PASSPHRASE)], source="derived")
+
+
+def check_key_config():
+    """Fail at startup on configured keys that can't be used.
+
+    The key ring itself loads lazily; this only reads and validates
+    ``QR_KEYS`` / ``QR_KEY_FILE``, so it is cheap.
+    """
+    if config.QR_KEYS:
+        KeyRing(_parse_keys(config.QR_KEYS), source="env")
+    elif config.QR_KEY_FILE:
+        KeyRing(_read_key_file(config.QR_KEY_FILE), source="file")
+
+
+if __name__ == "__main__":
+    # python -m app.services.key_ring generate   -> print a fresh random key
+    # python -m app.services.key_ring derive     -> print the passphrase-derived key
+    command = sys.argv[1] if len(sys.argv) > 1 else "generate"
+    if command == "derive":
+        print(derive_key(config.QR_KEY_PASSPHRASE).decode())
+    else:
+        print(Fernet.generate_key().decode())
@@ -0,0 +1,148 @@
+import asyncio
+import json
+import sys
+import threading
+from collections import OrderedDict
+
+from app import config
+from app.database import run_db
+from app.services.metrics import registry
+from app.services.qr_codec import MedicalSummary, pack_value
+from app.services.user_repository import user_repository
+
+# Rough per-entry overhead of the tuple, dict slot and key
+ENTRY_OVERHEAD = 200
+
+
+def summarize(user):
+    data = user.get("medical_info", {})
+    return MedicalSummary(data, pack_value(data))
+
+
+class MedicalSummaryCache:
+    """Read-through LRU of medical summaries keyed by user id.
+
+    A hit lets QR generation skip the user lookup entirely. Entries are
+    bounded by an estimate of their size in bytes and dropped with
+    ``invalidate`` whenever the profile changes. Concurrent misses for the
+    same user share one database load, and a load that overlaps an
+    invalidation is not cached, so a stale summary can't be put back.
+
+    ``invalidate`` acts on this process only. With several workers the
+    profile routes also publish the change on the change feed, and the other
+    workers invalidate their copy when they pick it up, within about
+    ``SHARED_STATE_POLL_INTERVAL``.
+    """
+
+    def __init__(self, max_bytes=None, loader=None, bulk_loader=None):
+        self.max_bytes = max_bytes or config.MEDICAL_SUMMARY_CACHE_BYTES
+        self._load_one = loader or user_repository.get_by_id
+        self._load_many = bulk_loader or user_repository.get_many
+        self._entries = OrderedDict()
+        self._loading = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def _cost(summary):
+        return len(summary.packed) + sys.getsizeof(json.dumps(summary.data)) + ENTRY_OVERHEAD
+
+    def peek(self, user_id):
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(user_id)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, user_id, summary, generation=None):
+        with self._lock:
+            if generation is not None and generation != self._generation:
+                return  # invalidated while loading
+            self._remove(user_id)
+            cost = self._cost(summary)
+            self._entries[user_id] = (summary, cost)
+            self._size += cost
+            while self._size > self.max_bytes and self._entries:
+                _, (_, evicted_cost) = self._entries.popitem(last=False)
+                self._size -= evicted_cost
+                self.evictions += 1
+
+    def _remove(self, user_id):
+        entry = self._entries.pop(user_id, None)
+        if entry is not None:
+            self._size -= entry[1]
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._remove(user_id)
+            self._generation += 1
+            self.invalidations += 1
+
+    async def get(self, user_id):
+        """The user's summary, loading it on a miss; None if the user doesn't exist."""
+        summary = self.peek(user_id)
+        if summary is not None:
+            return summary
+        pending = self._loading.get(user_id)
+        if pending is None:
+            pending = asyncio.ensure_future(self._load(user_id))
+            self._loading[user_id] = pending
+            pending.add_done_callback(lambda _: self._loading.pop(user_id, None))
+        return await asyncio.shield(pending)
+
+    async def _load(self, user_id):
+        generation = self._generation
+        user = await run_db(self._load_one, user_id)
+        if user is None:
+            return None
+        summary = summarize(user)
+        self.put(user_id, summary, generation)
+        return summary
+
+    async def get_many(self, user_ids):
+        """``{user_id: summary}`` for existing users, loading all misses in one query."""
+        summaries, missing = {}, []
+        for user_id in set(user_ids):
+            summary = self.peek(user_id)
+            if summary is None:
+                missing.append(user_id)
+            else:
+                summaries[user_id] = summary
+        if missing:
+            generation = self._generation
+            for user_id, user in (await run_db(self._load_many, missing)).items():
+                summaries[user_id] = summarize(user)
+                self.put(user_id, summaries[user_id], generation)
+        return summaries
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+
+medical_summaries = MedicalSummaryCache()
+registry.gauge_callback(
+    "medical_summary_cache_hits", "Medical summary lookups served from the cache.",
+    lambda: medical_summaries.hits,
+)
+registry.gauge_callback(
+    "medical_summary_cache_misses", "Medical summary lookups that loaded the user.",
+    lambda: medical_summaries.misses,
+)
@@ -0,0 +1,276 @@
+import threading
+from bisect import bisect_left
+
+# Prometheus text exposition format, version 0.0.4
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+STAGE_BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+BYTE_BUCKETS = (128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return "+Inf" if value == float("inf") else repr(value)
+    return str(value)
+
+
+class _Shards:
+    """Per-thread arrays of numbers, summed on read.
+
+    Each thread only ever writes its own array, so updates need no lock; the
+    lock is taken when a thread first touches the metric and on collection.
+    Arrays of threads that have exited are kept so totals never go backwards.
+    """
+
+    def __init__(self, width):
+        self.width = width
+        self._local = threading.local()
+        self._arrays = []
+        self._lock = threading.Lock()
+
+    def local(self):
+        values = getattr(self._local, "values", None)
+        if values is None:
+            values = [0] * self.width
+            with self._lock:
+                self._arrays.append(values)
+            self._local.values = values
+        return values
+
+    def totals(self):
+        with self._lock:
+            arrays = list(self._arrays)
+        return [sum(column) for column in zip(*arrays)] if arrays else [0] * self.width
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount=1):
+        self._shards.local()[0] += amount
+
+    def value(self):
+        return self._shards.totals()[0]
+
+
+class _HistogramChild:
+    def __init__(self, buckets):
+        self._bounds = buckets
+        # One count per bound, one for +Inf, then the running sum
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value):
+        values = self._shards.local()
+        values[bisect_left(self._bounds, value)] += 1
+        values[-1] += value
+
+    def totals(self):
+        return self._shards.totals()
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}")
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def _items(self):
+        with self._lock:
+            return sorted(self._children.items())
+
+    def samples(self):
+        """``{label values: [numbers]}``, the raw state ``collect`` formats."""
+        raise NotImplementedError
+
+    @property
+    def family(self):
+        """Name used in HELP/TYPE; in text format 0.0.4 it must match the sample names."""
+        return self.name
+
+    def header(self):
+        return [f"# HELP {self.family} {self.documentation}", f"# TYPE {self.family} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    @property
+    def family(self):
+        return f"{self.name}_total"
+
+    def _new_child(self):
+        return _CounterChild()
+
+    def inc(self, amount=1):
+        self.labels().inc(amount)
+
+    def samples(self):
+        return {values: [child.value()] for values, child in self._items()}
+
+    def collect(self, samples=None):
+        lines = self.header()
+        for values, (value,) in sorted((samples if samples is not None else self.samples()).items()):
+            lines.append(f"{self.family}{_format_labels(self.labelnames, values)} {_format_value(value)}")
+        return lines
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value):
+        self.labels().observe(value)
+
+    def samples(self):
+        # Per-bucket (not cumulative) counts, then the sum, so samples add up
+        return {values: child.totals() for values, child in self._items()}
+
+    def collect(self, samples=None):
+        lines = self.header()
+        bounds = [_format_value(float(bound)) for bound in self.buckets] + ["+Inf"]
+        for values, totals in sorted((samples if samples is not None else self.samples()).items()):
+            cumulative, running = [], 0
+            for count in totals[:-1]:
+                running += count
+                cumulative.append(running)
+            total = totals[-1]
+            for bound, count in zip(bounds, cumulative):
+                labels = _format_labels(self.labelnames, values, ("le", bound))
+                lines.append(f"{self.name}_bucket{labels} {count}")
+            labels = _format_labels(self.labelnames, values)
+            lines.append(f"{self.name}_sum{labels} {_format_value(float(total))}")
+            lines.append(f"{self.name}_count{labels} {cumulative[-1]}")
+        return lines
+
+
+class GaugeCallback(_Metric):
+    """A gauge read from ``callback`` at scrape time, so updating it costs nothing."""
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, callback):
+        super().__init__(name, documentation)
+        self.callback = callback
+
+    def samples(self):
+        return {(): [self.callback()]}
+
+    def collect(self, samples=None):
+        (value,) = (samples if samples is not None else self.samples()).get((), [0])
+        return self.header() + [f"{self.name} {_format_value(value)}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        with self._lock:
+            if metric.name in self._metrics:
+                raise ValueError(f"Metric {metric.name} is already registered")
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, documentation, labelnames=()):
+        return self.register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name, documentation, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self.register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge_callback(self, name, documentation, callback):
+        return self.register(GaugeCallback(name, documentation, callback))
+
+    def _metrics_list(self):
+        with self._lock:
+            return list(self._metrics.values())
+
+    def render(self):
+        lines = []
+        for metric in self._metrics_list():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self):
+        """This process's samples as JSON-friendly data, for ``render_merged`` elsewhere."""
+        return {
+            metric.name: [[list(values), numbers] for values, numbers in metric.samples().items()]
+            for metric in self._metrics_list()
+        }
+
+    def render_merged(self, snapshots):
+        """Render the sum of several processes' ``snapshot()``s.
+
+        ``snapshots`` holds ``(snapshot, live)`` pairs. Counters and
+        histograms add up every snapshot, including those of processes that
+        have exited, so totals never go backwards; gauges only count live ones.
+        """
+        lines = []
+        for metric in self._metrics_list():
+            merged = {}
+            for snapshot, live in snapshots:
+                if metric.kind == "gauge" and not live:
+                    continue
+                for values, numbers in snapshot.get(metric.name, ()):
+                    values = tuple(values)
+                    current = merged.get(values)
+                    if current is None:
+                        merged[values] = list(numbers)
+                    elif len(current) == len(numbers):  # else stored with other buckets
+                        merged[values] = [a + b for a, b in zip(current, numbers)]
+            lines.extend(metric.collect(merged))
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+http_request_seconds = registry.histogram(
+    "http_request_duration_seconds", "HTTP request latency by route template.",
+    ("method", "route", "status"),
+)
+qr_stage_seconds = registry.histogram(
+    "qr_stage_duration_seconds", "Time spent in each QR processing stage.",
+    ("stage",), STAGE_BUCKETS,
+)
+qr_payload_bytes = registry.histogram(
+    "qr_payload_bytes", "Size of generated QR strings.", ("format",), BYTE_BUCKETS,
+)
+qr_scans = registry.counter("qr_scans", "QR codes validated successfully.")
+qr_scan_failures = registry.counter(
+    "qr_scan_failures", "QR codes rejected, by reason.", ("reason",),
+)
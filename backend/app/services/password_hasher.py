@@ -0,0 +1,130 @@
+import asyncio
+import base64
+import hashlib
+import hmac
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from app import config
+
+ALGORITHM = "scrypt"
+
+
+class HasherBusy(Exception):
+    """Raised when too many hash/verify calls are already waiting."""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+
+class PasswordHasher:
+    """scrypt password hashing on a bounded thread pool.
+
+    hashlib.scrypt releases the GIL, so a thread pool gives real
+    parallelism while keeping the event loop free. Calls beyond
+    ``max_pending`` are refused with ``HasherBusy`` rather than queueing
+    without limit during a login storm.
+
+    Hashes are stored as ``scrypt$n$r$p$salt$hash``. Values in any other
+    format are treated as legacy plaintext and flagged for rehash.
+    """
+
+    def __init__(self, n=None, r=None, p=None, max_workers=None, max_pending=None):
+        self.n = n or config.PASSWORD_SCRYPT_N
+        self.r = r or config.PASSWORD_SCRYPT_R
+        self.p = p or config.PASSWORD_SCRYPT_P
+        self.max_workers = max(1, max_workers or config.PASSWORD_HASH_WORKERS)
+        self.max_pending = max(1, max_pending or config.PASSWORD_HASH_QUEUE_SIZE)
+        self._executor = None
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._busy_seconds = 0.0
+        self._dummy_hash = None
+
+    def _derive(self, password, salt, n, r, p):
+        return hashlib.scrypt(
+            password.encode(), salt=salt, n=n, r=r, p=p,
+            maxmem=256 * n * r * p, dklen=32,
+        )
+
+    def hash(self, password):
+        salt = os.urandom(16)
+        digest = self._derive(password, salt, self.n, self.r, self.p)
+        return f"{ALGORITHM}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(digest)}"
+
+    def verify(self, password, stored):
+        if not stored:
+            return False
+        parts = stored.split("$")
+        if len(parts) != 6 or parts[0] != ALGORITHM:
+            # Legacy plaintext row; rehashed on the next successful login
+            return hmac.compare_digest(password.encode(), stored.encode())
+        _, n, r, p, salt, digest = parts
+        candidate = self._derive(password, _unb64(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(candidate, _unb64(digest))
+
+    def needs_rehash(self, stored):
+        parts = (stored or "").split("$")
+        if len(parts) != 6 or parts[0] != ALGORITHM:
+            return True
+        return (int(parts[1]), int(parts[2]), int(parts[3])) != (self.n, self.r, self.p)
+
+    def dummy_verify(self, password):
+        """Spend the same time as a real verify, for unknown accounts."""
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(os.urandom(16).hex())
+        self.verify(password, self._dummy_hash)
+        return False
+
+    async def _submit(self, fn, *args):
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise HasherBusy("Authentication is busy, try again shortly")
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="password-hash"
+                )
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self._pending -= 1
+            self._completed += 1
+            self._busy_seconds += time.perf_counter() - start
+
+    async def hash_async(self, password):
+        return await self._submit(self.hash, password)
+
+    async def verify_async(self, password, stored):
+        if stored is None:
+            return await self._submit(self.dummy_verify, password)
+        return await self._submit(self.verify, password, stored)
+
+    def stats(self):
+        completed = self._completed or 1
+        return {
+            "algorithm": ALGORITHM,
+            "params": {"n": self.n, "r": self.r, "p": self.p},
+            "workers": self.max_workers,
+            "queue_limit": self.max_pending,
+            "queue_depth": self._pending,
+            "completed": self._completed,
+            "rejected": self._rejected,
+            "avg_ms": round(self._busy_seconds / completed * 1000, 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
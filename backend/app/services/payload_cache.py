@@ -0,0 +1,88 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from datetime import datetime
+
+from app import config
+
+
+def token_digest(token):
+    return hashlib.blake2b(token.encode(), digest_size=16).digest()
+
+
+class PayloadCache:
+    """Bounded LRU of decrypted QR payloads keyed by token digest.
+
+    An entry is never served past the payload's ``expires_at`` and can be
+    dropped for a whole emergency at once when it is revoked. Cached payloads
+    are shared between callers and must be treated as read-only.
+    """
+
+    def __init__(self, max_entries=None):
+        self.max_entries = max_entries or config.QR_PAYLOAD_CACHE_SIZE
+        self._entries = OrderedDict()
+        self._digests_by_id = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, token):
+        digest = token_digest(token)
+        with self._lock:
+            entry = self._entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            payload, expires_at, emergency_id = entry
+            if datetime.now() > expires_at:
+                self._remove(digest, emergency_id)
+                self.expired += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(digest)
+            self.hits += 1
+            return payload
+
+    def put(self, token, payload, expires_at):
+        digest = token_digest(token)
+        emergency_id = payload.get("emergency_id")
+        with self._lock:
+            self._entries[digest] = (payload, expires_at, emergency_id)
+            self._entries.move_to_end(digest)
+            self._digests_by_id.setdefault(emergency_id, set()).add(digest)
+            while len(self._entries) > self.max_entries:
+                old_digest, (_, _, old_id) = self._entries.popitem(last=False)
+                self._discard_digest(old_digest, old_id)
+
+    def evict(self, emergency_id):
+        with self._lock:
+            for digest in self._digests_by_id.pop(emergency_id, ()):
+                self._entries.pop(digest, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._digests_by_id.clear()
+
+    def _remove(self, digest, emergency_id):
+        self._entries.pop(digest, None)
+        self._discard_digest(digest, emergency_id)
+
+    def _discard_digest(self, digest, emergency_id):
+        digests = self._digests_by_id.get(emergency_id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self._digests_by_id[emergency_id]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "expired": self.expired,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+        }
@@ -0,0 +1,52 @@
+import os
+
+
+class ProfileVersions:
+    """Per-user version counters used as profile ETags.
+
+    Every write to a user's profile calls ``bump``, so a client whose
+    ``If-None-Match`` still carries the current ETag can be answered with a
+    304 without reading the database. Counters live in process memory;
+    ``epoch`` is random per process so ETags issued before a restart never
+    match afterwards. Workers forked together share the epoch and keep their
+    counters in step through the change feed; a replacement worker, which
+    starts with empty counters, must call ``restart``.
+    """
+
+    def __init__(self):
+        self.restart()
+        self.bumps = 0
+        self.not_modified = 0
+
+    def restart(self):
+        """Drop all counters under a new epoch, invalidating every ETag issued so far."""
+        self.epoch = os.urandom(4).hex()
+        self._versions = {}
+
+    def get(self, user_id):
+        return self._versions.get(user_id, 0)
+
+    def bump(self, user_id):
+        self._versions[user_id] = self._versions.get(user_id, 0) + 1
+        self.bumps += 1
+
+    def etag(self, user_id):
+        return f'W/"{user_id}-{self.epoch}-{self.get(user_id)}"'
+
+    def matches(self, user_id, if_none_match):
+        """True if an ``If-None-Match`` header value covers the current ETag."""
+        if not if_none_match:
+            return False
+        current = self.etag(user_id)
+        # Weak comparison: W/ prefixes are ignored on both sides
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if current.removeprefix("W/") in candidates:
+            self.not_modified += 1
+            return True
+        return False
+
+    def stats(self):
+        return {"tracked": len(self._versions), "bumps": self.bumps, "not_modified": self.not_modified}
+
+
+profile_versions = ProfileVersions()
@@ -0,0 +1,218 @@
+import json
+import os
+import time
+import zlib
+from datetime import datetime
+from typing import NamedTuple
+
+from cryptography.exceptions import InvalidTag
+
+from app.services import server_timing
+
+# Compact QR payload format (version 2):
+#
+#   EMERGENCY:2:<base45(version | flags | nonce | AES-GCM ciphertext+tag)>
+#
+# The plaintext is JSON with short field tags and epoch-second timestamps,
+# raw-deflated when that is smaller. Base45 keeps the whole QR string inside
+# the alphanumeric mode character set, which packs ~5.5 bits per character
+# instead of 8 in byte mode.
+
+QR_PREFIX = "EMERGENCY:"
+COMPACT_VERSION = 2
+COMPACT_PREFIX = f"{QR_PREFIX}{COMPACT_VERSION}:"
+
+FLAG_DEFLATE = 0x01
+NONCE_SIZE = 12
+
+
+class PayloadTampered(ValueError):
+    """A payload that decoded but failed authentication under every key."""
+
+    reason = "tampered"
+
+
+BASE45_ALPHABET = "0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ $%*+-./:"
+BASE45_VALUES = {char: value for value, char in enumerate(BASE45_ALPHABET)}
+
+# Long key -> short tag. Unknown keys are carried through unchanged.
+FIELD_TAGS = {
+    "emergency_id": "i",
+    "user_id": "u",
+    "timestamp": "t",
+    "expires_at": "x",
+    "location": "l",
+    "medical_summary": "m",
+    "lat": "a",
+    "lng": "o",
+    "address": "d",
+    "blood_type": "b",
+    "allergies": "g",
+    "conditions": "c",
+    "medications": "r",
+    "emergency_contact": "e",
+    "name": "n",
+    "phone": "p",
+    "relationship": "s",
+}
+TAG_FIELDS = {tag: field for field, tag in FIELD_TAGS.items()}
+TIMESTAMP_FIELDS = ("timestamp", "expires_at")
+
+
+def base45_encode(data):
+    chars = []
+    for i in range(0, len(data) - 1, 2):
+        value = data[i] * 256 + data[i + 1]
+        value, c = divmod(value, 45)
+        e, d = divmod(value, 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d], BASE45_ALPHABET[e])
+    if len(data) % 2:
+        d, c = divmod(data[-1], 45)
+        chars += (BASE45_ALPHABET[c], BASE45_ALPHABET[d])
+    return "".join(chars)
+
+
+def base45_decode(text):
+    try:
+        values = [BASE45_VALUES[char] for char in text]
+    except KeyError:
+        raise ValueError("Invalid base45 character")
+    if len(values) % 3 == 1:
+        raise ValueError("Invalid base45 length")
+    out = bytearray()
+    for i in range(0, len(values), 3):
+        chunk = values[i:i + 3]
+        if len(chunk) == 3:
+            value = chunk[0] + chunk[1] * 45 + chunk[2] * 2025
+            if value > 0xFFFF:
+                raise ValueError("Invalid base45 chunk")
+            out += bytes(divmod(value, 256))
+        else:
+            value = chunk[0] + chunk[1] * 45
+            if value > 0xFF:
+                raise ValueError("Invalid base45 chunk")
+            out.append(value)
+    return bytes(out)
+
+
+def _shorten(value):
+    if isinstance(value, dict):
+        return {FIELD_TAGS.get(key, key): _shorten(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_shorten(item) for item in value]
+    return value
+
+
+def _expand(value):
+    if isinstance(value, dict):
+        return {TAG_FIELDS.get(key, key): _expand(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_expand(item) for item in value]
+    return value
+
+
+class MedicalSummary(NamedTuple):
+    """A medical summary dict together with its ``pack_value`` bytes."""
+    data: dict
+    packed: bytes
+
+
+def pack_value(value):
+    """Compact JSON bytes for any value, with long keys replaced by tags."""
+    return json.dumps(_shorten(value), separators=(",", ":"), ensure_ascii=False).encode()
+
+
+def pack_payload(payload, packed_summary=None):
+    """Serialize a QR payload dict to compact JSON bytes.
+
+    ``packed_summary`` is a medical summary already run through
+    ``pack_value``; it is spliced in as the ``medical_summary`` field.
+    """
+    payload = dict(payload)
+    for field in TIMESTAMP_FIELDS:
+        if isinstance(payload.get(field), str):
+            payload[field] = int(datetime.fromisoformat(payload[field]).timestamp())
+    if packed_summary is None:
+        return pack_value(payload)
+    payload.pop("medical_summary", None)
+    key = json.dumps(FIELD_TAGS["medical_summary"]).encode()
+    return pack_value(payload)[:-1] + b"," + key + b":" + packed_summary + b"}"
+
+
+def unpack_payload(data):
+    payload = _expand(json.loads(data))
+    for field in TIMESTAMP_FIELDS:
+        if isinstance(payload.get(field), (int, float)):
+            payload[field] = datetime.fromtimestamp(payload[field]).isoformat()
+    return payload
+
+
+class CompactQRCodec:
+    """Versioned AES-GCM codec for QR payloads.
+
+    AES-GCM adds 28 bytes (nonce + tag) where Fernet adds ~57 bytes plus
+    block padding before its own base64 layer.
+    """
+
+    def __init__(self, keys, compress=True):
+        # Imported here: it loads cryptography's OpenSSL backend, a sizeable
+        # share of the app's import time, and codecs are built lazily
+        from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+        # First key encrypts; all keys are tried on decrypt (rotation)
+        self.aeads = [AESGCM(key) for key in keys]
+        self.compress = compress
+
+    def encode(self, payload, packed_summary=None):
+        """Return the base45 token for a payload dict."""
+        start = time.perf_counter()
+        plaintext = pack_payload(payload, packed_summary)
+        server_timing.record("json", time.perf_counter() - start)
+        flags = 0
+        if self.compress:
+            compressor = zlib.compressobj(9, zlib.DEFLATED, -15)
+            deflated = compressor.compress(plaintext) + compressor.flush()
+            if len(deflated) < len(plaintext):
+                plaintext, flags = deflated, flags | FLAG_DEFLATE
+        header = bytes((COMPACT_VERSION, flags))
+        nonce = os.urandom(NONCE_SIZE)
+        return base45_encode(header + nonce + self.aeads[0].encrypt(nonce, plaintext, header))
+
+    def decode(self, token):
+        raw = base45_decode(token)
+        if len(raw) < 2 + NONCE_SIZE + 16 or raw[0] != COMPACT_VERSION:
+            raise ValueError("Unsupported QR payload version")
+        header, nonce, ciphertext = raw[:2], raw[2:2 + NONCE_SIZE], raw[2 + NONCE_SIZE:]
+        for aead in self.aeads:
+            try:
+                plaintext = aead.decrypt(nonce, ciphertext, header)
+                break
+            except InvalidTag:
+                continue
+        else:
+            raise PayloadTampered("QR payload failed authentication")
+        if header[1] & FLAG_DEFLATE:
+            plaintext = zlib.decompress(plaintext, -15)
+        start = time.perf_counter()
+        payload = unpack_payload(plaintext)
+        server_timing.record("json", time.perf_counter() - start)
+        return payload
+
+
+def is_compact_token(token):
+    return bool(token) and all(char in BASE45_VALUES for char in token)
+
+
+def split_qr_string(qr_text):
+    """Return the encrypted token from a scanned QR string or a bare token.
+
+    Handles both ``EMERGENCY:2:<token>`` and the legacy
+    ``EMERGENCY:<emergency_id>:<token>`` layout.
+    """
+    if qr_text.startswith(COMPACT_PREFIX):
+        return qr_text[len(COMPACT_PREFIX):]
+    if qr_text.startswith(QR_PREFIX):
+        parts = qr_text.split(":")
+        if len(parts) >= 3:
+            return parts[2]
+        raise ValueError("Invalid QR format")
+    return qr_text
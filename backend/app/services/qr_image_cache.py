@@ -0,0 +1,102 @@
+from collections import OrderedDict
+from datetime import datetime
+
+from app import config
+from app.services.metrics import registry
+
+
+class QRImageCache:
+    """Size-bounded LRU of rendered QR images.
+
+    Issued QRs are registered with their ``qr_data`` and expiry so the image
+    endpoint can render them on demand. Entries are keyed by
+    ``(emergency_id, kind, scale, border)`` and dropped once the QR expires.
+    """
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = max_bytes or config.QR_IMAGE_CACHE_BYTES
+        self._issued = {}
+        self._images = OrderedDict()
+        self._keys_by_id = {}
+        self._registrations = 0
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def register(self, emergency_id, qr_data, expires_at):
+        if isinstance(expires_at, str):
+            expires_at = datetime.fromisoformat(expires_at)
+        self._issued[emergency_id] = (qr_data, expires_at)
+        self._registrations += 1
+        if self._registrations % 256 == 0:
+            self.purge_expired()
+
+    def lookup(self, emergency_id):
+        """Return ``(qr_data, expires_at)`` for a live QR, or None."""
+        issued = self._issued.get(emergency_id)
+        if issued is None:
+            return None
+        if datetime.now() > issued[1]:
+            self.evict(emergency_id)
+            return None
+        return issued
+
+    def get(self, emergency_id, kind, scale, border):
+        key = (emergency_id, kind, scale, border)
+        image = self._images.get(key)
+        if image is None or self.lookup(emergency_id) is None:
+            self.misses += 1
+            return None
+        self._images.move_to_end(key)
+        self.hits += 1
+        return image
+
+    def put(self, emergency_id, kind, scale, border, image):
+        key = (emergency_id, kind, scale, border)
+        if key in self._images:
+            self._size -= len(self._images.pop(key))
+        self._images[key] = image
+        self._keys_by_id.setdefault(emergency_id, set()).add(key)
+        self._size += len(image)
+        while self._size > self.max_bytes and self._images:
+            evicted_key, evicted = self._images.popitem(last=False)
+            self._size -= len(evicted)
+            self._discard_key(evicted_key)
+
+    def _discard_key(self, key):
+        keys = self._keys_by_id.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_id[key[0]]
+
+    def evict(self, emergency_id):
+        self._issued.pop(emergency_id, None)
+        for key in self._keys_by_id.pop(emergency_id, ()):
+            self._size -= len(self._images.pop(key))
+
+    def purge_expired(self):
+        now = datetime.now()
+        expired = [eid for eid, (_, expires_at) in self._issued.items() if now > expires_at]
+        for emergency_id in expired:
+            self.evict(emergency_id)
+        return len(expired)
+
+    def stats(self):
+        return {
+            "issued": len(self._issued),
+            "images": len(self._images),
+            "bytes": self._size,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+        }
+
+
+qr_image_cache = QRImageCache()
+registry.gauge_callback(
+    "qr_image_cache_hits", "QR image requests served from the image cache.", lambda: qr_image_cache.hits
+)
+registry.gauge_callback(
+    "qr_image_cache_misses", "QR image requests that had to render.", lambda: qr_image_cache.misses
+)
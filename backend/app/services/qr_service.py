@@ -1,54 +1,137 @@
-﻿import segno
-import json
+﻿import json
 import base64
 from datetime import datetime, timedelta
-from cryptography.fernet import Fernet
-from cryptography.hazmat.primitives import hashes
-from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
-import secrets
-import string
 import io
+import threading
+import time
+from cryptography.fernet import InvalidToken
+from app import config
+from app.services.qr_codec import (
+    COMPACT_PREFIX, CompactQRCodec, MedicalSummary, PayloadTampered, is_compact_token, split_qr_string
+)
+from app.services.metrics import qr_payload_bytes, qr_scan_failures, qr_scans, qr_stage_seconds, registry
+from app.services import server_timing
+from app.services.key_ring import load_key_ring
+from app.services.emergency_ids import make_id_generator
+from app.services.payload_cache import PayloadCache
+from app.services.render_pool import render_qr_png
+
+# Bound once so the hot path skips the label lookup
+_ENCRYPT_SECONDS = qr_stage_seconds.labels("encrypt")
+_DECRYPT_SECONDS = qr_stage_seconds.labels("decrypt")
+_RENDER_SECONDS = qr_stage_seconds.labels("render")
+_SCANNED = qr_scans.labels()
+
+# How long an emergency QR stays valid after it is generated
+QR_LIFETIME = timedelta(hours=2)
+
+def _record_stage(histogram, name, seconds):
+    """Feed a stage duration to both the metrics histogram and the request's Server-Timing."""
+    histogram.observe(seconds)
+    server_timing.record(name, seconds)
+
+def _is_fernet_token(token):
+    """Whether ``token`` is shaped like a Fernet token (version byte, IV, HMAC)."""
+    try:
+        raw = base64.urlsafe_b64decode(token)
+    except ValueError:
+        return False
+    return len(raw) >= 57 and raw[0] == 0x80
+
+class ScanRejected(ValueError):
+    """A QR that decrypted fine but must not be accepted, e.g. expired or revoked."""
+    
+    def __init__(self, reason, message):
+        super().__init__(message)
+        self.reason = reason
 
 class QRCodeService:
-    def __init__(self):
-        self.secret_key = self._generate_secure_key()
-        self.fernet = Fernet(self.secret_key)
+    def __init__(self, key_ring=None, id_generator=None):
+        # Keys and codecs are set up on first use (or by warm()): the default
+        # key ring is PBKDF2-derived, which is too slow to do at import time
+        self._key_ring = key_ring
+        self._codec = None
+        self._init_lock = threading.Lock()
+        self.id_generator = id_generator or make_id_generator()
+        self.payload_format = config.QR_PAYLOAD_FORMAT
+        self.payload_cache = PayloadCache()
+        self.revoked = set()
+    
+    @property
+    def key_ring(self):
+        if self._key_ring is None:
+            with self._init_lock:
+                if self._key_ring is None:
+                    self._key_ring = load_key_ring()
+        return self._key_ring
+    
+    @property
+    def secret_key(self):
+        return self.key_ring.primary
     
-    def _generate_secure_key(self):
-        password = "emergency_healthcare_secret_key_2024".encode()
-        salt = b"emergency_salt_1234"
-        kdf = PBKDF2HMAC(
-            algorithm=hashes.SHA256(),
-            length=32,
-            salt=salt,
-            iterations=100000,
-        )
-        key = base64.urlsafe_b64encode(kdf.derive(password))
-        return key
+    @property
+    def fernet(self):
+        return self.key_ring.fernet
+    
+    @property
+    def codec(self):
+        if self._codec is None:
+            key_ring = self.key_ring
+            with self._init_lock:
+                if self._codec is None:
+                    self._codec = CompactQRCodec(
+                        key_ring.compact_keys(),
+                        compress=config.QR_PAYLOAD_COMPRESS,
+                    )
+        return self._codec
+    
+    def warm(self):
+        """Derive the keys and build both codecs now rather than on first use."""
+        self.codec.encode({})
+        self.fernet.encrypt(b"")
     
     def generate_emergency_id(self):
-        timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
-        random_chars = ''.join(secrets.choice(string.ascii_uppercase + string.digits) for _ in range(6))
-        return f"EMG{timestamp}{random_chars}"
+        return self.id_generator.next_id()
     
     def encrypt_data(self, data):
         if isinstance(data, dict):
+            start = time.perf_counter()
             data = json.dumps(data)
+            server_timing.record("json", time.perf_counter() - start)
         encrypted_data = self.fernet.encrypt(data.encode())
         return base64.urlsafe_b64encode(encrypted_data).decode()
     
     def decrypt_data(self, encrypted_data):
+        start = time.perf_counter()
         try:
-            encrypted_data = base64.urlsafe_b64decode(encrypted_data.encode())
-            decrypted_data = self.fernet.decrypt(encrypted_data)
-            return json.loads(decrypted_data.decode())
-        except Exception as e:
-            raise ValueError("Invalid or expired QR code")
+            if is_compact_token(encrypted_data):
+                return self.codec.decode(encrypted_data)
+            try:
+                encrypted_data = base64.urlsafe_b64decode(encrypted_data.encode())
+                decrypted_data = self.fernet.decrypt(encrypted_data)
+                json_start = time.perf_counter()
+                payload = json.loads(decrypted_data.decode())
+                server_timing.record("json", time.perf_counter() - json_start)
+                return payload
+            except InvalidToken:
+                # Well-formed but failing the HMAC means it was altered
+                if _is_fernet_token(encrypted_data):
+                    raise PayloadTampered("Invalid or expired QR code")
+                raise ValueError("Invalid or expired QR code")
+            except Exception as e:
+                raise ValueError("Invalid or expired QR code")
+        finally:
+            _record_stage(_DECRYPT_SECONDS, "decrypt", time.perf_counter() - start)
     
     def create_emergency_qr_data(self, user_id, medical_data, location):
+        # A cached MedicalSummary carries its pre-packed form for the compact codec
+        packed_summary = None
+        if isinstance(medical_data, MedicalSummary):
+            medical_data, packed_summary = medical_data
+        
         emergency_id = self.generate_emergency_id()
         
-        expiration_time = datetime.now() + timedelta(hours=2)
+        expiration_time = datetime.now() + QR_LIFETIME
         
         payload = {
             "emergency_id": emergency_id,
@@ -59,29 +142,78 @@ class QRCodeService:
             "medical_summary": medical_data
         }
         
-        encrypted_payload = self.encrypt_data(payload)
+        start = time.perf_counter()
+        if self.payload_format == "legacy":
+            encrypted_payload = self.encrypt_data(payload)
+            qr_string = f"EMERGENCY:{emergency_id}:{encrypted_payload}"
+        else:
+            encrypted_payload = self.codec.encode(payload, packed_summary)
+            qr_string = f"{COMPACT_PREFIX}{encrypted_payload}"
+        _record_stage(_ENCRYPT_SECONDS, "encrypt", time.perf_counter() - start)
+        qr_payload_bytes.labels(self.payload_format).observe(len(qr_string))
         
         return {
             "emergency_id": emergency_id,
             "encrypted_data": encrypted_payload,
-            "qr_data": f"EMERGENCY:{emergency_id}:{encrypted_payload}"
+            "qr_data": qr_string,
+            "expires_at": expiration_time.isoformat()
         }
     
     def generate_qr_code_image(self, qr_data):
-        qr = segno.make(qr_data)
-        buffer = io.BytesIO()
-        qr.save(buffer, kind='png', scale=5)
-        buffer.seek(0)
-        return buffer
+        png, render_seconds = render_qr_png(qr_data, scale=5)
+        _record_stage(_RENDER_SECONDS, "render", render_seconds)
+        return io.BytesIO(png)
+    
+    def extract_encrypted_data(self, qr_text):
+        """Strip the EMERGENCY: wrapper (v2 or legacy) from scanned text."""
+        try:
+            return split_qr_string(qr_text)
+        except ValueError:
+            qr_scan_failures.labels("malformed").inc()
+            raise
+    
+    def scan_many(self, qr_texts, start_index=0):
+        """Validate a list of scanned strings; one result per item, never raises."""
+        results = []
+        for index, qr_text in enumerate(qr_texts, start_index):
+            try:
+                payload = self.validate_qr_code(self.extract_encrypted_data(qr_text))
+                results.append({"index": index, "success": True, "emergency_data": payload})
+            except ValueError as e:
+                results.append({"index": index, "success": False, "error": str(e)})
+        return results
     
     def validate_qr_code(self, encrypted_data):
         try:
-            payload = self.decrypt_data(encrypted_data)
-            expires_at = datetime.fromisoformat(payload["expires_at"])
-            if datetime.now() > expires_at:
-                raise ValueError("QR code has expired")
+            payload = self.payload_cache.get(encrypted_data)
+            if payload is None:
+                payload = self.decrypt_data(encrypted_data)
+                expires_at = datetime.fromisoformat(payload["expires_at"])
+                if datetime.now() > expires_at:
+                    raise ScanRejected("expired", "QR code has expired")
+                if payload.get("emergency_id") not in self.revoked:
+                    self.payload_cache.put(encrypted_data, payload, expires_at)
+            # Checked on hits too, in case a revoke raced a concurrent put
+            if payload.get("emergency_id") in self.revoked:
+                raise ScanRejected("revoked", "QR code has been revoked")
+            _SCANNED.inc()
             return payload
         except Exception as e:
+            # Anything without a reason of its own failed to decode or parse
+            qr_scan_failures.labels(getattr(e, "reason", "malformed")).inc()
             raise ValueError(f"Invalid QR code: {str(e)}")
+    
+    def revoke(self, emergency_id):
+        """Reject future scans of an emergency QR and drop its cached payloads."""
+        self.revoked.add(emergency_id)
+        self.payload_cache.evict(emergency_id)
 
 qr_service = QRCodeService()
+registry.gauge_callback(
+    "qr_payload_cache_hits", "Scans answered from the decrypted payload cache.",
+    lambda: qr_service.payload_cache.hits,
+)
+registry.gauge_callback(
+    "qr_payload_cache_misses", "Scans that had to decrypt their payload.",
+    lambda: qr_service.payload_cache.misses,
+)
@@ -0,0 +1,208 @@
+import asyncio
+import io
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from app import config
+from app.services import server_timing
+from app.services.metrics import qr_stage_seconds, registry
+
+_RENDER_SECONDS = qr_stage_seconds.labels("render")
+_RENDER_WAIT_SECONDS = qr_stage_seconds.labels("render_wait")
+
+
+def render_qr_png(qr_data, scale=5, border=None):
+    """Render QR text to PNG bytes. Runs inside a pool worker."""
+    return render_qr_image(qr_data, "png", scale, border)
+
+
+def render_qr_image(qr_data, kind="png", scale=5, border=None):
+    """Render QR text to PNG or compact SVG bytes, with the render time."""
+    import segno  # only render workers need it; keeps it out of the API process
+    start = time.perf_counter()
+    qr = segno.make(qr_data)
+    buffer = io.BytesIO()
+    if kind == "svg":
+        qr.save(buffer, kind="svg", scale=scale, border=border,
+                xmldecl=False, svgclass=None, lineclass=None, nl=False)
+    else:
+        qr.save(buffer, kind="png", scale=scale, border=border)
+    return buffer.getvalue(), time.perf_counter() - start
+
+
+class RenderQueueFull(Exception):
+    """Raised when the render queue is at capacity."""
+
+
+class QRRenderExecutor:
+    """Runs segno's PNG encoder off the event loop with a bounded queue.
+
+    Requests beyond ``max_queue`` in-flight renders are rejected with
+    ``RenderQueueFull`` instead of piling up behind a surge.
+
+    Batches (``render_many``) are admitted separately: at most
+    ``max_batches`` render at once and further batches wait for a slot
+    rather than fail. Their renders don't count towards ``max_queue``, so
+    printing wallet cards can't get emergency renders rejected.
+    """
+
+    def __init__(self, mode=None, max_workers=None, max_queue=None, max_batches=None):
+        self.mode = mode or config.QR_RENDER_MODE
+        self.max_workers = max(1, max_workers or config.QR_RENDER_WORKERS)
+        self.max_queue = max(1, max_queue or config.QR_RENDER_QUEUE_SIZE)
+        self.max_batches = max(1, max_batches or config.QR_RENDER_MAX_BATCHES)
+        self._executor = None
+        self._batch_slots = None
+        self._pending = 0
+        self._batch_pending = 0
+        self._batches_waiting = 0
+        self._rendered = 0
+        self._rejected = 0
+        self._render_seconds = 0.0
+        self._wait_seconds = 0.0
+        self._max_render_seconds = 0.0
+
+    def _get_executor(self):
+        if self._executor is None:
+            if self.mode == "thread":
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix="qr-render"
+                )
+            else:
+                # spawn avoids forking a process that already runs threads
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+        return self._executor
+
+    async def warm(self):
+        """Start the workers and give each a throwaway render.
+
+        Process workers are spawned on first use, which otherwise lands on
+        the first generate request. Not counted in the stats.
+        """
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        await asyncio.gather(*(
+            loop.run_in_executor(executor, render_qr_image, "warm-up", "png", 1, None)
+            for _ in range(self.max_workers)
+        ))
+
+    async def render(self, qr_data, scale=5, kind="png", border=None):
+        if self._pending >= self.max_queue:
+            self._rejected += 1
+            raise RenderQueueFull("QR render queue is full, try again shortly")
+
+        self._pending += 1
+        start = time.perf_counter()
+        try:
+            loop = asyncio.get_running_loop()
+            png, render_seconds = await loop.run_in_executor(
+                self._get_executor(), render_qr_image, qr_data, kind, scale, border
+            )
+        finally:
+            self._pending -= 1
+
+        self._record(render_seconds, time.perf_counter() - start - render_seconds)
+        return png
+
+    async def render_many(self, jobs, window=None, kind="png", scale=5, border=None):
+        """Render ``(key, qr_data)`` jobs, yielding ``(key, image)`` as each finishes.
+
+        At most ``window`` renders are in flight, so ``jobs`` can be a lazy
+        iterator over a large batch. A failed render yields the exception in
+        place of the image. Waits first if ``max_batches`` batches are
+        already rendering.
+        """
+        if self._batch_slots is None:
+            self._batch_slots = asyncio.Semaphore(self.max_batches)
+        self._batches_waiting += 1
+        try:
+            await self._batch_slots.acquire()
+        finally:
+            self._batches_waiting -= 1
+        try:
+            async for result in self._render_batch(jobs, window, kind, scale, border):
+                yield result
+        finally:
+            self._batch_slots.release()
+
+    async def _render_batch(self, jobs, window, kind, scale, border):
+        loop = asyncio.get_running_loop()
+        executor = self._get_executor()
+        window = max(1, window or self.max_workers * 2)
+        jobs = iter(jobs)
+        in_flight = {}
+
+        def submit_next():
+            for key, qr_data in jobs:
+                future = loop.run_in_executor(
+                    executor, render_qr_image, qr_data, kind, scale, border
+                )
+                in_flight[future] = (key, time.perf_counter())
+                self._batch_pending += 1
+                return True
+            return False
+
+        try:
+            while len(in_flight) < window and submit_next():
+                pass
+            while in_flight:
+                done, _ = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    key, start = in_flight.pop(future)
+                    self._batch_pending -= 1
+                    try:
+                        image, render_seconds = future.result()
+                    except Exception as e:
+                        yield key, e
+                    else:
+                        self._record(render_seconds, time.perf_counter() - start - render_seconds)
+                        yield key, image
+                    submit_next()
+        finally:
+            # Consumer went away (e.g. client disconnected): drop the rest
+            for future in in_flight:
+                future.cancel()
+            self._batch_pending -= len(in_flight)
+
+    def _record(self, render_seconds, wait_seconds):
+        self._rendered += 1
+        self._render_seconds += render_seconds
+        self._wait_seconds += wait_seconds
+        self._max_render_seconds = max(self._max_render_seconds, render_seconds)
+        _RENDER_SECONDS.observe(render_seconds)
+        _RENDER_WAIT_SECONDS.observe(wait_seconds)
+        server_timing.record("render", render_seconds)
+        server_timing.record("render_wait", wait_seconds)
+
+    def stats(self):
+        rendered = self._rendered or 1
+        return {
+            "mode": self.mode,
+            "workers": self.max_workers,
+            "queue_limit": self.max_queue,
+            "queue_depth": self._pending,
+            "batch_limit": self.max_batches,
+            "batch_in_flight": self._batch_pending,
+            "batches_waiting": self._batches_waiting,
+            "rendered": self._rendered,
+            "rejected": self._rejected,
+            "avg_render_ms": round(self._render_seconds / rendered * 1000, 3),
+            "max_render_ms": round(self._max_render_seconds * 1000, 3),
+            "avg_wait_ms": round(self._wait_seconds / rendered * 1000, 3),
+        }
+
+    def shutdown(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+render_executor = QRRenderExecutor()
+registry.gauge_callback(
+    "qr_render_queue_depth", "QR renders queued or in progress.",
+    lambda: render_executor._pending + render_executor._batch_pending,
+)
@@ -0,0 +1,144 @@
+import cProfile
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+
+from app import config
+
+FORMATS = {"pstats": "pstats", "collapsed": "folded"}
+
+
+def _frame_label(code):
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+# Modules whose frames at the top of a pool thread's stack mean it is blocked
+# waiting for work (or, for the process pool's manager thread, for results)
+_WAITING_MODULES = {"threading.py", "queue.py", "selectors.py", "connection.py"}
+
+
+def _is_idle(frame):
+    """Whether a pool thread is parked waiting rather than running something."""
+    code = frame.f_code
+    return os.path.basename(code.co_filename) in _WAITING_MODULES or (
+        code.co_name == "_worker" and code.co_filename.endswith(os.path.join("futures", "thread.py"))
+    )
+
+
+class StackSampler:
+    """Samples every thread's Python stack on an interval into collapsed stacks.
+
+    Each line of the output is ``thread;outer;...;inner count``, which
+    flamegraph.pl, speedscope and inferno read directly. Pool threads idling
+    between jobs are left out; the loop thread is always kept, so time spent
+    waiting in the selector shows up as such.
+    """
+
+    def __init__(self, interval, loop_thread):
+        self.interval = interval
+        self.loop_thread = loop_thread
+        self.counts = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or (ident != self.loop_thread and _is_idle(frame)):
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, str(ident)))
+                self.counts[";".join(reversed(stack))] += 1
+
+    def dump(self, path):
+        with open(path, "w") as f:
+            for stack, count in self.counts.most_common():
+                f.write(f"{stack} {count}\n")
+
+
+class _PstatsSession:
+    def __init__(self):
+        self._profile = cProfile.Profile()
+
+    def start(self):
+        self._profile.enable()
+
+    def stop(self):
+        self._profile.disable()
+
+    def dump(self, path):
+        self._profile.dump_stats(path)
+
+
+class RequestProfiler:
+    """Profiles single requests into ``directory``, keeping the newest ``max_files``.
+
+    Only one request is profiled at a time: cProfile can't nest and
+    overlapping samplers would double count. ``pstats`` runs cProfile on the
+    event loop thread, so it sees that request's handler and whatever other
+    tasks ran while it was awaiting; threadpool work is not included.
+    ``collapsed`` samples all threads instead, so ``run_db`` and
+    ``run_in_threadpool`` work shows up too.
+    """
+
+    def __init__(self, directory=None, output_format=None, max_files=None, sample_interval=None):
+        self.directory = directory or config.PROFILE_DIR
+        self.output_format = output_format or config.PROFILE_FORMAT
+        if self.output_format not in FORMATS:
+            raise ValueError(f"Unknown profile format: {self.output_format}")
+        self.max_files = max(1, max_files or config.PROFILE_MAX_FILES)
+        self.sample_interval = sample_interval or config.PROFILE_SAMPLE_INTERVAL
+        self._busy = threading.Lock()
+
+    def begin(self, method, path, output_format=None):
+        """Start a session, or return None if one is already running."""
+        if not self._busy.acquire(blocking=False):
+            return None
+        output_format = output_format if output_format in FORMATS else self.output_format
+        if output_format == "collapsed":
+            session = StackSampler(self.sample_interval, threading.get_ident())
+        else:
+            session = _PstatsSession()
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+        slug = re.sub(r"[^A-Za-z0-9]+", "-", path).strip("-")[:60] or "root"
+        session.filename = f"{stamp}-{method}-{slug}.{FORMATS[output_format]}"
+        session.start()
+        return session
+
+    def end(self, session):
+        """Stop ``session``, write its file and rotate out the oldest ones."""
+        try:
+            session.stop()
+            os.makedirs(self.directory, exist_ok=True)
+            session.dump(os.path.join(self.directory, session.filename))
+            self._rotate()
+        finally:
+            self._busy.release()
+
+    def _rotate(self):
+        extensions = tuple(f".{ext}" for ext in FORMATS.values())
+        # Names start with a UTC timestamp, so they sort oldest first
+        files = sorted(name for name in os.listdir(self.directory) if name.endswith(extensions))
+        for name in files[:-self.max_files]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+
+request_profiler = RequestProfiler()
@@ -0,0 +1,65 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# Server-Timing metric names and their descriptions. Spans can nest: json is
+# measured inside encrypt and decrypt, b64 and render are separate steps.
+DESCRIPTIONS = {
+    "db": "database",
+    "encrypt": "encrypt payload",
+    "decrypt": "decrypt payload",
+    "json": "payload (de)serialization",
+    "render": "QR image render",
+    "render_wait": "render queue wait",
+    "b64": "base64 encode image",
+    "total": "time to first byte",
+}
+
+
+class RequestTiming:
+    """Accumulated durations for one request, in insertion order.
+
+    Shared by the request's task and anything it copies its context into, so
+    adds take a (per-request, uncontended) lock.
+    """
+
+    def __init__(self):
+        self.durations = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, seconds):
+        with self._lock:
+            self.durations[name] = self.durations.get(name, 0.0) + seconds
+
+    def header(self):
+        return ", ".join(
+            f'{name};dur={seconds * 1000:.2f};desc="{DESCRIPTIONS.get(name, name)}"'
+            for name, seconds in self.durations.items()
+        )
+
+
+_current = ContextVar("request_timing", default=None)
+
+
+def start():
+    """Begin collecting timings for the current request."""
+    timing = RequestTiming()
+    _current.set(timing)
+    return timing
+
+
+def record(name, seconds):
+    """Add ``seconds`` under ``name`` if a request is being timed; otherwise a no-op."""
+    timing = _current.get()
+    if timing is not None:
+        timing.add(name, seconds)
+
+
+@contextmanager
+def timed(name):
+    start_time = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - start_time)
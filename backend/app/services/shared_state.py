@@ -0,0 +1,287 @@
+import asyncio
+import os
+import socket
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, func, insert, select, update
+
+from app import config
+from app.database import run_db, session_scope
+from app.models import EmergencyEvent, MetricsSnapshot, RevokedEmergency, SharedChange
+from app.services.metrics import registry as metrics_registry
+
+
+def save_revocation(emergency_id):
+    """Record the revocation and take the emergency out of every ``status == "active"`` query."""
+    with session_scope() as db:
+        if db.get(RevokedEmergency, emergency_id) is None:
+            db.add(RevokedEmergency(emergency_id=emergency_id, revoked_at=datetime.now()))
+        db.execute(
+            update(EmergencyEvent)
+            .where(EmergencyEvent.emergency_id == emergency_id, EmergencyEvent.status == "active")
+            .values(status="revoked")
+        )
+
+
+def load_revocations(since):
+    """Ids revoked at or after ``since``; anything older has expired anyway."""
+    with session_scope() as db:
+        return list(db.scalars(
+            select(RevokedEmergency.emergency_id).where(RevokedEmergency.revoked_at >= since)
+        ))
+
+
+class LocalChangeFeed:
+    """Change feed for a single process: there is no one to tell, so
+    ``publish`` does nothing and subscribed handlers are never called.
+
+    Callers apply a change to their own process state first and then
+    ``publish`` it; handlers registered with ``subscribe`` apply changes
+    made by other processes.
+    """
+
+    backend = "local"
+
+    def __init__(self):
+        self._handlers = {}
+
+    def subscribe(self, kind, handler):
+        self._handlers.setdefault(kind, []).append(handler)
+
+    def publish(self, kind, data):
+        pass
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def stats(self):
+        return {"backend": self.backend}
+
+
+class DatabaseChangeFeed(LocalChangeFeed):
+    """Passes changes between workers through the ``shared_changes`` table.
+
+    ``publish`` only queues a change. Every ``poll_interval`` a background
+    task writes the queue in one insert and reads the changes other workers
+    wrote since the last poll, calling the handlers subscribed to each kind,
+    so a change reaches every worker within about one interval. A worker
+    starts from the newest row at startup (what came before is loaded from
+    the database proper) and rows older than ``retention`` are pruned.
+
+    Reading by ``id > cursor`` relies on ids becoming visible in order,
+    which SQLite's single writer guarantees.
+    """
+
+    backend = "database"
+
+    def __init__(self, poll_interval=None, retention=None, batch_size=500):
+        super().__init__()
+        self.poll_interval = poll_interval or config.SHARED_STATE_POLL_INTERVAL
+        self.retention = timedelta(seconds=retention or config.SHARED_STATE_RETENTION)
+        self.batch_size = batch_size
+        self.origin = None
+        self._cursor = 0
+        self._pending = []
+        self._task = None
+        self._published = 0
+        self._applied = 0
+        self._failures = 0
+        self._handler_errors = 0
+
+    def publish(self, kind, data):
+        self._pending.append({"kind": kind, "data": data})
+        self._published += 1
+
+    async def start(self):
+        if self._task is None:
+            # Set here rather than in __init__: workers are forked after import
+            self.origin = f"{socket.gethostname()}:{os.getpid()}"
+            self._cursor = await run_db(self._latest_id)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._pending:
+            await run_db(self._write, self.origin, self._pending)
+            self._pending = []
+
+    async def _run(self):
+        polls = 0
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            try:
+                await self.sync()
+                polls += 1
+                if polls % 600 == 0:
+                    await run_db(self._prune, datetime.now() - self.retention)
+            except Exception:
+                # e.g. the database is locked; queued changes are kept for the next poll
+                self._failures += 1
+
+    async def sync(self):
+        """Write queued changes, then apply everything other workers wrote since the last call."""
+        if self._pending:
+            pending, self._pending = self._pending, []
+            try:
+                await run_db(self._write, self.origin, pending)
+            except Exception:
+                self._pending = pending + self._pending
+                raise
+        while True:
+            rows = await run_db(self._read, self._cursor, self.batch_size)
+            for row_id, origin, kind, data in rows:
+                self._cursor = row_id
+                if origin == self.origin:
+                    continue
+                for handler in self._handlers.get(kind, ()):
+                    try:
+                        handler(data)
+                    except Exception:
+                        self._handler_errors += 1
+                self._applied += 1
+            if len(rows) < self.batch_size:
+                break
+
+    @staticmethod
+    def _latest_id():
+        with session_scope() as db:
+            return db.scalar(select(func.max(SharedChange.id))) or 0
+
+    @staticmethod
+    def _write(origin, changes):
+        now = datetime.now()
+        with session_scope() as db:
+            db.execute(insert(SharedChange), [
+                {"origin": origin, "kind": change["kind"], "data": change["data"], "created_at": now}
+                for change in changes
+            ])
+
+    @staticmethod
+    def _read(cursor, limit):
+        with session_scope() as db:
+            return db.execute(
+                select(SharedChange.id, SharedChange.origin, SharedChange.kind, SharedChange.data)
+                .where(SharedChange.id > cursor)
+                .order_by(SharedChange.id)
+                .limit(limit)
+            ).all()
+
+    @staticmethod
+    def _prune(cutoff):
+        with session_scope() as db:
+            db.execute(delete(SharedChange).where(SharedChange.created_at < cutoff))
+
+    def stats(self):
+        return {
+            "backend": self.backend,
+            "origin": self.origin,
+            "poll_interval": self.poll_interval,
+            "cursor": self._cursor,
+            "queued": len(self._pending),
+            "published": self._published,
+            "applied": self._applied,
+            "failures": self._failures,
+            "handler_errors": self._handler_errors,
+        }
+
+
+class SharedMetrics:
+    """Makes /metrics describe all workers rather than whichever one answered.
+
+    Each worker stores a snapshot of its metrics registry in the
+    ``metrics_snapshots`` table every ``interval`` seconds. ``render``
+    stores the answering worker's own snapshot first and then adds up every
+    row, so a counter never reads lower than on a previous scrape, whichever
+    worker serves it. Rows of workers that stopped updating are kept for
+    their counters but left out of gauges. Without ``enabled`` (a single
+    process) it renders the local registry directly.
+    """
+
+    def __init__(self, registry, enabled=None, interval=None):
+        self.registry = registry
+        self.enabled = config.SHARED_STATE == "database" if enabled is None else enabled
+        self.interval = interval or config.SHARED_METRICS_INTERVAL
+        self.worker = None
+        self._task = None
+
+    async def start(self):
+        if self.enabled and self._task is None:
+            self.worker = f"{socket.gethostname()}:{os.getpid()}"
+            await run_db(self._save)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+            # Its counters stay in the totals after it exits
+            await run_db(self._save)
+
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await run_db(self._save)
+            except Exception:
+                pass  # e.g. the database is locked; the next interval retries
+
+    async def render(self):
+        if self._task is None:
+            return self.registry.render()
+        try:
+            await run_db(self._save)
+            rows = await run_db(self._load)
+        except Exception:
+            return self.registry.render()
+        stale = datetime.now() - timedelta(seconds=3 * self.interval)
+        return self.registry.render_merged(
+            [(data, updated_at >= stale or worker == self.worker) for worker, data, updated_at in rows]
+        )
+
+    def _save(self):
+        data = self.registry.snapshot()
+        with session_scope() as db:
+            db.merge(MetricsSnapshot(worker=self.worker, data=data, updated_at=datetime.now()))
+
+    @staticmethod
+    def _load():
+        with session_scope() as db:
+            return db.execute(
+                select(MetricsSnapshot.worker, MetricsSnapshot.data, MetricsSnapshot.updated_at)
+            ).all()
+
+    @staticmethod
+    def clear():
+        """Forget all workers' samples; the supervisor does this before forking."""
+        with session_scope() as db:
+            db.execute(delete(MetricsSnapshot))
+
+
+CHANGE_FEEDS = {
+    "local": LocalChangeFeed,
+    "database": DatabaseChangeFeed,
+}
+
+
+def make_change_feed(name=None):
+    name = name or config.SHARED_STATE
+    if name not in CHANGE_FEEDS:
+        raise ValueError(f"Unknown SHARED_STATE backend: {name}")
+    return CHANGE_FEEDS[name]()
+
+
+change_feed = make_change_feed()
+shared_metrics = SharedMetrics(metrics_registry)
@@ -0,0 +1,157 @@
+import math
+from datetime import datetime
+
+from app import config
+from app.database import session_scope
+from app.models import EmergencyEvent
+
+EARTH_RADIUS_M = 6371000.0
+METERS_PER_DEGREE_LAT = 111320.0
+
+
+def haversine_m(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_M * math.asin(math.sqrt(a))
+
+
+def longitude_cells(cell_deg):
+    """Number of grid cells around a full circle of latitude."""
+    return max(1, round(360 / cell_deg))
+
+
+def grid_cell(lat, lng, cell_deg):
+    """(row, column) of a point; columns wrap around at the antimeridian."""
+    return (math.floor(lat / cell_deg), math.floor(lng / cell_deg) % longitude_cells(cell_deg))
+
+
+def covering_box(lat, lng, radius_m, cell_deg):
+    """Rows and columns of the grid cells overlapping a radius around a point.
+
+    Columns wrap around the antimeridian and never cover more than one full
+    ring; a radius that reaches a pole takes every column.
+    """
+    dlat = radius_m / METERS_PER_DEGREE_LAT
+    rows = range(
+        math.floor(max(lat - dlat, -90.0) / cell_deg),
+        math.floor(min(lat + dlat, 90.0) / cell_deg) + 1,
+    )
+    ring = longitude_cells(cell_deg)
+    # The box is widest on its poleward edge
+    edge = abs(lat) + dlat
+    if edge >= 90.0:
+        return rows, range(ring)
+    dlng = radius_m / (METERS_PER_DEGREE_LAT * math.cos(math.radians(edge)))
+    first = math.floor((lng - dlng) / cell_deg)
+    last = math.floor((lng + dlng) / cell_deg)
+    if last - first + 1 >= ring:
+        return rows, range(ring)
+    return rows, [column % ring for column in range(first, last + 1)]
+
+
+def covering_cells(lat, lng, radius_m, cell_deg):
+    """Grid cells overlapping the bounding box of a radius around a point."""
+    rows, columns = covering_box(lat, lng, radius_m, cell_deg)
+    return [(x, y) for x in rows for y in columns]
+
+
+class GridIndex:
+    """Uniform lat/lng grid of active emergencies for radius queries.
+
+    Each cell is ``cell_deg`` degrees on a side. A query only visits the
+    cells overlapping the radius' bounding box (or, when that box has more
+    cells than the index has occupied ones, the occupied cells), then filters
+    by haversine distance, so its cost follows local density rather than the
+    total number of active emergencies.
+    """
+
+    def __init__(self, cell_deg=None):
+        self.cell_deg = cell_deg or config.SPATIAL_CELL_DEG
+        self._cells = {}
+        self._cell_of = {}
+
+    def _cell(self, lat, lng):
+        return grid_cell(lat, lng, self.cell_deg)
+
+    def add(self, emergency_id, lat, lng, patient_id=None, expires_at=None):
+        self.remove(emergency_id)
+        cell = self._cell(lat, lng)
+        self._cells.setdefault(cell, {})[emergency_id] = (lat, lng, patient_id, expires_at)
+        self._cell_of[emergency_id] = cell
+
+    def remove(self, emergency_id):
+        cell = self._cell_of.pop(emergency_id, None)
+        if cell is not None:
+            bucket = self._cells[cell]
+            del bucket[emergency_id]
+            if not bucket:
+                del self._cells[cell]
+
+    def remove_many(self, emergency_ids):
+        for emergency_id in emergency_ids:
+            self.remove(emergency_id)
+
+    def nearby(self, lat, lng, radius_m, limit=None):
+        """Emergencies within ``radius_m`` of a point, nearest first."""
+        now = datetime.now()
+        results = []
+        rows, columns = covering_box(lat, lng, radius_m, self.cell_deg)
+        if len(rows) * len(columns) > len(self._cells):
+            # Near the poles the box can span millions of cells; checking the
+            # occupied ones is cheaper then
+            columns = set(columns)
+            buckets = [bucket for (x, y), bucket in self._cells.items() if x in rows and y in columns]
+        else:
+            buckets = [self._cells.get((x, y)) for x in rows for y in columns]
+        for bucket in buckets:
+            if not bucket:
+                continue
+            for emergency_id, (elat, elng, patient_id, expires_at) in bucket.items():
+                if expires_at is not None and expires_at <= now:
+                    continue  # the sweeper hasn't removed it yet
+                distance = haversine_m(lat, lng, elat, elng)
+                if distance <= radius_m:
+                    results.append({
+                        "emergency_id": emergency_id,
+                        "patient_id": patient_id,
+                        "location": {"lat": elat, "lng": elng},
+                        "distance_m": round(distance, 1),
+                        "expires_at": expires_at.isoformat() if expires_at else None,
+                    })
+        results.sort(key=lambda item: item["distance_m"])
+        return results[:limit] if limit else results
+
+    def __len__(self):
+        return len(self._cell_of)
+
+    def stats(self):
+        return {"emergencies": len(self._cell_of), "cells": len(self._cells), "cell_deg": self.cell_deg}
+
+
+def parse_coordinates(location):
+    """(lat, lng) floats from a location dict or DB strings, or None."""
+    try:
+        lat, lng = float(location.get("lat")), float(location.get("lng"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        return None
+    return lat, lng
+
+
+def load_active_locations():
+    with session_scope() as db:
+        return (
+            db.query(
+                EmergencyEvent.emergency_id, EmergencyEvent.patient_id,
+                EmergencyEvent.location_lat, EmergencyEvent.location_lng,
+                EmergencyEvent.expires_at,
+            )
+            .filter(EmergencyEvent.status == "active", EmergencyEvent.location_lat.isnot(None))
+            .all()
+        )
+
+
+emergency_locations = GridIndex()
@@ -0,0 +1,183 @@
+from sqlalchemy.exc import IntegrityError
+
+from app.database import session_scope
+from app.models import User, PatientProfile, ResponderProfile
+
+
+class DatabaseUserRepository:
+    """User store backed by the SQLAlchemy models, indexed by id and by email.
+
+    Users are plain dicts (see ``_user_to_dict``). Methods block on the
+    database, so async routes call them through ``run_db``.
+    Ids come from the table's autoincrement and email uniqueness from its
+    unique index, so both stay atomic across workers.
+    """
+
+    def _query(self, db):
+        return (
+            db.query(User, PatientProfile, ResponderProfile)
+            .outerjoin(PatientProfile, PatientProfile.user_id == User.id)
+            .outerjoin(ResponderProfile, ResponderProfile.user_id == User.id)
+        )
+
+    def get_by_email(self, email):
+        with session_scope() as db:
+            row = self._query(db).filter(User.email == email).first()
+            return _user_to_dict(*row) if row else None
+
+    def get_by_id(self, user_id):
+        with session_scope() as db:
+            row = self._query(db).filter(User.id == user_id).first()
+            return _user_to_dict(*row) if row else None
+
+    def get_profile(self, user_id):
+        """``{"user": ..., "profile": ...}`` from one joined query, or None."""
+        with session_scope() as db:
+            row = self._query(db).filter(User.id == user_id).first()
+            return _profile_to_dict(*row) if row else None
+
+    def get_many(self, user_ids):
+        """Users for a collection of ids, as ``{id: user}``; unknown ids are absent."""
+        users = {}
+        user_ids = list(set(user_ids))
+        with session_scope() as db:
+            for i in range(0, len(user_ids), 500):
+                rows = self._query(db).filter(User.id.in_(user_ids[i:i + 500])).all()
+                users.update((row[0].id, _user_to_dict(*row)) for row in rows)
+        return users
+
+    def add(self, user):
+        return self.create(user)
+
+    def create(self, fields):
+        try:
+            with session_scope() as db:
+                user = User(
+                    id=fields.get("id"),
+                    email=fields["email"],
+                    password_hash=fields["password_hash"],
+                    first_name=fields.get("first_name"),
+                    last_name=fields.get("last_name"),
+                    phone=fields.get("phone"),
+                    user_type=fields.get("user_type"),
+                )
+                db.add(user)
+                db.flush()
+                patient = responder = None
+                if user.user_type == "patient":
+                    patient = _patient_profile(user.id, fields.get("medical_info") or {})
+                    db.add(patient)
+                elif user.user_type == "responder":
+                    responder = ResponderProfile(
+                        user_id=user.id,
+                        badge_number=fields.get("badge_number"),
+                        organization=fields.get("organization"),
+                    )
+                    db.add(responder)
+                db.flush()
+                return _user_to_dict(user, patient, responder)
+        except IntegrityError:
+            raise ValueError("Email already registered")
+
+    def set_password_hash(self, user_id, password_hash):
+        with session_scope() as db:
+            db.query(User).filter(User.id == user_id).update({User.password_hash: password_hash})
+
+    def update_medical_info(self, user_id, medical_info):
+        """Replace a patient's medical info. Returns False if they have no patient profile."""
+        values = _patient_profile(user_id, medical_info)
+        with session_scope() as db:
+            updated = db.query(PatientProfile).filter(PatientProfile.user_id == user_id).update({
+                column: getattr(values, column) for column in MEDICAL_INFO_COLUMNS
+            })
+            return bool(updated)
+
+    def ensure_users(self, users, prepare=None):
+        """Insert any of ``users`` whose email isn't registered yet (seed data).
+
+        ``prepare`` maps a seed entry to the fields passed to ``create``.
+        """
+        for user in users:
+            if self.get_by_email(user["email"]) is None:
+                try:
+                    self.create(prepare(user) if prepare else user)
+                except ValueError:
+                    pass  # another worker seeded it first
+
+
+MEDICAL_INFO_COLUMNS = (
+    "blood_type", "allergies", "medical_conditions", "current_medications",
+    "emergency_contact_name", "emergency_contact_phone", "emergency_contact_relationship",
+)
+
+PATIENT_PROFILE_FIELDS = MEDICAL_INFO_COLUMNS + (
+    "date_of_birth", "height", "weight", "primary_physician", "physician_phone",
+    "insurance_provider", "insurance_id", "updated_at",
+)
+
+RESPONDER_PROFILE_FIELDS = ("badge_number", "organization", "updated_at")
+
+
+def _patient_profile(user_id, medical_info):
+    contact = medical_info.get("emergency_contact") or {}
+    return PatientProfile(
+        user_id=user_id,
+        blood_type=medical_info.get("blood_type", ""),
+        allergies=medical_info.get("allergies", []),
+        medical_conditions=medical_info.get("conditions", []),
+        current_medications=medical_info.get("medications", []),
+        emergency_contact_name=contact.get("name", ""),
+        emergency_contact_phone=contact.get("phone", ""),
+        emergency_contact_relationship=contact.get("relationship", ""),
+    )
+
+
+def _user_to_dict(user, patient=None, responder=None):
+    data = {
+        "id": user.id,
+        "email": user.email,
+        "password_hash": user.password_hash,
+        "first_name": user.first_name,
+        "last_name": user.last_name,
+        "phone": user.phone,
+        "user_type": user.user_type,
+    }
+    if patient is not None:
+        data["medical_info"] = {
+            "blood_type": patient.blood_type or "",
+            "allergies": patient.allergies or [],
+            "conditions": patient.medical_conditions or [],
+            "medications": patient.current_medications or [],
+            "emergency_contact": {
+                "name": patient.emergency_contact_name or "",
+                "phone": patient.emergency_contact_phone or "",
+                "relationship": patient.emergency_contact_relationship or "",
+            },
+        }
+    if responder is not None:
+        data["badge_number"] = responder.badge_number
+        data["organization"] = responder.organization
+    return data
+
+
+def _profile_to_dict(user, patient=None, responder=None):
+    if patient is not None:
+        profile = {field: getattr(patient, field) for field in PATIENT_PROFILE_FIELDS}
+    elif responder is not None:
+        profile = {field: getattr(responder, field) for field in RESPONDER_PROFILE_FIELDS}
+    else:
+        profile = None
+    return {
+        "user": {
+            "id": user.id,
+            "email": user.email,
+            "first_name": user.first_name,
+            "last_name": user.last_name,
+            "phone": user.phone,
+            "user_type": user.user_type,
+        },
+        "profile": profile,
+    }
+
+
+user_repository = DatabaseUserRepository()
@@ -0,0 +1,83 @@
+"""Live feed fan-out: idle subscriber cost and publish latency.
+
+Parks ``subscribers`` stream readers spread over the New York metro area,
+publishes events at random points and reports memory per idle connection,
+publish cost and how a slow client's queue is bounded.
+
+Run from the backend directory:
+
+    python -m benchmarks.live_feed [subscribers]
+"""
+import asyncio
+import random
+import sys
+import time
+import tracemalloc
+
+from app.services.broadcaster import EmergencyBroadcaster
+
+LAT_RANGE = (40.45, 41.05)
+LNG_RANGE = (-74.30, -73.65)
+
+
+async def _reader(subscription, received):
+    while not subscription.closed:
+        frames = await subscription.next_frames(3600)
+        received[0] += len(frames)
+
+
+async def run_async(subscribers=5000, events=2000, radius_m=5000, burst=20):
+    random.seed(7)
+    broadcaster = EmergencyBroadcaster(max_subscribers=subscribers + 1)
+    received = [0]
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    readers = []
+    for _ in range(subscribers):
+        subscription = broadcaster.subscribe(
+            random.uniform(*LAT_RANGE), random.uniform(*LNG_RANGE), radius_m
+        )
+        readers.append(asyncio.create_task(_reader(subscription, received)))
+    await asyncio.sleep(0)
+    per_connection = (tracemalloc.get_traced_memory()[0] - before) / subscribers
+    tracemalloc.stop()
+
+    points = [(random.uniform(*LAT_RANGE), random.uniform(*LNG_RANGE)) for _ in range(events)]
+    publish_seconds = 0.0
+    for i, (lat, lng) in enumerate(points):
+        start = time.perf_counter()
+        broadcaster.publish("emergency.created", {
+            "emergency_id": f"EMG{i:08d}", "location": {"lat": lat, "lng": lng},
+        }, (lat, lng))
+        publish_seconds += time.perf_counter() - start
+        if i % burst == burst - 1:
+            await asyncio.sleep(0)  # let readers drain between bursts
+    publish_us = publish_seconds / events * 1e6
+    await asyncio.sleep(0.1)
+    stats = broadcaster.stats()
+
+    # A client that never reads keeps at most queue_size frames
+    slow = broadcaster.subscribe()
+    for i in range(broadcaster.queue_size * 10):
+        broadcaster.publish("emergency.created", {"emergency_id": f"EMG{i:08d}"})
+    slow_depth, slow_dropped = len(slow), slow.dropped
+
+    broadcaster.close()
+    await asyncio.gather(*readers)
+
+    print(f"{subscribers:,} idle subscribers, {events:,} events, radius {radius_m} m")
+    print(f"memory per idle connection  {per_connection / 1024:>8.2f} KiB")
+    print(f"publish                     {publish_us:>8.1f} us/event "
+          f"(~{stats['delivered'] / events:.0f} recipients/event)")
+    print(f"frames received             {received[0]:>8,} ({stats['dropped']:,} dropped)")
+    print(f"slow client queue           {slow_depth:>8} frames, {slow_dropped} dropped")
+    return {"per_connection_bytes": per_connection, "publish_us": publish_us}
+
+
+def run(subscribers=5000):
+    return asyncio.run(run_async(subscribers))
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
@@ -0,0 +1,345 @@
+"""End-to-end load test for /auth/login, /qr/generate-emergency and /qr/scan.
+
+Virtual users pick a route by weight (``--mix``) and fire requests back to
+back for ``--duration`` seconds. The run reports throughput and p50/p95/p99
+latency per route, then compares them with the stored baseline and exits
+non-zero if any route got slower, lost throughput or started failing.
+The baseline stores a CPU calibration score, and limits are scaled when the
+current machine calibrates slower.
+
+Targets:
+  (default)       the app in-process over an ASGI transport, fresh SQLite DB
+  --uvicorn       a local uvicorn subprocess started for the run, fresh DB
+  --url URL       a server that is already running
+
+Scan requests replay QR strings minted locally with the same key config as
+the server, so --url needs the server's QR_KEYS / QR_KEY_FILE settings.
+
+Run from the backend directory:
+
+    python -m benchmarks.loadtest --concurrency 8 --duration 20
+    python -m benchmarks.loadtest --save-baseline
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from contextlib import asynccontextmanager
+
+import httpx
+
+BASELINE_FILE = os.path.join(os.path.dirname(__file__), "loadtest_baseline.json")
+DEFAULT_MIX = "login=1,generate=3,scan=6"
+ROUTES = {
+    "login": "/auth/login",
+    "generate": "/qr/generate-emergency",
+    "scan": "/qr/scan",
+}
+DEMO_PATIENT = {"email": "demo@patient.com", "password": "demo123"}
+DEMO_RESPONDER = {"email": "demo@responder.com", "password": "demo123"}
+NYC = (40.7128, -74.0060)
+
+
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        if name not in ROUTES:
+            raise SystemExit(f"unknown route in --mix: {name!r} (choose from {', '.join(ROUTES)})")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(samples, elapsed):
+    results = {}
+    for route, (latencies, errors) in samples.items():
+        latencies = sorted(latencies)
+        total = len(latencies) + errors
+        results[route] = {
+            "requests": total,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "rps": round(len(latencies) / elapsed, 1),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+            "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0,
+        }
+    return results
+
+
+def calibrate(rounds=7):
+    """Milliseconds for a fixed CPU workload (median of ``rounds``).
+
+    Stored with the baseline so a run on a slower or busier machine is
+    judged against proportionally scaled numbers.
+    """
+    timings = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        hashlib.scrypt(b"calibrate", salt=b"loadtest", n=2 ** 12, r=8, p=1, dklen=32)
+        json.loads(json.dumps([{"i": i, "s": str(i)} for i in range(5000)]))
+        timings.append(time.perf_counter() - start)
+    return round(statistics.median(timings) * 1000, 3)
+
+
+def median_of_runs(runs):
+    """Per-metric median across repeated runs; request and error counts are summed."""
+    merged = {}
+    for route in runs[0]:
+        values = [run[route] for run in runs]
+        merged[route] = {key: statistics.median(v[key] for v in values) for key in values[0]}
+        for key in ("requests", "errors"):
+            merged[route][key] = sum(v[key] for v in values)
+    return merged
+
+
+def compare(results, baseline, tolerance, slack_ms=5.0, speed=1.0):
+    """Regression messages for every route/metric worse than the baseline allows.
+
+    Latencies may exceed the baseline by ``tolerance`` (twice that for the
+    noisier p99) plus ``slack_ms``, so sub-millisecond routes don't fail
+    on scheduler jitter. ``speed`` is this machine's calibration time over
+    the baseline's; latency limits scale up and throughput floors down by it.
+    """
+    failures = []
+    for route, base in baseline.items():
+        current = results.get(route)
+        if current is None:
+            failures.append(f"{route}: not exercised in this run")
+            continue
+        if current["error_rate"] > base.get("error_rate", 0.0) + 0.001:
+            failures.append(f"{route}: error rate {current['error_rate']:.2%} "
+                            f"(baseline {base.get('error_rate', 0.0):.2%})")
+        if current["rps"] < base["rps"] / speed * (1 - tolerance):
+            failures.append(f"{route}: {current['rps']} req/s vs baseline {base['rps']}")
+        for key, allowed in (("p50_ms", tolerance), ("p95_ms", tolerance), ("p99_ms", 2 * tolerance)):
+            if current[key] > base[key] * speed * (1 + allowed) + slack_ms:
+                failures.append(f"{route}: {key} {current[key]} vs baseline {base[key]}")
+    return failures
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@asynccontextmanager
+async def in_process_client():
+    from app.main import app
+
+    async with app.router.lifespan_context(app):
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest") as client:
+            yield client
+
+
+@asynccontextmanager
+async def uvicorn_client(env):
+    port = free_port()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+            for _ in range(100):
+                try:
+                    if (await client.get("/health")).status_code == 200:
+                        break
+                except httpx.TransportError:
+                    pass
+                await asyncio.sleep(0.1)
+            else:
+                raise SystemExit("uvicorn did not come up")
+            yield client
+    finally:
+        server.terminate()
+        server.wait(timeout=10)
+
+
+@asynccontextmanager
+async def remote_client(url):
+    async with httpx.AsyncClient(base_url=url, timeout=30) as client:
+        yield client
+
+
+async def run_load(client, mix, concurrency, duration, warmup, scan_pool_size, repeat=1):
+    from app.services.qr_service import qr_service
+
+    response = await client.post("/auth/login", json=DEMO_RESPONDER)
+    response.raise_for_status()
+    responder_auth = {"Authorization": f"Bearer {response.json()['access_token']}"}
+    patient_id = (await client.post("/auth/login", json=DEMO_PATIENT)).json()["user_id"]
+    scan_pool = [
+        qr_service.create_emergency_qr_data(patient_id, {"blood_type": "O+"}, {"lat": NYC[0], "lng": NYC[1]})["qr_data"]
+        for _ in range(scan_pool_size)
+    ]
+
+    def request_for(route):
+        if route == "login":
+            return ROUTES[route], {"json": random.choice((DEMO_PATIENT, DEMO_RESPONDER))}
+        if route == "generate":
+            location = {"lat": NYC[0] + random.uniform(-0.1, 0.1), "lng": NYC[1] + random.uniform(-0.1, 0.1)}
+            return ROUTES[route], {"json": {"user_id": patient_id, "location": location}}
+        return ROUTES[route], {"json": {"encrypted_data": random.choice(scan_pool)}, "headers": responder_auth}
+
+    routes, weights = list(mix), list(mix.values())
+    samples = {route: [] for route in routes}
+    errors = {route: 0 for route in routes}
+    failures = {}
+
+    async def virtual_user(deadline, record):
+        while time.perf_counter() < deadline:
+            route = random.choices(routes, weights)[0]
+            path, kwargs = request_for(route)
+            start = time.perf_counter()
+            try:
+                response = await client.post(path, **kwargs)
+                ok = response.status_code == 200
+                status = response.status_code
+            except httpx.HTTPError as e:
+                ok, status = False, type(e).__name__
+            if not record:
+                continue
+            if ok:
+                samples[route].append(time.perf_counter() - start)
+            else:
+                errors[route] += 1
+                failures[(route, status)] = failures.get((route, status), 0) + 1
+
+    if warmup > 0:
+        deadline = time.perf_counter() + warmup
+        await asyncio.gather(*(virtual_user(deadline, False) for _ in range(concurrency)))
+
+    runs = []
+    for _ in range(repeat):
+        for route in routes:
+            samples[route], errors[route] = [], 0
+        start = time.perf_counter()
+        deadline = start + duration
+        await asyncio.gather(*(virtual_user(deadline, True) for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+        runs.append(summarize({route: (samples[route], errors[route]) for route in routes}, elapsed))
+
+    for (route, status), count in sorted(failures.items(), key=str):
+        print(f"  {count} x {route} failed with {status}")
+    return median_of_runs(runs)
+
+
+def print_report(results, label):
+    print(f"\n{label}")
+    print(f"{'route':<10}{'requests':>10}{'errors':>8}{'req/s':>10}"
+          f"{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'max ms':>10}")
+    for route, r in results.items():
+        print(f"{route:<10}{r['requests']:>10}{r['errors']:>8}{r['rps']:>10}"
+              f"{r['p50_ms']:>10}{r['p95_ms']:>10}{r['p99_ms']:>10}{r['max_ms']:>10}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--uvicorn", action="store_true", help="start a local uvicorn for the run")
+    target.add_argument("--url", help="load an already running server")
+    parser.add_argument("--concurrency", type=int, default=8, help="virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per run")
+    parser.add_argument("--repeat", type=int, default=3, help="runs; the report is their median")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--scan-pool", type=int, default=500, help="distinct QR strings replayed by scans")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--scenario", help="baseline entry name (default: <target>-c<concurrency>)")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed relative slowdown / throughput loss (default 0.5)")
+    parser.add_argument("--slack-ms", type=float, default=5.0,
+                        help="absolute latency slack on top of the tolerance (default 5 ms)")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline")
+    args = parser.parse_args(argv)
+
+    mix = parse_mix(args.mix)
+    kind = "url" if args.url else "uvicorn" if args.uvicorn else "inprocess"
+    scenario = args.scenario or f"{kind}-c{args.concurrency}"
+
+    tmp = None
+    if not args.url:
+        # Fresh database for the run; set before the app is imported
+        tmp = tempfile.mkdtemp(prefix="loadtest-")
+        os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'loadtest.db')}"
+    try:
+        if args.url:
+            client = remote_client(args.url)
+        elif args.uvicorn:
+            client = uvicorn_client(dict(os.environ))
+        else:
+            client = in_process_client()
+
+        async def go():
+            async with client as c:
+                return await run_load(
+                    c, mix, args.concurrency, args.duration, args.warmup, args.scan_pool, args.repeat
+                )
+
+        calibration = calibrate()
+        results = asyncio.run(go())
+        calibration = round((calibration + calibrate()) / 2, 3)
+    finally:
+        if tmp:
+            shutil.rmtree(tmp, ignore_errors=True)
+
+    print_report(results, f"{scenario}: {args.concurrency} virtual users, "
+                          f"median of {args.repeat} x {args.duration:g} s, mix {args.mix}, "
+                          f"calibration {calibration} ms")
+
+    baselines = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baselines = json.load(f)
+
+    if args.save_baseline:
+        baselines[scenario] = {"calibration_ms": calibration, "routes": results}
+        with open(args.baseline, "w") as f:
+            json.dump(baselines, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"\nsaved baseline '{scenario}' to {args.baseline}")
+        if any(r["errors"] for r in results.values()):
+            print("warning: this baseline includes failed requests")
+        return 0
+
+    if scenario not in baselines:
+        print(f"\nno baseline '{scenario}' in {args.baseline}; run with --save-baseline to record one")
+        return 0
+    baseline = baselines[scenario]
+    # Scale limits for a slower machine, but never tighten them below the baseline
+    speed = max(1.0, calibration / baseline["calibration_ms"])
+    if speed > 1.0:
+        print(f"\nthis machine is {speed:.2f}x slower than the baseline's; limits scaled")
+    failures = compare(results, baseline["routes"], args.tolerance, args.slack_ms, speed)
+    if failures:
+        print(f"\n!!! PERFORMANCE REGRESSION vs baseline '{scenario}' (tolerance {args.tolerance:.0%}):")
+        for failure in failures:
+            print(f"!!!   {failure}")
+        return 1
+    print(f"\nwithin {args.tolerance:.0%} of baseline '{scenario}'")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
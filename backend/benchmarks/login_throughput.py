@@ -0,0 +1,54 @@
+"""Concurrent login verification: inline KDF vs the bounded hash pool.
+
+Measures verifications/sec and the worst event-loop stall seen by a 10 ms
+heartbeat task while N logins are in flight.
+
+Run from the backend directory:
+
+    python -m benchmarks.login_throughput [concurrency]
+"""
+import asyncio
+import sys
+import time
+
+from app.services.password_hasher import PasswordHasher
+
+
+async def heartbeat(stop, lags):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.01)
+        lags.append(time.perf_counter() - start - 0.01)
+
+
+async def measure(hasher, stored, concurrency, inline):
+    async def one_login():
+        if inline:
+            return hasher.verify("correct horse", stored)
+        return await hasher.verify_async("correct horse", stored)
+
+    stop, lags = asyncio.Event(), []
+    ticker = asyncio.create_task(heartbeat(stop, lags))
+    await asyncio.sleep(0.02)
+    start = time.perf_counter()
+    results = await asyncio.gather(*(one_login() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    await ticker
+    assert all(results)
+    return concurrency / elapsed, max(lags) * 1000
+
+
+async def run(concurrency=64):
+    hasher = PasswordHasher(max_pending=concurrency)
+    stored = hasher.hash("correct horse")
+    print(f"scrypt n={hasher.n} r={hasher.r} p={hasher.p}, "
+          f"{hasher.max_workers} workers, {concurrency} concurrent logins")
+    for label, inline in (("inline (event loop)", True), ("hash pool", False)):
+        rate, max_lag = await measure(hasher, stored, concurrency, inline)
+        print(f"{label:<22}{rate:>8.1f} logins/s   max loop stall {max_lag:>8.1f} ms")
+    hasher.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(run(int(sys.argv[1]) if len(sys.argv) > 1 else 64))
@@ -0,0 +1,40 @@
+"""Synthetic medical summaries shared by the benchmark scripts."""
+
+MEDICATIONS = [
+    "Metformin 500mg", "Lisinopril 10mg", "Atorvastatin 20mg", "Levothyroxine 50mcg",
+    "Amlodipine 5mg", "Metoprolol 25mg", "Omeprazole 20mg", "Albuterol inhaler",
+    "Gabapentin 300mg", "Sertraline 50mg", "Warfarin 5mg", "Furosemide 40mg",
+    "Insulin glargine 20u", "Prednisone 10mg", "Clopidogrel 75mg", "Tamsulosin 0.4mg",
+]
+ALLERGIES = ["Penicillin", "Peanuts", "Latex", "Sulfa drugs", "Shellfish", "Iodine contrast"]
+CONDITIONS = [
+    "Asthma", "Type 2 diabetes", "Hypertension", "Atrial fibrillation",
+    "COPD", "Chronic kidney disease stage 3", "Epilepsy", "Hypothyroidism",
+]
+LOCATION = {"lat": 40.712776, "lng": -74.005974, "address": "350 5th Ave, New York, NY 10118"}
+
+
+def medical_summary(medications=1, allergies=2, conditions=1):
+    def cycle(items, count):
+        return [items[i % len(items)] if i < len(items) else f"{items[i % len(items)]} #{i}"
+                for i in range(count)]
+    return {
+        "blood_type": "O+",
+        "allergies": cycle(ALLERGIES, allergies),
+        "conditions": cycle(CONDITIONS, conditions),
+        "medications": cycle(MEDICATIONS, medications),
+        "emergency_contact": {
+            "name": "Sarah Wilson",
+            "phone": "+1-555-0123",
+            "relationship": "Spouse"
+        }
+    }
+
+
+PROFILES = {
+    "minimal": medical_summary(medications=0, allergies=0, conditions=0),
+    "demo": medical_summary(medications=1, allergies=2, conditions=1),
+    "chronic": medical_summary(medications=8, allergies=3, conditions=4),
+    "complex": medical_summary(medications=20, allergies=6, conditions=8),
+    "polypharmacy": medical_summary(medications=40, allergies=6, conditions=8),
+}
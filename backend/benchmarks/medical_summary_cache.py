@@ -0,0 +1,73 @@
+"""Generate-path cost of fetching the medical summary: database vs cache.
+
+Uses a throwaway SQLite database in a temp directory.
+
+Run from the backend directory:
+
+    python -m benchmarks.medical_summary_cache [user_count]
+"""
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="summary-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from app.database import create_tables, run_db  # noqa: E402
+from app.services.medical_summary_cache import MedicalSummaryCache  # noqa: E402
+from app.services.qr_service import qr_service  # noqa: E402
+from app.services.user_repository import user_repository  # noqa: E402
+from benchmarks.medical_fixtures import LOCATION, PROFILES  # noqa: E402
+
+
+async def per_call_us(fn, ids, rounds=3):
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for user_id in ids:
+            await fn(user_id)
+    return (time.perf_counter() - start) / (rounds * len(ids)) * 1e6
+
+
+async def run_async(user_count):
+    create_tables()
+    ids = [
+        user_repository.create({
+            "email": f"bench{i}@example.com", "password_hash": "x", "user_type": "patient",
+            "medical_info": PROFILES["complex"],
+        })["id"]
+        for i in range(user_count)
+    ]
+    cache = MedicalSummaryCache()
+    await cache.get_many(ids)
+
+    async def from_db(user_id):
+        user = await run_db(user_repository.get_by_id, user_id)
+        return qr_service.create_emergency_qr_data(user_id, user.get("medical_info", {}), LOCATION)
+
+    async def from_cache(user_id):
+        summary = await cache.get(user_id)
+        return qr_service.create_emergency_qr_data(user_id, summary, LOCATION)
+
+    results = {
+        "DB lookup + encrypt": await per_call_us(from_db, ids),
+        "cached summary + encrypt": await per_call_us(from_cache, ids),
+    }
+    print(f"{user_count:,} users, 'complex' medical profile")
+    for name, value in results.items():
+        print(f"{name:<26}{value:>10.1f} us/request")
+    print(cache.stats())
+    return results
+
+
+def run(user_count=1000):
+    return asyncio.run(run_async(user_count))
+
+
+if __name__ == "__main__":
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 1000)
+    finally:
+        shutil.rmtree(_tmp, ignore_errors=True)
@@ -0,0 +1,148 @@
+"""Request throughput of ``python -m app.serve`` as workers are added.
+
+For each worker count the server is started on a fresh SQLite database and
+loaded with the load test's request mix from ``--clients`` client processes
+(one asyncio client can't keep several workers busy). The report gives
+total req/s, the speedup over the first worker count and the scaling
+efficiency (speedup / worker ratio).
+
+The clients run on the same machine, so the load only scales while workers
+plus clients fit on the cores; on a small machine keep the worker counts
+at or below ``cpu_count - clients``, or point ``loadtest --url`` at the
+server from another host.
+
+Run from the backend directory:
+
+    python -m benchmarks.prefork_scaling --workers 1,2,4 --clients 2 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import httpx
+
+from benchmarks.loadtest import DEFAULT_MIX, free_port, parse_mix, remote_client, run_load
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _client(url, mix, concurrency, duration, warmup, scan_pool):
+    async def go():
+        async with remote_client(url) as client:
+            return await run_load(client, mix, concurrency, duration, warmup, scan_pool)
+    return asyncio.run(go())
+
+
+def _wait_until_up(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if httpx.get(f"{url}/health", timeout=2).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.1)
+    raise SystemExit(f"server at {url} did not come up")
+
+
+def measure(workers, clients, mix, concurrency, duration, warmup, scan_pool):
+    """Combined per-route results of ``clients`` load processes against ``workers`` workers."""
+    tmp = tempfile.mkdtemp(prefix="prefork-")
+    port = free_port()
+    url = f"http://127.0.0.1:{port}"
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp, 'prefork.db')}"
+    server = subprocess.Popen(
+        [sys.executable, "-m", "app.serve", "--workers", str(workers), "--port", str(port),
+         "--log-level", "warning"],
+        cwd=BACKEND_DIR, env=env,
+    )
+    try:
+        _wait_until_up(url)
+        with multiprocessing.get_context("spawn").Pool(clients) as pool:
+            runs = pool.starmap(
+                _client, [(url, mix, concurrency, duration, warmup, scan_pool)] * clients
+            )
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+        shutil.rmtree(tmp, ignore_errors=True)
+    routes = {}
+    for run in runs:
+        for route, result in run.items():
+            merged = routes.setdefault(route, {"requests": 0, "errors": 0, "rps": 0.0, "p95_ms": 0.0})
+            merged["requests"] += result["requests"]
+            merged["errors"] += result["errors"]
+            merged["rps"] = round(merged["rps"] + result["rps"], 1)
+            merged["p95_ms"] = max(merged["p95_ms"], result["p95_ms"])
+    return {"rps": round(sum(r["rps"] for r in routes.values()), 1), "routes": routes}
+
+
+def run(worker_counts, clients, mix_text, concurrency, duration, warmup, scan_pool):
+    mix = parse_mix(mix_text)
+    cpus = os.cpu_count() or 1
+    print(f"{cpus} CPUs, {clients} client processes x {concurrency} virtual users, "
+          f"{duration:g} s per point, mix {mix_text}")
+    if max(worker_counts) + clients > cpus:
+        print(f"note: {max(worker_counts)} workers + {clients} clients exceed {cpus} CPUs; "
+              f"points past that share cores and can't scale")
+    results = []
+    base = None
+    print(f"\n{'workers':>8}{'req/s':>10}{'speedup':>10}{'efficiency':>12}{'errors':>8}")
+    for workers in worker_counts:
+        point = measure(workers, clients, mix, concurrency, duration, warmup, scan_pool)
+        base = base or (workers, point["rps"])
+        speedup = point["rps"] / base[1] if base[1] else 0.0
+        point.update({
+            "workers": workers,
+            "speedup": round(speedup, 2),
+            "efficiency": round(speedup / (workers / base[0]), 2),
+        })
+        errors = sum(r["errors"] for r in point["routes"].values())
+        print(f"{workers:>8}{point['rps']:>10}{point['speedup']:>10}{point['efficiency']:>12}{errors:>8}")
+        results.append(point)
+    return {
+        "cpu_count": cpus,
+        "python": platform.python_version(),
+        "clients": clients,
+        "concurrency": concurrency,
+        "duration": duration,
+        "mix": mix_text,
+        "points": results,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    cpus = os.cpu_count() or 1
+    parser.add_argument("--workers", default=",".join(str(n) for n in (1, 2, 4, 8) if n <= cpus) or "1",
+                        help="comma-separated worker counts (default: powers of two up to the CPU count)")
+    parser.add_argument("--clients", type=int, default=max(1, cpus // 4), help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=8, help="virtual users per client process")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds measured per point")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds before measuring")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"route weights (default {DEFAULT_MIX})")
+    parser.add_argument("--scan-pool", type=int, default=200, help="distinct QR strings replayed by scans")
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args(argv)
+    worker_counts = [int(n) for n in args.workers.split(",")]
+    report = run(worker_counts, args.clients, args.mix, args.concurrency,
+                 args.duration, args.warmup, args.scan_pool)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,100 @@
+"""Profile reads per second: old two-query lookup vs joined query vs ETag 304s.
+
+Uses a throwaway SQLite database in a temp directory.
+
+Run from the backend directory:
+
+    python -m benchmarks.profile_reads [user_count]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+_tmp = tempfile.mkdtemp(prefix="profile-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.database import create_tables, session_scope  # noqa: E402
+from app.main import app  # noqa: E402
+from app.models import PatientProfile, User  # noqa: E402
+from app.services.auth_tokens import create_access_token  # noqa: E402
+from app.services.user_repository import user_repository  # noqa: E402
+from benchmarks.medical_fixtures import PROFILES  # noqa: E402
+
+
+def legacy_get_profile(user_id):
+    """The original handler body: User query, then a profile query."""
+    with session_scope() as db:
+        user = db.query(User).filter(User.id == user_id).first()
+        profile = db.query(PatientProfile).filter(PatientProfile.user_id == user_id).first()
+        return {
+            "user": {"id": user.id, "email": user.email, "user_type": user.user_type},
+            "profile": {c.name: getattr(profile, c.name) for c in profile.__table__.columns},
+        }
+
+
+def reads_per_sec(fn, ids, seconds=2.0):
+    count, start = 0, time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn(ids[count % len(ids)])
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def run(user_count=2000):
+    create_tables()
+    medical = list(PROFILES.values())
+    first_id = None
+    for i in range(user_count):
+        user = user_repository.create({
+            "email": f"bench{i}@example.com", "password_hash": "x",
+            "first_name": "Bench", "last_name": f"User{i}", "user_type": "patient",
+            "medical_info": medical[i % len(medical)],
+        })
+        first_id = first_id or user["id"]
+    ids = list(range(first_id, first_id + user_count))
+    random.seed(7)
+    random.shuffle(ids)
+
+    results = {
+        "two queries (old)": reads_per_sec(legacy_get_profile, ids),
+        "joined query": reads_per_sec(user_repository.get_profile, ids),
+    }
+
+    # Full HTTP path; a responder token may read any profile
+    token = create_access_token({"sub": "bench", "user_id": 0, "user_type": "responder"})
+    auth = {"Authorization": f"Bearer {token}"}
+    with TestClient(app) as client:
+        etags = {}
+
+        def fetch(user_id):
+            response = client.get(f"/user/{user_id}/profile", headers=auth)
+            etags[user_id] = response.headers["etag"]
+
+        def revalidate(user_id):
+            response = client.get(
+                f"/user/{user_id}/profile", headers={**auth, "If-None-Match": etags[user_id]}
+            )
+            assert response.status_code == 304
+
+        results["GET 200"] = reads_per_sec(fetch, ids)
+        for user_id in ids:
+            if user_id not in etags:
+                fetch(user_id)
+        results["GET 304 (If-None-Match)"] = reads_per_sec(revalidate, ids)
+
+    print(f"{user_count:,} patient profiles")
+    for name, value in results.items():
+        print(f"{name:<26}{value:>10,.0f} reads/s")
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
+    finally:
+        shutil.rmtree(_tmp, ignore_errors=True)
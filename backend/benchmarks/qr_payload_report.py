@@ -0,0 +1,45 @@
+"""Compare legacy and compact QR payloads for realistic medical summaries.
+
+Run from the backend directory:
+
+    python -m benchmarks.qr_payload_report
+"""
+import segno
+
+from app.services.qr_service import qr_service
+from benchmarks.medical_fixtures import LOCATION, PROFILES
+
+
+def qr_version(text):
+    try:
+        return segno.make(text).version
+    except segno.DataOverflowError:
+        return "overflow"
+
+
+def build_qr_strings(medical_summary):
+    qr_service.payload_format = "legacy"
+    legacy = qr_service.create_emergency_qr_data(1, medical_summary, LOCATION)["qr_data"]
+    qr_service.payload_format = "compact"
+    compact = qr_service.create_emergency_qr_data(1, medical_summary, LOCATION)["qr_data"]
+    qr_service.codec.compress = False
+    uncompressed = qr_service.create_emergency_qr_data(1, medical_summary, LOCATION)["qr_data"]
+    qr_service.codec.compress = True
+    return {"legacy": legacy, "compact-raw": uncompressed, "compact": compact}
+
+
+def run():
+    rows = []
+    for name, summary in PROFILES.items():
+        for fmt, text in build_qr_strings(summary).items():
+            rows.append((name, fmt, len(text), qr_version(text)))
+    qr_service.payload_format = "compact"
+
+    print(f"{'profile':<14}{'format':<13}{'chars':>7}{'version':>9}")
+    for name, fmt, chars, version in rows:
+        print(f"{name:<14}{fmt:<13}{chars:>7}{version!s:>9}")
+    return rows
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,170 @@
+"""Microbenchmarks for QRCodeService primitives across medical summary sizes.
+
+For every profile in ``medical_fixtures.PROFILES`` and both payload formats,
+measures ops/sec of each primitive together with the bytes it produces and
+the QR version of the resulting QR string. Needs no network, database or
+server.
+
+Run from the backend directory:
+
+    python -m benchmarks.qr_primitives                  # table only
+    python -m benchmarks.qr_primitives --output run.json
+    python -m benchmarks.qr_primitives --output history.jsonl   # append a line per run
+    python -m benchmarks.qr_primitives --quick --profiles demo,polypharmacy
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import segno
+
+from app.services.qr_codec import split_qr_string
+from app.services.qr_service import QRCodeService
+from benchmarks.medical_fixtures import LOCATION, PROFILES
+
+FORMATS = ("compact", "legacy")
+
+
+def ops_per_sec(fn, min_time, repeat=3):
+    """Best of ``repeat`` timed loops, each running ``fn`` for at least ``min_time`` seconds."""
+    fn()  # warm up
+    best = 0.0
+    for _ in range(repeat):
+        count, start = 0, time.perf_counter()
+        while True:
+            fn()
+            count += 1
+            elapsed = time.perf_counter() - start
+            if elapsed >= min_time:
+                break
+        best = max(best, count / elapsed)
+    return best
+
+
+def qr_version(text):
+    try:
+        return segno.make(text).version
+    except segno.DataOverflowError:
+        return None
+
+
+def _row(primitive, profile, fmt, rate, produced=None, version=None):
+    return {
+        "primitive": primitive,
+        "profile": profile,
+        "format": fmt,
+        "ops_per_sec": round(rate, 1),
+        "us_per_op": round(1e6 / rate, 2) if rate else None,
+        "bytes": produced,
+        "qr_version": version,
+    }
+
+
+def bench_profile(service, profile, summary, fmt, min_time):
+    service.payload_format = fmt
+    qr = service.create_emergency_qr_data(1, summary, LOCATION)
+    token = split_qr_string(qr["qr_data"])
+    version = qr_version(qr["qr_data"])
+    payload = service.decrypt_data(token)
+    rows = [
+        _row("create_emergency_qr_data", profile, fmt,
+             ops_per_sec(lambda: service.create_emergency_qr_data(1, summary, LOCATION), min_time),
+             len(qr["qr_data"]), version),
+        _row("decrypt_data", profile, fmt,
+             ops_per_sec(lambda: service.decrypt_data(token), min_time),
+             len(json.dumps(payload))),
+    ]
+
+    def validate_cold():
+        service.payload_cache.clear()
+        service.validate_qr_code(token)
+
+    rows.append(_row("validate_qr_code (cold)", profile, fmt, ops_per_sec(validate_cold, min_time)))
+    service.validate_qr_code(token)
+    rows.append(_row("validate_qr_code (cached)", profile, fmt,
+                     ops_per_sec(lambda: service.validate_qr_code(token), min_time)))
+
+    png = service.generate_qr_code_image(qr["qr_data"]).getvalue()
+    rows.append(_row("generate_qr_code_image", profile, fmt,
+                     ops_per_sec(lambda: service.generate_qr_code_image(qr["qr_data"]), min_time),
+                     len(png), version))
+
+    if fmt == "legacy":
+        # The Fernet primitive on its own, without the QR wrapper
+        encrypted = service.encrypt_data(payload)
+        rows.append(_row("encrypt_data", profile, fmt,
+                         ops_per_sec(lambda: service.encrypt_data(payload), min_time),
+                         len(encrypted)))
+    return rows
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(profiles=None, formats=FORMATS, min_time=0.2):
+    service = QRCodeService()
+    rows = [_row("generate_emergency_id", None, None,
+                 ops_per_sec(service.generate_emergency_id, min_time))]
+    for profile in profiles or PROFILES:
+        for fmt in formats:
+            rows.extend(bench_profile(service, profile, PROFILES[profile], fmt, min_time))
+    return {
+        "benchmark": "qr_primitives",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git_revision": git_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "min_time": min_time,
+        "results": rows,
+    }
+
+
+def print_table(report):
+    print(f"{'primitive':<28}{'profile':<14}{'format':<9}{'ops/s':>12}{'us/op':>10}{'bytes':>8}{'ver':>5}")
+    for r in report["results"]:
+        print(f"{r['primitive']:<28}{r['profile'] or '-':<14}{r['format'] or '-':<9}"
+              f"{r['ops_per_sec']:>12,.1f}{r['us_per_op']:>10}{r['bytes'] or '':>8}{r['qr_version'] or '':>5}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--profiles", help=f"comma-separated subset of {', '.join(PROFILES)}")
+    parser.add_argument("--formats", default=",".join(FORMATS))
+    parser.add_argument("--min-time", type=float, default=0.2, help="seconds per timed loop")
+    parser.add_argument("--quick", action="store_true", help="shorter loops (min-time 0.05)")
+    parser.add_argument("--output", help="write JSON here; a .jsonl path gets one line appended")
+    args = parser.parse_args(argv)
+
+    profiles = args.profiles.split(",") if args.profiles else None
+    unknown = set(profiles or ()) - PROFILES.keys()
+    if unknown:
+        parser.error(f"unknown profiles: {', '.join(sorted(unknown))}")
+    report = run(profiles, args.formats.split(","), 0.05 if args.quick else args.min_time)
+    print_table(report)
+
+    if args.output:
+        if args.output.endswith(".jsonl"):
+            with open(args.output, "a") as f:
+                f.write(json.dumps(report) + "\n")
+        else:
+            with open(args.output, "w") as f:
+                json.dump(report, f, indent=2)
+                f.write("\n")
+        print(f"\nwrote {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,57 @@
+"""Radius queries over active emergencies: grid index vs brute-force scan.
+
+Run from the backend directory:
+
+    python -m benchmarks.spatial_nearby [active_count]
+"""
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from app.services.spatial_index import GridIndex, haversine_m
+
+# Roughly the New York metro area
+LAT_RANGE = (40.45, 41.05)
+LNG_RANGE = (-74.30, -73.65)
+
+
+def run(active_count=100_000, queries=200, radius_m=2000):
+    random.seed(7)
+    expires_at = datetime.now() + timedelta(hours=2)
+    points = [
+        (f"EMG{i:08d}", random.uniform(*LAT_RANGE), random.uniform(*LNG_RANGE))
+        for i in range(active_count)
+    ]
+
+    start = time.perf_counter()
+    index = GridIndex()
+    for emergency_id, lat, lng in points:
+        index.add(emergency_id, lat, lng, None, expires_at)
+    build_seconds = time.perf_counter() - start
+
+    centers = [(random.uniform(*LAT_RANGE), random.uniform(*LNG_RANGE)) for _ in range(queries)]
+
+    start = time.perf_counter()
+    grid_hits = [len(index.nearby(lat, lng, radius_m)) for lat, lng in centers]
+    grid_ms = (time.perf_counter() - start) / queries * 1000
+
+    brute_queries = max(1, queries // 10)
+    start = time.perf_counter()
+    brute_hits = [
+        sum(1 for _, plat, plng in points if haversine_m(lat, lng, plat, plng) <= radius_m)
+        for lat, lng in centers[:brute_queries]
+    ]
+    brute_ms = (time.perf_counter() - start) / brute_queries * 1000
+    assert grid_hits[:brute_queries] == brute_hits
+
+    print(f"{active_count:,} active emergencies, radius {radius_m} m, "
+          f"~{sum(grid_hits) / queries:.0f} hits/query")
+    print(f"grid build           {build_seconds * 1000:>10.1f} ms")
+    print(f"grid query           {grid_ms:>10.3f} ms/query")
+    print(f"brute-force query    {brute_ms:>10.3f} ms/query")
+    return {"grid_ms": grid_ms, "brute_ms": brute_ms}
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
@@ -0,0 +1,43 @@
+"""Cold-start cost of building qr_service with derived vs pre-derived keys.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup_keys
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+from app import config
+from app.services.key_ring import derive_key
+
+SNIPPET = (
+    "import time; t = time.perf_counter(); "
+    "from app.services.qr_service import qr_service; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def measure(env, runs=5):
+    timings = []
+    for _ in range(runs):
+        out = subprocess.run(
+            [sys.executable, "-c", SNIPPET], env=env, capture_output=True, text=True, check=True
+        )
+        timings.append(float(out.stdout.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+
+def run():
+    base_env = {k: v for k, v in os.environ.items() if k not in ("QR_KEYS", "QR_KEY_FILE")}
+    preloaded_env = {**base_env, "QR_KEYS": derive_key(config.QR_KEY_PASSPHRASE).decode()}
+    derived = measure(base_env)
+    preloaded = measure(preloaded_env)
+    print(f"derived (PBKDF2 at import):   {derived:8.1f} ms")
+    print(f"pre-derived (QR_KEYS):        {preloaded:8.1f} ms")
+    return {"derived_ms": derived, "preloaded_ms": preloaded}
+
+
+if __name__ == "__main__":
+    run()
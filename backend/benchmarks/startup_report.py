@@ -0,0 +1,172 @@
+"""Startup cost of the API process: import profile and import-to-ready time.
+
+Runs ``python -X importtime -c "import app.main"`` in a fresh interpreter and
+summarizes where the import time goes, by top-level package and by module.
+Then times fresh processes from the start of ``import app.main`` to the end
+of the lifespan startup (ready to serve), against a throwaway SQLite database.
+
+Run from the backend directory:
+
+    python -m benchmarks.startup_report [--runs 3] [--top 15] [--json report.json]
+"""
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_READY_SCRIPT = """
+import asyncio, json, time
+start = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def main():
+    async with app.router.lifespan_context(app):
+        ready = time.perf_counter()
+        print(json.dumps({"import_seconds": imported - start, "ready_seconds": ready - start}), flush=True)
+
+asyncio.run(main())
+"""
+
+# Imported only when first needed; none of these should load with app.main
+LAZY_MODULES = ("jwt", "segno", "cryptography.hazmat.primitives.ciphers.aead")
+
+
+def _env(tmp_dir, **extra):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = BACKEND_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    env["DATABASE_URL"] = f"sqlite:///{os.path.join(tmp_dir, 'startup.db')}"
+    env.update(extra)
+    return env
+
+
+def import_profile():
+    """``(module, self_us, cumulative_us, depth)`` for every import, from -X importtime."""
+    tmp_dir = tempfile.mkdtemp(prefix="startup-")
+    try:
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import app.main"],
+            cwd=BACKEND_DIR, env=_env(tmp_dir), capture_output=True, text=True, check=True,
+        )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def lazy_modules_loaded():
+    """Which of ``LAZY_MODULES`` a bare ``import app.main`` pulls in."""
+    tmp_dir = tempfile.mkdtemp(prefix="startup-")
+    try:
+        result = subprocess.run(
+            [sys.executable, "-c",
+             f"import json, sys, app.main; print(json.dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"],
+            cwd=BACKEND_DIR, env=_env(tmp_dir), capture_output=True, text=True, check=True,
+        )
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def measure_startup(runs=3, warmup_mode=None):
+    """Best-of-``runs`` seconds to import app.main, to ready, and from process launch to ready."""
+    best = {}
+    for _ in range(runs):
+        tmp_dir = tempfile.mkdtemp(prefix="startup-")
+        extra = {"STARTUP_WARMUP": warmup_mode} if warmup_mode else {}
+        try:
+            launched = time.perf_counter()
+            process = subprocess.Popen(
+                [sys.executable, "-c", _READY_SCRIPT],
+                cwd=BACKEND_DIR, env=_env(tmp_dir, **extra), stdout=subprocess.PIPE, text=True,
+            )
+            line = process.stdout.readline()
+            while line and not line.startswith("{"):  # anything the app prints first
+                line = process.stdout.readline()
+            timings = {**json.loads(line), "process_seconds": time.perf_counter() - launched}
+            process.stdout.read()
+            if process.wait() != 0:
+                raise RuntimeError(f"startup script exited with {process.returncode}")
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        for key, value in timings.items():
+            best[key] = min(best.get(key, value), value)
+    return best
+
+
+def summarize(rows, top):
+    by_package = defaultdict(int)
+    for name, self_us, _, _ in rows:
+        by_package[name.split(".")[0]] += self_us
+    total_us = next((cumulative for name, _, cumulative, _ in rows if name == "app.main"), 0)
+    return {
+        "total_ms": round(total_us / 1000, 1),
+        "packages_ms": {
+            package: round(us / 1000, 1)
+            for package, us in sorted(by_package.items(), key=lambda item: -item[1])[:top]
+        },
+        "slowest_modules_ms": {
+            name: round(self_us / 1000, 1)
+            for name, self_us, _, _ in sorted(rows, key=lambda row: -row[1])[:top]
+        },
+        "app_modules_ms": {
+            name: round(cumulative / 1000, 1)
+            for name, _, cumulative, _ in sorted(
+                (row for row in rows if row[0].startswith("app.")), key=lambda row: -row[2]
+            )[:top]
+        },
+    }
+
+
+def run(runs=3, top=15):
+    report = {
+        "imports": summarize(import_profile(), top),
+        "lazy_modules_loaded": lazy_modules_loaded(),
+        "startup": {mode: measure_startup(runs, mode) for mode in ("background", "block", "off")},
+    }
+    imports = report["imports"]
+    print(f"import app.main: {imports['total_ms']} ms (-X importtime, includes its overhead)")
+    for title, key in (("self time by package", "packages_ms"),
+                       ("slowest modules (self)", "slowest_modules_ms"),
+                       ("app modules (cumulative)", "app_modules_ms")):
+        print(f"\n{title}:")
+        for name, ms in imports[key].items():
+            print(f"  {name:<50}{ms:>8.1f} ms")
+    print(f"\nlazy modules loaded at import: {report['lazy_modules_loaded'] or 'none'}")
+    print(f"\nbest of {runs} fresh processes:")
+    for mode, timings in report["startup"].items():
+        print(f"  STARTUP_WARMUP={mode:<11} import {timings['import_seconds'] * 1000:7.1f} ms"
+              f"   ready {timings['ready_seconds'] * 1000:7.1f} ms"
+              f"   launch-to-ready {timings['process_seconds'] * 1000:7.1f} ms")
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--json", help="also write the report here")
+    args = parser.parse_args(argv)
+    report = run(args.runs, args.top)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
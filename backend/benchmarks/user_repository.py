@@ -0,0 +1,101 @@
+"""DatabaseUserRepository lookups vs the old linear users_db scans.
+
+Uses a throwaway SQLite database in a temp directory. The linear scan is
+the old lookup: every user checked until the id matches.
+
+Run from the backend directory:
+
+    python -m benchmarks.user_repository [user_count]
+"""
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+_tmp = tempfile.mkdtemp(prefix="user-repo-bench-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_tmp, 'bench.db')}"
+
+from sqlalchemy import func, insert, select  # noqa: E402
+
+from app.database import create_tables, session_scope  # noqa: E402
+from app.models import User  # noqa: E402
+from app.services.user_repository import user_repository  # noqa: E402
+
+
+def synthetic_user(user_id):
+    return {
+        "id": user_id,
+        "email": f"user{user_id}@example.com",
+        "password_hash": "x",
+        "first_name": "Test",
+        "last_name": f"User{user_id}",
+        "phone": "+1-555-0100",
+        "user_type": "patient",
+    }
+
+
+def ops_per_sec(fn, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return iterations / (time.perf_counter() - start)
+
+
+def run(user_count=100_000):
+    create_tables()
+    start = time.perf_counter()
+    with session_scope() as db:
+        for first in range(1, user_count + 1, 10_000):
+            last = min(first + 10_000, user_count + 1)
+            db.execute(insert(User), [synthetic_user(user_id) for user_id in range(first, last)])
+    print(f"loaded {user_count:,} users in {time.perf_counter() - start:.1f} s")
+
+    ids = [random.randint(1, user_count) for _ in range(100_000)]
+    id_iter = iter(ids * 10)
+
+    def linear_find():
+        target = next(id_iter)
+        with session_scope() as db:
+            for user in db.query(User).yield_per(1000):
+                if user.id == target:
+                    return user
+
+    results = {
+        "find_by_id_linear": ops_per_sec(linear_find, 3),
+        "find_by_id_indexed": ops_per_sec(lambda: user_repository.get_by_id(next(id_iter)), 5_000),
+        "find_by_email_indexed": ops_per_sec(
+            lambda: user_repository.get_by_email(f"user{next(id_iter)}@example.com"), 5_000
+        ),
+    }
+
+    # Concurrent registrations: ids must stay unique
+    def register_many(offset):
+        for i in range(250):
+            fields = {**synthetic_user(0), "email": f"new{offset}-{i}@example.com"}
+            del fields["id"]
+            user_repository.create(fields)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=register_many, args=(t,)) for t in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    results["create_concurrent"] = 2_000 / (time.perf_counter() - start)
+    with session_scope() as db:
+        total, distinct = db.execute(select(func.count(), func.count(User.id.distinct()))).one()
+    assert total == distinct == user_count + 2_000
+
+    for name, value in results.items():
+        print(f"{name:<24}{value:>14,.1f} ops/s")
+    return results
+
+
+if __name__ == "__main__":
+    try:
+        run(int(sys.argv[1]) if len(sys.argv) > 1 else 100_000)
+    finally:
+        shutil.rmtree(_tmp, ignore_errors=True)
@@ -0,0 +1,57 @@
+"""Collision and ordering checks for the emergency id generator.
+
+Run from the backend directory with pytest, or directly:
+
+    python test_emergency_ids.py
+"""
+import multiprocessing
+import sys
+
+from app.services.emergency_ids import PREFIX, SortableIdGenerator, assign_node, make_id_generator, worker_node
+
+IDS_PER_PROCESS = 1_000_000
+PROCESSES = 4
+
+generator = SortableIdGenerator()
+
+
+def _generate(slot, count=IDS_PER_PROCESS):
+    # Runs in a forked child, which takes its slot's node like an app.serve worker
+    assign_node(worker_node(slot))
+    ids = generator.take(count // 2)
+    ids += [generator.next_id() for _ in range(count - len(ids))]
+    return ids
+
+
+def test_single_process_ids_are_unique_and_ordered():
+    ids = generator.take(IDS_PER_PROCESS)
+    ids += [generator.next_id() for _ in range(IDS_PER_PROCESS)]
+    assert len(set(ids)) == len(ids)
+    assert ids == sorted(ids)
+    assert all(len(emergency_id) == 26 and emergency_id.startswith(PREFIX) for emergency_id in ids)
+
+
+def test_ids_from_forked_workers_do_not_collide():
+    context = multiprocessing.get_context("fork")
+    with context.Pool(PROCESSES) as pool:
+        batches = pool.map(_generate, range(PROCESSES))
+    for ids in batches:
+        assert ids == sorted(ids)
+    assert len({ids[0][-3:] for ids in batches}) == PROCESSES  # distinct nodes
+    assert len(set().union(*batches)) == PROCESSES * IDS_PER_PROCESS
+
+
+def test_pinned_nodes_and_legacy_generator():
+    assert SortableIdGenerator(node=7).next_id().endswith("007")
+    assert make_id_generator("legacy").next_id().startswith(PREFIX)
+
+
+if __name__ == "__main__":
+    for test in (
+        test_single_process_ids_are_unique_and_ordered,
+        test_ids_from_forked_workers_do_not_collide,
+        test_pinned_nodes_and_legacy_generator,
+    ):
+        test()
+        print(f"ok  {test.__name__}")
+    sys.exit(0)
@@ -15,15 +15,14 @@ def test_qr_flow():
     # Generate QR code
     response = requests.post(
         f"{BASE_URL}/qr/generate-emergency",
-        params={"user_id": test_user_id},
-        json=test_location
+        json={"user_id": test_user_id, "location": test_location}
     )
     
     if response.status_code == 200:
         result = response.json()
         print("QR Code Generated Successfully!")
         print(f"Emergency ID: {result['emergency_id']}")
-        print(f"Expires in: {result['expires_in']}")
+        print(f"Expires at: {result['expires_at']}")
         
         # The QR code image is in result['qr_code'] as base64
         # You can display this in your frontend
@@ -0,0 +1,36 @@
+"""Startup-time budget for the API process.
+
+Fails when a fresh process takes longer than STARTUP_BUDGET_SECONDS (best of
+three) from ``import app.main`` to the end of the lifespan startup, or when a
+module meant to load lazily is imported with the app.
+
+Run from the backend directory with pytest, or directly:
+
+    python test_startup.py
+"""
+import os
+import sys
+
+from benchmarks.startup_report import LAZY_MODULES, lazy_modules_loaded, measure_startup
+
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "2.0"))
+
+
+def test_import_to_ready_within_budget():
+    timings = measure_startup(runs=3)
+    assert timings["ready_seconds"] <= STARTUP_BUDGET_SECONDS, (
+        f"import-to-ready took {timings['ready_seconds']:.3f}s, budget is "
+        f"{STARTUP_BUDGET_SECONDS}s; see python -m benchmarks.startup_report"
+    )
+
+
+def test_heavy_modules_load_lazily():
+    loaded = lazy_modules_loaded()
+    assert not loaded, f"import app.main loaded {loaded}, expected none of {LAZY_MODULES}"
+
+
+if __name__ == "__main__":
+    for test in (test_import_to_ready_within_budget, test_heavy_modules_load_lazily):
+        test()
+        print(f"ok  {test.__name__}")
+    sys.exit(0)
@@ -10,10 +10,30 @@ from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.pbkdf2 import PBKDF2HMAC
 import secrets
 import string
+import threading
 import io
+import os
+import time
+import asyncio
+import multiprocessing
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
 import segno
 
-app = FastAPI(title="Emergency Healthcare API", version="1.0.0")
+# QR render pool settings
+QR_RENDER_WORKERS = int(os.getenv("QR_RENDER_WORKERS", str(os.cpu_count() or 1)))
+QR_RENDER_QUEUE_SIZE = int(os.getenv("QR_RENDER_QUEUE_SIZE", str(QR_RENDER_WORKERS * 8)))
+
+render_pool = None
+render_stats = {"queue_depth": 0, "rendered": 0, "rejected": 0, "render_seconds": 0.0}
+
+@asynccontextmanager
+async def lifespan(app):
+    yield
+    if render_pool is not None:
+        render_pool.shutdown(wait=True, cancel_futures=True)
+
+app = FastAPI(title="Emergency Healthcare API", version="1.0.0", lifespan=lifespan)
 
 # Add CORS middleware
 app.add_middleware(
@@ -26,9 +46,50 @@ app.add_middleware(
 
 SECRET_KEY = "emergency-healthcare-secret-key-2024"
 
+class UserRepository:
+    """In-memory user store indexed by id and by email.
+
+    Lookups are O(1) dict hits, and ``create`` checks the email, allocates
+    the next id and inserts under one lock, so concurrent registrations can
+    neither collide on an id nor register the same email twice.
+    """
+
+    def __init__(self, users=()):
+        self._by_id = {}
+        self._by_email = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        for user in users:
+            self.add(user)
+
+    def get_by_email(self, email):
+        return self._by_email.get(email)
+
+    def get_by_id(self, user_id):
+        return self._by_id.get(user_id)
+
+    def add(self, user):
+        with self._lock:
+            if user["email"] in self._by_email:
+                raise ValueError("Email already registered")
+            self._by_id[user["id"]] = user
+            self._by_email[user["email"]] = user
+            self._next_id = max(self._next_id, user["id"] + 1)
+        return user
+
+    def create(self, fields):
+        with self._lock:
+            if fields["email"] in self._by_email:
+                raise ValueError("Email already registered")
+            user = {"id": self._next_id, **fields}
+            self._next_id += 1
+            self._by_id[user["id"]] = user
+            self._by_email[user["email"]] = user
+        return user
+
 # Simple in-memory user storage
-users_db = {
-    "demo@patient.com": {
+users_db = UserRepository([
+    {
         "id": 1,
         "email": "demo@patient.com",
         "password": "demo123",
@@ -48,7 +109,7 @@ users_db = {
             }
         }
     },
-    "demo@responder.com": {
+    {
         "id": 2,
         "email": "demo@responder.com",
         "password": "demo123",
@@ -59,7 +120,7 @@ users_db = {
         "badge_number": "RES123",
         "organization": "City Emergency Services"
     }
-}
+])
 
 class UserLogin(BaseModel):
     email: str
@@ -143,11 +204,8 @@ class QRCodeService:
         }
     
     def generate_qr_code_image(self, qr_data):
-        qr = segno.make(qr_data)
-        buffer = io.BytesIO()
-        qr.save(buffer, kind='png', scale=5)
-        buffer.seek(0)
-        return buffer
+        png, _ = render_qr_png(qr_data)
+        return io.BytesIO(png)
     
     def validate_qr_code(self, encrypted_data):
         try:
@@ -159,12 +217,39 @@ class QRCodeService:
         except Exception as e:
             raise ValueError(f"Invalid QR code: {str(e)}")
 
+def render_qr_png(qr_data, scale=5):
+    # Module-level so the render pool can pickle it
+    start = time.perf_counter()
+    qr = segno.make(qr_data)
+    buffer = io.BytesIO()
+    qr.save(buffer, kind='png', scale=scale)
+    return buffer.getvalue(), time.perf_counter() - start
+
+async def render_qr_off_loop(qr_data):
+    global render_pool
+    if render_stats["queue_depth"] >= QR_RENDER_QUEUE_SIZE:
+        render_stats["rejected"] += 1
+        raise HTTPException(status_code=503, detail="QR render queue is full, try again shortly")
+    if render_pool is None:
+        render_pool = ProcessPoolExecutor(
+            max_workers=QR_RENDER_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    render_stats["queue_depth"] += 1
+    try:
+        png, elapsed = await asyncio.get_running_loop().run_in_executor(render_pool, render_qr_png, qr_data)
+    finally:
+        render_stats["queue_depth"] -= 1
+    render_stats["rendered"] += 1
+    render_stats["render_seconds"] += elapsed
+    return png
+
 # Create QR service instance
 qr_service = QRCodeService()
 
 @app.post("/auth/login")
 async def login(login_data: UserLogin):
-    user = users_db.get(login_data.email)
+    user = users_db.get_by_email(login_data.email)
     
     if not user or user["password"] != login_data.password:
         raise HTTPException(status_code=401, detail="Invalid credentials")
@@ -187,31 +272,30 @@ async def login(login_data: UserLogin):
 
 @app.post("/auth/register")
 async def register(user_data: UserRegister):
-    if user_data.email in users_db:
-        raise HTTPException(status_code=400, detail="Email already registered")
-    
-    # Create new user
-    new_user_id = max([user["id"] for user in users_db.values()]) + 1
-    users_db[user_data.email] = {
-        "id": new_user_id,
-        "email": user_data.email,
-        "password": user_data.password,
-        "first_name": user_data.first_name,
-        "last_name": user_data.last_name,
-        "phone": user_data.phone,
-        "user_type": user_data.user_type,
-        "medical_info": {
-            "blood_type": "",
-            "allergies": [],
-            "conditions": [],
-            "medications": [],
-            "emergency_contact": {
-                "name": "",
-                "phone": "",
-                "relationship": ""
+    # Create new user; the repository assigns the id atomically
+    try:
+        new_user = users_db.create({
+            "email": user_data.email,
+            "password": user_data.password,
+            "first_name": user_data.first_name,
+            "last_name": user_data.last_name,
+            "phone": user_data.phone,
+            "user_type": user_data.user_type,
+            "medical_info": {
+                "blood_type": "",
+                "allergies": [],
+                "conditions": [],
+                "medications": [],
+                "emergency_contact": {
+                    "name": "",
+                    "phone": "",
+                    "relationship": ""
+                }
             }
-        }
-    }
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    new_user_id = new_user["id"]
     
     access_token = create_access_token({
         "sub": user_data.email,
@@ -245,11 +329,7 @@ async def auth_health():
 async def generate_emergency_qr(request: EmergencyRequest):
     try:
         # Find user in our simple database
-        user = None
-        for user_data in users_db.values():
-            if user_data["id"] == request.user_id:
-                user = user_data
-                break
+        user = users_db.get_by_id(request.user_id)
         
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
@@ -257,9 +337,9 @@ async def generate_emergency_qr(request: EmergencyRequest):
         # Generate QR with user data
         qr_data = qr_service.create_emergency_qr_data(user, request.location)
         
-        # Generate QR image
-        qr_image = qr_service.generate_qr_code_image(qr_data["qr_data"])
-        qr_base64 = base64.b64encode(qr_image.getvalue()).decode()
+        # Generate QR image off the event loop
+        qr_png = await render_qr_off_loop(qr_data["qr_data"])
+        qr_base64 = base64.b64encode(qr_png).decode()
         
         return {
             "success": True,
@@ -268,9 +348,23 @@ async def generate_emergency_qr(request: EmergencyRequest):
             "expires_at": qr_data["expires_at"]
         }
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/qr/render-stats")
+async def qr_render_stats():
+    rendered = render_stats["rendered"] or 1
+    return {
+        "workers": QR_RENDER_WORKERS,
+        "queue_limit": QR_RENDER_QUEUE_SIZE,
+        "queue_depth": render_stats["queue_depth"],
+        "rendered": render_stats["rendered"],
+        "rejected": render_stats["rejected"],
+        "avg_render_ms": round(render_stats["render_seconds"] / rendered * 1000, 3),
+    }
+
 @app.post("/qr/scan")
 async def scan_qr_code(request: QRScanRequest):
     try:
@@ -1,7 +1,13 @@
 ﻿from fastapi import APIRouter, HTTPException
+from fastapi.concurrency import run_in_threadpool
 from pydantic import BaseModel
 from datetime import datetime
+import base64
+import hashlib
+import hmac
 import jwt
+import os
+import threading
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
@@ -17,38 +23,114 @@ class UserRegister(BaseModel):
     first_name: str
     last_name: str
     phone: str
-    user_type: str
+    user_type: str = "patient"
+
+# Responder tokens unlock patients' medical data, so responders can't sign
+# themselves up; they are created through the main API's /auth/responders
+SELF_REGISTER_USER_TYPES = ("patient",)
+
+# Same scheme and ``scrypt$n$r$p$salt$hash`` format as the main API's
+# app/services/password_hasher.py, so hashes work in either service.
+# This router ships on its own, hence the copy rather than an import.
+SCRYPT_N, SCRYPT_R, SCRYPT_P = 2 ** 14, 8, 1
+
+def _b64(data):
+    return base64.b64encode(data).decode().rstrip("=")
+
+def _unb64(text):
+    return base64.b64decode(text + "=" * (-len(text) % 4))
+
+def _derive(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * n * r * p, dklen=32)
+
+def hash_password(password):
+    salt = os.urandom(16)
+    digest = _derive(password, salt, SCRYPT_N, SCRYPT_R, SCRYPT_P)
+    return f"scrypt${SCRYPT_N}${SCRYPT_R}${SCRYPT_P}${_b64(salt)}${_b64(digest)}"
+
+def verify_password(password, stored):
+    _, n, r, p, salt, digest = stored.split("$")
+    candidate = _derive(password, _unb64(salt), int(n), int(r), int(p))
+    return hmac.compare_digest(candidate, _unb64(digest))
+
+# Checked against for unknown emails so timing doesn't leak which accounts exist
+_DUMMY_HASH = hash_password(os.urandom(16).hex())
+
+class UserRepository:
+    """In-memory user store indexed by id and by email.
+
+    Lookups are O(1) dict hits, and ``create`` checks the email, allocates
+    the next id and inserts under one lock, so concurrent registrations can
+    neither collide on an id nor register the same email twice.
+    """
+
+    def __init__(self, users=()):
+        self._by_id = {}
+        self._by_email = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        for user in users:
+            self.add(user)
+
+    def get_by_email(self, email):
+        return self._by_email.get(email)
+
+    def get_by_id(self, user_id):
+        return self._by_id.get(user_id)
+
+    def add(self, user):
+        with self._lock:
+            if user["email"] in self._by_email:
+                raise ValueError("Email already registered")
+            self._by_id[user["id"]] = user
+            self._by_email[user["email"]] = user
+            self._next_id = max(self._next_id, user["id"] + 1)
+        return user
+
+    def create(self, fields):
+        with self._lock:
+            if fields["email"] in self._by_email:
+                raise ValueError("Email already registered")
+            user = {"id": self._next_id, **fields}
+            self._next_id += 1
+            self._by_id[user["id"]] = user
+            self._by_email[user["email"]] = user
+        return user
 
 # Simple in-memory user storage
-users_db = {
-    "demo@patient.com": {
+users_db = UserRepository([
+    {
         "id": 1,
         "email": "demo@patient.com",
-        "password": "demo123",
+        "password_hash": hash_password("demo123"),
         "first_name": "Alex",
         "last_name": "Patient",
         "phone": "+1-555-0101",
         "user_type": "patient"
     },
-    "demo@responder.com": {
+    {
         "id": 2,
         "email": "demo@responder.com",
-        "password": "demo123",
+        "password_hash": hash_password("demo123"),
         "first_name": "Sarah",
         "last_name": "Responder",
         "phone": "+1-555-0102",
         "user_type": "responder"
     }
-}
+])
 
 def create_access_token(data: dict):
     return jwt.encode(data, SECRET_KEY, algorithm="HS256")
 
 @router.post("/login")
 async def login(login_data: UserLogin):
-    user = users_db.get(login_data.email)
+    user = users_db.get_by_email(login_data.email)
     
-    if not user or user["password"] != login_data.password:
+    # Runs off the event loop; scrypt is slow on purpose
+    valid = await run_in_threadpool(
+        verify_password, login_data.password, user["password_hash"] if user else _DUMMY_HASH
+    )
+    if not user or not valid:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     
     access_token = create_access_token({
@@ -69,20 +151,24 @@ async def login(login_data: UserLogin):
 
 @router.post("/register")
 async def register(user_data: UserRegister):
-    if user_data.email in users_db:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    if user_data.user_type not in SELF_REGISTER_USER_TYPES:
+        raise HTTPException(status_code=403, detail="Only patient accounts can be self-registered")
     
-    # Create new user
-    new_user_id = max([user["id"] for user in users_db.values()]) + 1
-    users_db[user_data.email] = {
-        "id": new_user_id,
-        "email": user_data.email,
-        "password": user_data.password,
-        "first_name": user_data.first_name,
-        "last_name": user_data.last_name,
-        "phone": user_data.phone,
-        "user_type": user_data.user_type
-    }
+    password_hash = await run_in_threadpool(hash_password, user_data.password)
+    
+    # Create new user; the repository assigns the id atomically
+    try:
+        new_user = users_db.create({
+            "email": user_data.email,
+            "password_hash": password_hash,
+            "first_name": user_data.first_name,
+            "last_name": user_data.last_name,
+            "phone": user_data.phone,
+            "user_type": user_data.user_type
+        })
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    new_user_id = new_user["id"]
     
     access_token = create_access_token({
         "sub": user_data.email,
@@ -1,43 +1,111 @@
 ﻿import React, { useState } from 'react';
 import './Login.css';
 
+const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
+
+// Offline demo only, when the API can't be reached at all
+const demoProfile = (userType, email) => {
+  if (userType === 'patient') {
+    return {
+      id: 1,
+      name: 'Alex Patient',
+      email,
+      user_type: 'patient',
+      medical_info: {
+        blood_type: 'O+',
+        allergies: ['Penicillin', 'Peanuts'],
+        conditions: ['Asthma'],
+        medications: ['Ventolin']
+      }
+    };
+  }
+  return {
+    id: 2,
+    name: 'Sarah Responder',
+    email,
+    user_type: 'responder',
+    badgeNumber: 'RES123',
+    organization: 'City Hospital'
+  };
+};
+
+// The signed-in user as the dashboards expect it, from /user/{id}/profile
+const userFromProfile = (session, { user, profile }) => {
+  const details = profile || {};
+  const base = {
+    id: user.id,
+    name: `${user.first_name || ''} ${user.last_name || ''}`.trim(),
+    first_name: user.first_name,
+    last_name: user.last_name,
+    email: user.email,
+    user_type: user.user_type,
+    access_token: session.access_token
+  };
+  if (user.user_type === 'patient') {
+    return {
+      ...base,
+      medical_info: {
+        blood_type: details.blood_type || '',
+        allergies: details.allergies || [],
+        conditions: details.medical_conditions || [],
+        medications: details.current_medications || [],
+        emergency_contact: {
+          name: details.emergency_contact_name || '',
+          phone: details.emergency_contact_phone || '',
+          relationship: details.emergency_contact_relationship || ''
+        }
+      }
+    };
+  }
+  return { ...base, badgeNumber: details.badge_number, organization: details.organization };
+};
+
 const Login = ({ onLogin }) => {
   const [credentials, setCredentials] = useState({
     email: '',
     password: '',
     userType: 'patient' // 'patient' or 'responder'
   });
+  const [error, setError] = useState('');
 
   const handleSubmit = async (e) => {
     e.preventDefault();
+    setError('');
     
-    let userData;
-    
-    if (credentials.userType === 'patient') {
-      userData = {
-        id: 1,
-        name: 'Alex Patient',
-        email: credentials.email,
-        user_type: 'patient',
-        medical_info: {
-          blood_type: 'O+',
-          allergies: ['Penicillin', 'Peanuts'],
-          conditions: ['Asthma'],
-          medications: ['Ventolin']
-        }
-      };
-    } else {
-      userData = {
-        id: 2,
-        name: 'Sarah Responder',
-        email: credentials.email,
-        user_type: 'responder',
-        badgeNumber: 'RES123',
-        organization: 'City Hospital'
-      };
+    let response;
+    try {
+      response = await fetch(`${API_URL}/auth/login`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ email: credentials.email, password: credentials.password })
+      });
+    } catch (err) {
+      // API not reachable at all: carry on with the offline demo (no live feed)
+      onLogin(demoProfile(credentials.userType, credentials.email));
+      return;
+    }
+    if (response.status === 401) {
+      setError('Invalid email or password');
+      return;
+    }
+    if (!response.ok) {
+      setError(`Login failed (${response.status}), please try again`);
+      return;
     }
     
-    onLogin(userData);
+    try {
+      const session = await response.json();
+      const profileResponse = await fetch(`${API_URL}/user/${session.user_id}/profile`, {
+        headers: { Authorization: `Bearer ${session.access_token}` }
+      });
+      if (!profileResponse.ok) {
+        setError(`Could not load your profile (${profileResponse.status})`);
+        return;
+      }
+      onLogin(userFromProfile(session, await profileResponse.json()));
+    } catch (err) {
+      setError('Could not load your profile, please try again');
+    }
   };
 
   return (
@@ -62,6 +130,7 @@ const Login = ({ onLogin }) => {
       </div>
 
       <form onSubmit={handleSubmit} className="login-form">
+        {error && <div className="login-error">{error}</div>}
         <input
           type="email"
           placeholder="Email"
@@ -84,8 +153,8 @@ const Login = ({ onLogin }) => {
       </form>
       
       <div className="demo-credentials">
-        <p><strong>Demo:</strong> Use any email/password</p>
-        <p>Select user type to see different interfaces</p>
+        <p><strong>Demo:</strong> demo@patient.com or demo@responder.com, password demo123</p>
+        <p>Without the API running, any email/password works and the user type picks the interface</p>
       </div>
     </div>
   );
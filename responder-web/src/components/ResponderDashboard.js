@@ -1,9 +1,34 @@
-import React, { useState } from 'react';
+import React, { useState, useEffect } from 'react';
 import QRScanner from './QRScanner';
 import './ResponderDashboard.css';
 
+const API_URL = process.env.REACT_APP_API_URL || 'http://localhost:8000';
+const MAX_LIVE_EVENTS = 20;
+
 const ResponderDashboard = ({ user, onLogout }) => {
   const [emergencyData, setEmergencyData] = useState(null);
+  const [liveEvents, setLiveEvents] = useState([]);
+
+  // Live feed of emergencies created or scanned nearby (Server-Sent Events)
+  useEffect(() => {
+    if (!user.access_token || !window.EventSource) return undefined;
+    const params = new URLSearchParams({ access_token: user.access_token });
+    if (user.location) {
+      params.set('lat', user.location.lat);
+      params.set('lng', user.location.lng);
+    }
+    const source = new EventSource(`${API_URL}/emergencies/stream?${params}`);
+    const handleEvent = (e) => {
+      const event = { ...JSON.parse(e.data), type: e.type };
+      setLiveEvents((events) => [
+        event,
+        ...events.filter((item) => item.emergency_id !== event.emergency_id)
+      ].slice(0, MAX_LIVE_EVENTS));
+    };
+    source.addEventListener('emergency.created', handleEvent);
+    source.addEventListener('emergency.scanned', handleEvent);
+    return () => source.close();
+  }, [user.access_token, user.location]);
 
   const handleQRScan = (data) => {
     console.log('QR Scan Data:', data);
@@ -35,6 +60,20 @@ const ResponderDashboard = ({ user, onLogout }) => {
       {!emergencyData ? (
         <div className="scanner-section">
           <QRScanner onScan={handleQRScan} />
+          {liveEvents.length > 0 && (
+            <div className="live-feed">
+              <h3>📡 Live Emergencies</h3>
+              <ul>
+                {liveEvents.map((event) => (
+                  <li key={event.emergency_id} className={event.type === 'emergency.scanned' ? 'scanned' : ''}>
+                    <span>{event.emergency_id}</span>
+                    <span>{event.location?.address || `${event.location?.lat}, ${event.location?.lng}`}</span>
+                    <span>{event.type === 'emergency.scanned' ? 'Responder on scene' : 'New'}</span>
+                  </li>
+                ))}
+              </ul>
+            </div>
+          )}
         </div>
       ) : (
         <div className="emergency-details-section">